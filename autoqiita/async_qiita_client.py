@@ -0,0 +1,122 @@
+"""
+Asyncio Qiita API client for use inside the MCP server event loop
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from .qiita_client import (
+    QiitaClient, QiitaDraft, RATE_LIMIT_RETRIES, check_security_report, is_missing_item
+)
+from .rate_limiter import current_priority, is_rate_limited
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional "async" extra
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+class AsyncQiitaClient:
+    """Same draft API as QiitaClient, as coroutines over a shared httpx connection pool"""
+
+    def __init__(self, client: QiitaClient):
+        self.client = client
+        self.latency = client.latency
+        self.rate_limiter = client.rate_limiter
+        self.mirror = client.mirror
+        self._http = None
+        if httpx is not None:
+            connect_timeout, read_timeout = client.timeout
+            self._http = httpx.AsyncClient(
+                base_url=client.base_url,
+                headers=client.headers,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=client.pool_size,
+                                    max_keepalive_connections=client.pool_size)
+            )
+        else:
+            logger.info("httpx is not installed; Qiita API calls run on worker threads")
+
+    async def aclose(self) -> None:
+        """Close the pooled connections"""
+        if self._http is not None:
+            await self._http.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        """Send a request over the shared pool and return the decoded JSON"""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            # Held requests wait without blocking the event loop and book
+            # their slot when they wake (see QiitaClient._request)
+            while (wait := self.rate_limiter.reserve()) > 0:
+                logger.info(f"Rate limit: holding {current_priority()} request {method} {path} for {wait:.0f}s")
+                await asyncio.sleep(wait)
+
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await self._http.request(method, path, **kwargs)
+                status = response.status_code
+            finally:
+                self.latency.observe(method, path, status, time.perf_counter() - start)
+
+            self.rate_limiter.update(response.headers)
+            if not is_rate_limited(response.status_code, response.headers):
+                break
+            logger.warning(f"Qiita API rate limit reached on {method} {path}")
+        response.raise_for_status()
+        return response.json()
+
+    async def create_draft(self, draft: QiitaDraft) -> Dict[str, Any]:
+        """Create a new draft on Qiita"""
+        if self._http is None:
+            return await asyncio.to_thread(self.client.create_draft, draft)
+        return await self._request("POST", "/items", json=draft.payload())
+
+    async def update_draft(self, item_id: str, draft: QiitaDraft) -> Dict[str, Any]:
+        """Update an existing draft on Qiita"""
+        if self._http is None:
+            return await asyncio.to_thread(self.client.update_draft, item_id, draft)
+        return await self._request("PATCH", f"/items/{item_id}", json=draft.payload())
+
+    async def get_draft(self, item_id: str) -> Dict[str, Any]:
+        """Get a specific draft from Qiita"""
+        if self._http is None:
+            return await asyncio.to_thread(self.client.get_draft, item_id)
+        return await self._request("GET", f"/items/{item_id}")
+
+    async def list_user_items(self, per_page: int = 20, page: int = 1) -> List[Dict[str, Any]]:
+        """List user's items (including drafts)"""
+        if self._http is None:
+            return await asyncio.to_thread(self.client.list_user_items, per_page, page)
+        params = {"per_page": per_page, "page": page}
+        return await self._request("GET", "/authenticated_user/items", params=params)
+
+    async def find_or_create_draft(self, title: str, body: str, tags: List[Dict[str, str]] = None,
+                                   security_report: Dict = None, force_upload: bool = False,
+                                   item_id: Optional[str] = None) -> Dict[str, Any]:
+        """Update or create a draft with security checking (see QiitaClient.find_or_create_draft)"""
+        check_security_report(security_report, force_upload)
+        draft = QiitaDraft(title=title, body=body, tags=tags or [], private=True)
+
+        if item_id:
+            try:
+                return await self.update_draft(item_id, draft)
+            except Exception as e:
+                if not is_missing_item(e):
+                    raise
+                logger.info(f"Draft {item_id} no longer exists; creating a new one")
+
+        existing_id = None
+        if self.mirror is not None:
+            existing_id = await asyncio.to_thread(self.mirror.find_draft, title, body, item_id)
+        if existing_id:
+            try:
+                return await self.update_draft(existing_id, draft)
+            except Exception as e:
+                if not is_missing_item(e):
+                    raise
+                logger.info(f"Mirrored draft {existing_id} no longer exists; creating a new one")
+
+        return await self.create_draft(draft)
@@ -3,13 +3,19 @@ CLI interface for AutoQiita
 """
 import click
 import asyncio
+import os
 from pathlib import Path
 from .config import Config
 from .mcp_server import AutoQiitaMCPServer
 from .qiita_client import QiitaClient
+from .rate_limiter import AUTO, request_priority
 from .content_processor import ContentProcessor
 from .multi_workspace import MultiWorkspaceConfig
 from .extension_manager import FileExtensionManager
+from .scan_cache import ScanCache
+from .state_store import UploadStateStore
+from .save_pipeline import BLOCKED, SAVED, SKIPPED, UNCHANGED, SavePipeline, SaveResult
+from .remote_mirror import RemoteMirror, SYNC_PAGE_WORKERS
 
 @click.group()
 def cli():
@@ -33,26 +39,50 @@ def server(host, port):
 @click.option("--force", is_flag=True, help="Force upload even with security issues")
 @click.option("--no-security-check", is_flag=True, help="Skip security check")
 @click.option("--simple", is_flag=True, help="Simple creation without duplicate checking")
-def save(file_path, force, no_security_check, simple):
+@click.option("--no-skip", is_flag=True, help="Upload even if the file is unchanged since the last upload")
+@click.option("--full", is_flag=True, help="Upload the whole file even in diff article mode")
+def save(file_path, force, no_security_check, simple, no_skip, full):
     """Manually save a file to Qiita"""
     try:
         config = Config()
-        qiita_client = QiitaClient(config.qiita_token)
-        processor = ContentProcessor(enable_security_scan=not no_security_check)
+        qiita_client = QiitaClient(config.qiita_token, pool_size=config.qiita_pool_size,
+                                   connect_timeout=config.qiita_connect_timeout,
+                                   read_timeout=config.qiita_read_timeout,
+                                   mirror=RemoteMirror())
+        processor = ContentProcessor(enable_security_scan=not no_security_check,
+                                     stable_body=config.stable_body,
+                                     max_file_bytes=config.max_file_bytes,
+                                     max_body_chars=config.max_body_chars,
+                                     diff_mode=config.diff_article_mode and not full)
         
-        # Process file with security check
-        title, body, tags, security_report = processor.process_file(file_path)
+        pipeline = SavePipeline(qiita_client, processor, UploadStateStore())
+        pending = pipeline.prepare(file_path, force=force, skip_unchanged=not no_skip)
+        if isinstance(pending, SaveResult):
+            if pending.status == SKIPPED:
+                click.echo(f"✗ Skipped: {file_path}")
+                click.echo(f"  {pending.message}")
+                return
+            click.echo(f"✓ Unchanged, skipped: {file_path}")
+            for part in pending.parts or [{"id": pending.item_id, "url": pending.url}]:
+                click.echo(f"  ID: {part['id']}")
+                click.echo(f"  URL: {part['url']}")
+            click.echo("  再アップロードするには --no-skip を指定してください")
+            return
+        if pending.file_check.action == "preview":
+            click.echo(f"⚠️ {pending.file_check.reason}")
         
-        # Display security report if issues found
-        if security_report and security_report.get("total_issues", 0) > 0:
-            from .security_scanner import SecurityScanner
-            scanner = SecurityScanner()
-            report_text = scanner.format_report_for_display(security_report)
+        # Display security report if issues found (or the scan could not finish)
+        security_report = pending.security_report
+        if security_report and (security_report.get("total_issues", 0) > 0
+                                or security_report.get("status") == "error"):
+            report_text = processor.security_scanner.format_report_for_display(security_report)
             click.echo(report_text)
             
             # Check if upload should be blocked
-            if processor.should_block_upload(security_report) and not force:
+            if not force and pipeline.blocked(pending):
                 click.echo("\n❌ アップロードがブロックされました。")
+                if security_report.get("partial"):
+                    click.echo(f"すべての問題を確認するには: autoqiita security scan {file_path}")
                 click.echo("--force フラグを使用して強制アップロードできますが、推奨されません。")
                 return
             
@@ -61,23 +91,29 @@ def save(file_path, force, no_security_check, simple):
                 if not click.confirm("\nセキュリティ問題が検出されましたが、続行しますか？"):
                     click.echo("アップロードをキャンセルしました。")
                     return
-            
-            # Add security warning to content
-            body = processor.add_security_warning_to_content(body, security_report)
         
-        # Save to Qiita
-        if simple:
-            # Simple creation without duplicate checking
-            result = qiita_client.create_draft_simple(title, body, tags)
-        else:
-            # Standard creation with duplicate checking
-            result = qiita_client.find_or_create_draft(title, body, tags, security_report, force)
+        result = pipeline.upload(pending, force=force, skip_unchanged=not no_skip, simple=simple)
+        if result.diff is not None:
+            click.echo(f"✓ Saved diff article to Qiita: {result.title}")
+            click.echo(f"  ID: {result.diff.get('id')}")
+            click.echo(f"  URL: {result.diff.get('url')}")
+            click.echo(f"  全文: {result.url}")
+            return
+        if result.parts:
+            click.echo(f"✓ Saved to Qiita as {len(result.parts)} parts: {result.title}")
+            for part in result.parts:
+                status = "unchanged" if part["skipped"] else "saved"
+                click.echo(f"  [{part['part']}/{len(result.parts)}] {status}: {part['url']}")
+            return
+        if result.status == UNCHANGED:
+            click.echo(f"✓ Body unchanged, skipped: {file_path}")
+            return
         
-        click.echo(f"✓ Saved to Qiita: {title}")
-        click.echo(f"  ID: {result.get('id')}")
-        click.echo(f"  URL: {result.get('url')}")
+        click.echo(f"✓ Saved to Qiita: {result.title}")
+        click.echo(f"  ID: {result.item_id}")
+        click.echo(f"  URL: {result.url}")
         
-        if security_report and security_report.get("total_issues", 0) > 0:
+        if pending.warning:
             click.echo("  ⚠️ セキュリティ警告が記事に追加されました")
         
     except Exception as e:
@@ -94,6 +130,13 @@ def status():
         click.echo(f"  Auto-save: {'enabled' if config.auto_save_enabled else 'disabled'}")
         click.echo(f"  MCP Server: {config.mcp_host}:{config.mcp_port}")
         
+        cache_stats = ScanCache().stats()
+        click.echo(
+            f"  Scan cache: {cache_stats['entries']} entries, "
+            f"hit rate {cache_stats['hit_rate']:.1%} "
+            f"({cache_stats['hits']} hits / {cache_stats['misses']} misses)"
+        )
+        
         # Show registered workspaces
         multi_config = MultiWorkspaceConfig()
         workspaces = multi_config.get_enabled_workspaces()
@@ -104,7 +147,9 @@ def status():
                 click.echo(f"    {status} {ws['name']}: {ws['path']}")
         
         # Test Qiita connection
-        qiita_client = QiitaClient(config.qiita_token)
+        qiita_client = QiitaClient(config.qiita_token, pool_size=config.qiita_pool_size,
+                                   connect_timeout=config.qiita_connect_timeout,
+                                   read_timeout=config.qiita_read_timeout)
         items = qiita_client.list_user_items(per_page=1)
         click.echo(f"  Qiita: connected (found {len(items)} items)")
         
@@ -120,15 +165,28 @@ def monitor(workspace_path):
     config = Config()
     config.workspace_path = workspace_path
     
-    qiita_client = QiitaClient(config.qiita_token)
-    processor = ContentProcessor()
+    qiita_client = QiitaClient(config.qiita_token, pool_size=config.qiita_pool_size,
+                               connect_timeout=config.qiita_connect_timeout,
+                               read_timeout=config.qiita_read_timeout,
+                               mirror=RemoteMirror())
+    processor = ContentProcessor(stable_body=config.stable_body, max_file_bytes=config.max_file_bytes,
+                                 max_body_chars=config.max_body_chars,
+                                 diff_mode=config.diff_article_mode)
+    pipeline = SavePipeline(qiita_client, processor, UploadStateStore())
     
     def on_file_changed(file_path):
         try:
-            click.echo(f"Processing: {file_path}")
-            title, body, tags = processor.process_file(file_path)
-            result = qiita_client.find_or_create_draft(title, body, tags)
-            click.echo(f"✓ Saved: {title} (ID: {result.get('id')})")
+            # Touches and formatter saves that leave the content as uploaded are skipped
+            with request_priority(AUTO):
+                result = pipeline.save(file_path)
+            if result.status == SAVED and result.parts:
+                click.echo(f"✓ Saved as {len(result.parts)} parts: {result.title}")
+            elif result.status == SAVED:
+                click.echo(f"✓ Saved: {result.title} (ID: {result.item_id})")
+            elif result.status == BLOCKED:
+                click.echo(f"❌ Blocked: {file_path}")
+            elif result.status == SKIPPED:
+                click.echo(f"✗ Skipped: {file_path}: {result.message}")
         except Exception as e:
             click.echo(f"✗ Error: {e}")
     
@@ -182,6 +240,74 @@ def list_workspaces():
         status = "✓ enabled" if ws.get("enabled") else "✗ disabled"
         click.echo(f"  {ws['name']}: {ws['path']} ({status})")
 
+@workspace.command("sync")
+@click.argument("path", type=click.Path(exists=True, file_okay=False))
+@click.option("--workers", type=int, default=None, help="Scan worker processes (default: CPU count)")
+@click.option("--dry-run", is_flag=True, help="Process and scan files without uploading")
+def sync_workspace(path, workers, dry_run):
+    """Upload every watched file of a workspace that changed since its last upload"""
+    try:
+        from .tree_scan import iter_workspace_files, workspace_scan_rules
+        
+        config = Config()
+        qiita_client = QiitaClient(config.qiita_token, pool_size=config.qiita_pool_size,
+                                   connect_timeout=config.qiita_connect_timeout,
+                                   read_timeout=config.qiita_read_timeout,
+                                   mirror=RemoteMirror())
+        processor = ContentProcessor(stable_body=config.stable_body,
+                                     max_file_bytes=config.max_file_bytes,
+                                     max_body_chars=config.max_body_chars)
+        pipeline = SavePipeline(qiita_client, processor, UploadStateStore())
+        rules = workspace_scan_rules(path)
+        counts = {"saved": 0, "unchanged": 0, "skipped": 0, "blocked": 0, "error": 0}
+        content_hashes = {}
+        
+        def changed_files():
+            # Files whose source is what was last uploaded are never read in full
+            for file_path in iter_workspace_files(path, rules["extensions"], rules["ignore_patterns"]):
+                content_hash, unchanged = pipeline.check_source(file_path)
+                if unchanged is not None:
+                    counts["unchanged"] += 1
+                    continue
+                content_hashes[file_path] = content_hash
+                yield file_path
+        
+        # Reads and scans overlap; uploads go out as results arrive
+        for file_path, title, body, tags, report in processor.process_many(
+                changed_files(), scan_workers=workers):
+            content_hash = content_hashes.pop(file_path)
+            status = (report or {}).get("status")
+            if status in ("skipped", "error") and body is None:
+                counts[status] += 1
+                click.echo(f"✗ {status}: {file_path}: {report['message']}")
+                continue
+            pending = pipeline.pending(file_path, content_hash, title, body, tags, report)
+            if pipeline.blocked(pending):
+                counts["blocked"] += 1
+                click.echo(f"❌ blocked ({status}): {file_path}")
+                continue
+            if dry_run:
+                counts["saved"] += 1
+                click.echo(f"✓ would save: {file_path} ({title})")
+                continue
+            
+            try:
+                with request_priority(AUTO):
+                    result = pipeline.upload(pending)
+            except Exception as e:
+                counts["error"] += 1
+                click.echo(f"✗ error: {file_path}: {e}")
+                continue
+            counts[result.status] += 1
+            if result.status == SAVED:
+                suffix = f"{len(result.parts)} parts" if result.parts else f"ID: {result.item_id}"
+                click.echo(f"✓ Saved: {file_path} ({suffix})")
+        
+        click.echo(f"\n{'確認' if dry_run else '保存'}: {counts['saved']}件, 変更なし: {counts['unchanged']}件, "
+                   f"スキップ: {counts['skipped']}件, ブロック: {counts['blocked']}件, エラー: {counts['error']}件")
+    except Exception as e:
+        click.echo(f"Error syncing workspace: {e}")
+
 @workspace.command("toggle")
 @click.argument("path", type=click.Path())
 def toggle_workspace(path):
@@ -190,6 +316,56 @@ def toggle_workspace(path):
     multi_config.toggle_workspace(path)
     click.echo(f"✓ Toggled workspace: {path}")
 
+@cli.group()
+def remote():
+    """Local mirror of your Qiita items"""
+    pass
+
+@remote.command("sync")
+@click.option("--workers", default=SYNC_PAGE_WORKERS, help="Pages fetched concurrently")
+@click.option("--full", is_flag=True, help="Fetch every page again, ignoring ETags")
+def remote_sync(workers, full):
+    """Mirror all of your Qiita items into the local database"""
+    try:
+        config = Config()
+        qiita_client = QiitaClient(config.qiita_token, pool_size=max(config.qiita_pool_size, workers),
+                                   connect_timeout=config.qiita_connect_timeout,
+                                   read_timeout=config.qiita_read_timeout)
+        result = RemoteMirror().sync(qiita_client, workers, full)
+        
+        click.echo(f"✓ Synced {result.items} items ({result.pages} pages, {result.pages_unchanged} unchanged)")
+        click.echo(f"  更新: {result.updated}件, 削除: {result.removed}件")
+    except Exception as e:
+        click.echo(f"Error syncing Qiita items: {e}")
+
+@remote.command("find")
+@click.option("--title", help="Exact item title")
+@click.option("--id", "item_id", help="Qiita item id")
+@click.option("--source", help="Source file name (from the \"Source:\" footer)")
+def remote_find(title, item_id, source):
+    """Look up items in the local mirror (run 'remote sync' first)"""
+    mirror = RemoteMirror()
+    if item_id:
+        item = mirror.by_id(item_id)
+        items = [item] if item else []
+    elif title:
+        items = mirror.by_title(title)
+    elif source:
+        items = mirror.by_source(source)
+    else:
+        click.echo("--title, --id または --source を指定してください")
+        return
+    
+    if not items:
+        status = mirror.status()
+        click.echo(f"No matching items ({status['items']} items mirrored, last sync: {status['synced_at'] or 'never'})")
+        return
+    
+    for item in items:
+        visibility = "private" if item["private"] else "public"
+        click.echo(f"  {item['id']}  {item['title']} ({visibility}, updated {item['updated_at']})")
+        click.echo(f"    {item['url']}")
+
 @cli.group()
 def security():
     """Security-related commands"""
@@ -203,17 +379,17 @@ def scan_file(file_path, config):
     try:
         from .security_scanner import SecurityScanner
         
-        scanner = SecurityScanner(config)
+        scanner = SecurityScanner(config, cache=ScanCache())
         issues = scanner.scan_file(file_path)
         report = scanner.get_security_report(issues)
         
         report_text = scanner.format_report_for_display(report)
         click.echo(report_text)
         
-        # Set exit code based on severity
+        # Set exit code based on severity; an incomplete scan is not a pass
         if report["status"] == "critical":
             exit(2)
-        elif report["status"] in ["high", "warning"]:
+        elif report["status"] in ["high", "warning", "error"]:
             exit(1)
         else:
             exit(0)
@@ -222,6 +398,101 @@ def scan_file(file_path, config):
         click.echo(f"Error scanning file: {e}")
         exit(1)
 
+@security.command("scan-tree")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--config", help="Security config file path")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+@click.option("--format", "output_format", type=click.Choice(["table", "jsonl"]), default="table",
+              help="Output format")
+@click.option("--no-cache", is_flag=True, help="Do not use the scan result cache")
+def scan_tree_command(directory, config, workers, output_format, no_cache):
+    """Scan every watched file under a directory in parallel"""
+    try:
+        import json
+        from .tree_scan import iter_workspace_files, scan_tree, workspace_scan_rules
+        
+        rules = workspace_scan_rules(directory)
+        paths = iter_workspace_files(directory, rules["extensions"], rules["ignore_patterns"])
+        
+        files_scanned = 0
+        by_status = {}
+        by_level = {}
+        for result in scan_tree(paths, config, workers, use_cache=not no_cache):
+            files_scanned += 1
+            by_status[result["status"]] = by_status.get(result["status"], 0) + 1
+            for level, count in result["by_level"].items():
+                by_level[level] = by_level.get(level, 0) + count
+            
+            if output_format == "jsonl":
+                click.echo(json.dumps(result, ensure_ascii=False))
+            elif result["status"] == "error":
+                click.echo(f"{'error':<9} {'-':>5}  {result['file_path']}: {result['message']}")
+            elif result["status"] != "passed":
+                click.echo(f"{result['status']:<9} {result['total_issues']:>5}  {result['file_path']}")
+        
+        if output_format == "table":
+            click.echo(f"\nスキャンしたファイル: {files_scanned}件")
+            for status, count in sorted(by_status.items()):
+                click.echo(f"  {status}: {count}件")
+            if by_level:
+                click.echo("問題レベル別:")
+                for level, count in sorted(by_level.items()):
+                    click.echo(f"  {level}: {count}件")
+        
+        # Set exit code based on the worst file; unscanned files are not a pass
+        if by_status.get("critical"):
+            exit(2)
+        elif by_status.get("high") or by_status.get("warning") or by_status.get("error"):
+            exit(1)
+        else:
+            exit(0)
+            
+    except Exception as e:
+        click.echo(f"Error scanning directory: {e}")
+        exit(1)
+
+@security.command("profile-rules")
+@click.argument("directory", required=False, type=click.Path(exists=True, file_okay=False))
+@click.option("--config", default="config/security_rules.json", help="Security config file path")
+@click.option("--top", default=0, help="Show only the N slowest rules")
+def profile_rules_command(directory, config, top):
+    """Time each security rule over a workspace or synthetic inputs"""
+    try:
+        from .security_scanner import SecurityScanner
+        from .rule_profiler import profile_rules, synthetic_corpus, workspace_corpus
+        from .tree_scan import iter_workspace_files, workspace_scan_rules
+        
+        scanner = SecurityScanner(config)
+        if directory:
+            rules = workspace_scan_rules(directory)
+            corpus = workspace_corpus(
+                iter_workspace_files(directory, rules["extensions"], rules["ignore_patterns"])
+            )
+            click.echo(f"Profiling {len(scanner.rule_set.rules)} rules over {directory}")
+        else:
+            corpus = synthetic_corpus()
+            click.echo(f"Profiling {len(scanner.rule_set.rules)} rules over synthetic inputs")
+        
+        results = profile_rules(scanner.rule_set, corpus)
+        if top:
+            results = results[:top]
+        
+        click.echo(f"\n{'total ms':>9} {'worst ms':>9} {'matches':>8}  rule")
+        for stats in results:
+            flag = " ⏱️ over budget" if stats["over_budget"] else ""
+            click.echo(
+                f"{stats['total_time'] * 1000:>9.1f} {stats['worst_time'] * 1000:>9.2f} "
+                f"{stats['matches']:>8}  [{stats['category']}] {stats['description']}{flag}"
+            )
+            if stats["worst_source"]:
+                click.echo(
+                    f"{'':>30}worst: {stats['worst_source']}:{stats['worst_line']} "
+                    f"{stats['worst_excerpt']!r}"
+                )
+            
+    except Exception as e:
+        click.echo(f"Error profiling rules: {e}")
+
 @security.command("check-config")
 def check_security_config():
     """Check security configuration"""
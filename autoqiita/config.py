@@ -6,6 +6,12 @@ from typing import List, Set
 from pathlib import Path
 from dotenv import load_dotenv
 
+DEFAULT_IGNORE_PATTERNS = [
+    ".git", "__pycache__", "node_modules", ".vscode", 
+    ".pytest_cache", ".mypy_cache", "dist", "build",
+    ".env", ".env.local", "*.log", "*.tmp"
+]
+
 class Config:
     """Configuration for AutoQiita"""
     
@@ -24,11 +30,7 @@ class Config:
         # File monitoring settings - load from extension manager
         self._load_watched_extensions()
         
-        self.ignore_patterns = [
-            ".git", "__pycache__", "node_modules", ".vscode", 
-            ".pytest_cache", ".mypy_cache", "dist", "build",
-            ".env", ".env.local", "*.log", "*.tmp"
-        ]
+        self.ignore_patterns = list(DEFAULT_IGNORE_PATTERNS)
         
         # MCP server settings
         self.mcp_host = os.getenv("MCP_HOST", "localhost")
@@ -50,6 +52,23 @@ class Config:
         ]
         
         self.draft_prefix = os.getenv("DRAFT_PREFIX", "[AutoSave]")
+        
+        # Qiita API connection settings
+        self.qiita_pool_size = int(os.getenv("QIITA_POOL_SIZE", "10"))
+        self.qiita_connect_timeout = float(os.getenv("QIITA_CONNECT_TIMEOUT", "5"))
+        self.qiita_read_timeout = float(os.getenv("QIITA_READ_TIMEOUT", "30"))
+        
+        # Omit the "Last updated" timestamp so unchanged files produce identical bodies
+        self.stable_body = os.getenv("STABLE_BODY", "true").lower() == "true"
+        
+        # Files larger than this are uploaded as a truncated preview
+        self.max_file_bytes = int(os.getenv("MAX_FILE_BYTES", str(1024 * 1024)))
+        
+        # Longer bodies are uploaded as a multi-part series of drafts
+        self.max_body_chars = int(os.getenv("MAX_BODY_CHARS", "50000"))
+        
+        # Publish edits to large source files as diff articles instead of the full file
+        self.diff_article_mode = os.getenv("DIFF_ARTICLE_MODE", "false").lower() == "true"
     
     def _load_watched_extensions(self):
         """Load watched extensions from extension manager"""
@@ -74,5 +93,12 @@ class Config:
             "auto_save_enabled": self.auto_save_enabled,
             "save_delay_seconds": self.save_delay_seconds,
             "default_tags": self.default_tags,
-            "draft_prefix": self.draft_prefix
+            "draft_prefix": self.draft_prefix,
+            "qiita_pool_size": self.qiita_pool_size,
+            "qiita_connect_timeout": self.qiita_connect_timeout,
+            "qiita_read_timeout": self.qiita_read_timeout,
+            "stable_body": self.stable_body,
+            "max_file_bytes": self.max_file_bytes,
+            "max_body_chars": self.max_body_chars,
+            "diff_article_mode": self.diff_article_mode
         }
\ No newline at end of file
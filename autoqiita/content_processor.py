@@ -3,59 +3,202 @@ Content processor for converting various file types to Qiita-compatible markdown
 """
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from datetime import datetime
 import markdown
 import logging
 
-from .security_scanner import SecurityScanner, SecurityIssue
+from .security_scanner import SecurityScanner, SecurityIssue, IncompleteScanError
+from .scan_cache import ScanCache
+from .text_decoder import TextDecoder
+from .file_guard import FileCheck, SkippedFileError, inspect_file, MAX_FILE_BYTES
+from .tree_scan import scan_body, scan_pool
+from .python_outline import extract_outline
+from .notebook import read_notebook
+from .table_preview import read_table_preview
 
 logger = logging.getLogger(__name__)
 
+# Default number of files in flight in process_many
+PROCESS_MANY_WINDOW = 32
+# Default number of threads reading and converting files in process_many
+PROCESS_MANY_READ_WORKERS = 8
+
+# Bodies longer than this are split into a series of drafts
+MAX_BODY_CHARS = 50000
+
+_FENCE_RE = re.compile(r"^(`{3,}|~{3,})")
+# Split points: headings outside code blocks, top-level definitions inside them
+_HEADING_RE = re.compile(r"^#{1,3}\s")
+_DEFINITION_RE = re.compile(r"^(?:@|(?:async\s+)?def\s|class\s|function\s|export\s)")
+
 class ContentProcessor:
     """Process file content for Qiita upload with security scanning"""
     
-    def __init__(self, enable_security_scan: bool = True, security_config_file: str = None):
+    def __init__(self, enable_security_scan: bool = True, security_config_file: str = None,
+                 use_scan_cache: bool = True, stable_body: bool = True,
+                 max_file_bytes: int = MAX_FILE_BYTES, max_body_chars: int = MAX_BODY_CHARS,
+                 diff_mode: bool = False):
         self.processors = {
             '.md': self._process_markdown,
             '.py': self._process_python,
             '.js': self._process_javascript,
             '.ts': self._process_typescript,
             '.txt': self._process_text,
-            '.rst': self._process_rst
+            '.rst': self._process_rst,
+            '.ipynb': self._process_notebook,
+            '.csv': self._process_table,
+            '.tsv': self._process_table
         }
+        # Processors that read their input as a stream with bounded output
+        self.streamed_extensions = {'.ipynb', '.csv', '.tsv'}
         self.enable_security_scan = enable_security_scan
+        # Leave the upload time out of bodies so they depend only on the content
+        self.stable_body = stable_body
+        self.text_decoder = TextDecoder()
+        # Larger files are uploaded as a truncated preview
+        self.max_file_bytes = max_file_bytes
+        # Longer bodies are uploaded as a multi-part series
+        self.max_body_chars = max_body_chars
+        # Publish changes to large source files as diff articles (see diff_article)
+        self.diff_mode = diff_mode
         
         if enable_security_scan:
             config_path = security_config_file or "config/security_rules.json"
-            self.security_scanner = SecurityScanner(config_path)
+            self.security_scanner = SecurityScanner(
+                config_path, cache=ScanCache() if use_scan_cache else None
+            )
         else:
             self.security_scanner = None
     
-    def process_file(self, file_path: str) -> Tuple[str, str, List[Dict[str, str]], Optional[Dict]]:
-        """
-        Process a file and return (title, body, tags, security_report)
-        """
-        path = Path(file_path)
-        extension = path.suffix.lower()
-        
-        if extension not in self.processors:
-            title, body, tags = self._process_generic(file_path)
-        else:
-            title, body, tags = self.processors[extension](file_path)
+    def inspect_file(self, file_path: str, force: bool = False) -> FileCheck:
+        """Cheap size/content pre-check run before any full read, scan or upload"""
+        streamed = Path(file_path).suffix.lower() in self.streamed_extensions
+        check = inspect_file(file_path, self.max_file_bytes, streamed, force)
+        if check.action != "process":
+            logger.info(f"Pre-check {check.action} for {file_path} ({check.size} bytes): {check.reason}")
+        return check
+    
+    def process_file(self, file_path: str, gate: bool = False,
+                     file_check: Optional[FileCheck] = None) -> Tuple[str, str, List[Dict[str, str]], Optional[Dict]]:
+        """Process a file and return (title, body, tags, security_report); raises SkippedFileError for binary or minified files"""
+        title, body, tags = self._convert_file(file_path, file_check)
         
         # Perform security scan
         security_report = None
         if self.enable_security_scan and self.security_scanner:
-            security_report = self._perform_security_scan(body, file_path)
+            security_report = self._perform_security_scan(body, file_path, gate)
         
         return title, body, tags, security_report
     
-    def _perform_security_scan(self, content: str, file_path: str) -> Dict:
+    def _convert_file(self, file_path: str,
+                      file_check: Optional[FileCheck] = None) -> Tuple[str, str, List[Dict[str, str]]]:
+        """Pre-check a file and convert it to (title, body, tags)"""
+        check = file_check or self.inspect_file(file_path)
+        if check.action == "skip":
+            raise SkippedFileError(check.reason)
+        
+        path = Path(file_path)
+        extension = path.suffix.lower()
+        
+        if extension not in self.processors:
+            return self._process_generic(file_path)
+        return self.processors[extension](file_path)
+    
+    def process_many(self, file_paths: Iterable[str], window: int = PROCESS_MANY_WINDOW,
+                     read_workers: int = PROCESS_MANY_READ_WORKERS,
+                     scan_workers: Optional[int] = None) -> Iterator[Tuple[str, Any, Any, Any, Dict]]:
+        """Process many files on thread and process pools, yielding (path, title, body, tags, security_report) as each finishes"""
+        paths = iter(file_paths)
+        scan = self.enable_security_scan and self.security_scanner is not None
+        
+        # The process pool is created before any reader thread starts
+        scanners = None
+        if scan:
+            scanners = scan_pool(self.security_scanner.config_file, scan_workers,
+                                 use_cache=self.security_scanner.cache is not None)
+        try:
+            with ThreadPoolExecutor(max_workers=read_workers) as readers:
+                # future -> (path, (title, body, tags) once converted)
+                pending: Dict[Any, Tuple[str, Any]] = {}
+                exhausted = False
+                while True:
+                    while not exhausted and len(pending) < window:
+                        path = next(paths, None)
+                        if path is None:
+                            exhausted = True
+                            break
+                        pending[readers.submit(self._convert_file, path)] = (path, None)
+                    if not pending:
+                        break
+                    
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, converted = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except SkippedFileError as e:
+                            yield path, None, None, None, {
+                                "status": "skipped", "message": str(e), "total_issues": 0
+                            }
+                            continue
+                        except Exception as e:
+                            if converted is not None:
+                                logger.error(f"Security scan failed for {path}: {e}")
+                                yield (path, *converted, {
+                                    "status": "error",
+                                    "message": f"セキュリティスキャンでエラーが発生しました: {e}",
+                                    "total_issues": 0
+                                })
+                                continue
+                            logger.error(f"Failed to process {path}: {e}")
+                            yield path, None, None, None, {
+                                "status": "error",
+                                "message": f"ファイルの処理でエラーが発生しました: {e}",
+                                "total_issues": 0
+                            }
+                            continue
+                        
+                        if converted is not None:
+                            # A finished scan of an already converted file
+                            title, body, tags = converted
+                            yield path, title, body, tags, result
+                        elif scanners is not None:
+                            title, body, tags = result
+                            pending[scanners.submit(scan_body, path, body)] = (path, result)
+                        else:
+                            title, body, tags = result
+                            yield path, title, body, tags, None
+        finally:
+            if scanners is not None:
+                scanners.shutdown(cancel_futures=True)
+    
+    def _perform_security_scan(self, content: str, file_path: str, gate: bool = False) -> Dict:
         """Perform security scan on content"""
         try:
-            issues = self.security_scanner.scan_content(content, file_path)
+            skip_levels: Tuple[str, ...] = ()
+            if gate:
+                try:
+                    blocking = self.security_scanner.find_blocking_issue(content)
+                except IncompleteScanError as e:
+                    # Not every critical rule ran, so the upload cannot be cleared
+                    logger.warning(f"Security gate could not clear {file_path}: {e}")
+                    return {
+                        "status": "error",
+                        "message": f"❌ {e}",
+                        "total_issues": 0,
+                        "timed_out_rules": e.timed_out_rules
+                    }
+                if blocking:
+                    logger.info(f"Security gate blocked {file_path}: {blocking.category} "
+                                f"at line {blocking.line_number}")
+                    return self.security_scanner.get_gate_report(blocking)
+                # The gate evaluated every critical rule in full and found nothing
+                skip_levels = ("critical",)
+            
+            issues = self.security_scanner.scan_incremental(content, file_path, skip_levels)
             report = self.security_scanner.get_security_report(issues)
             
             logger.info(f"Security scan completed for {file_path}: {report['total_issues']} issues found")
@@ -70,22 +213,85 @@ class ContentProcessor:
             }
     
     def should_block_upload(self, security_report: Optional[Dict]) -> bool:
-        """Check if upload should be blocked based on security report"""
+        """Check if upload should be blocked based on security report; a failed scan blocks too"""
         if not security_report or not self.security_scanner:
             return False
         
-        return security_report.get("status") == "critical"
+        return security_report.get("status") in ("critical", "error")
+    
+    def split_body(self, title: str, body: str) -> List[Tuple[str, str]]:
+        """Split a body longer than max_body_chars into (title, body) parts at headings or definitions"""
+        if len(body) <= self.max_body_chars:
+            return [(title, body)]
+        
+        lines = body.split('\n')
+        # Fence opener in effect at the start of each line ("" outside code blocks)
+        openers = []
+        opener = ""
+        for line in lines:
+            openers.append(opener)
+            fence = _FENCE_RE.match(line)
+            if fence:
+                if not opener:
+                    opener = line
+                elif line.strip() == fence.group(1)[0] * len(fence.group(1)):
+                    opener = ""
+        
+        def is_split_point(i: int) -> bool:
+            if openers[i]:
+                return bool(_DEFINITION_RE.match(lines[i])) and not lines[i - 1].startswith('@')
+            return bool(_HEADING_RE.match(lines[i]))
+        
+        cuts = []
+        start, size, split_point = 0, 0, None
+        for i, line in enumerate(lines):
+            if i > start and size + len(line) + 1 > self.max_body_chars:
+                cut = split_point if split_point is not None else i
+                cuts.append(cut)
+                start = cut
+                size = sum(len(l) + 1 for l in lines[cut:i])
+                split_point = None
+            if i > start and is_split_point(i):
+                split_point = i
+            size += len(line) + 1
+        
+        chunks = []
+        bounds = [0] + cuts + [len(lines)]
+        for begin, end in zip(bounds, bounds[1:]):
+            chunk = lines[begin:end]
+            if openers[begin]:
+                chunk.insert(0, openers[begin])
+            if end < len(lines) and openers[end]:
+                chunk.append(_FENCE_RE.match(openers[end]).group(1))
+            chunks.append('\n'.join(chunk))
+        
+        total = len(chunks)
+        part_titles = [f"{title} (Part {i}/{total})" for i in range(1, total + 1)]
+        parts = []
+        for i, chunk in enumerate(chunks):
+            navigation = [f"> {title} は {total} 部構成です（Part {i + 1}/{total}）"]
+            if i > 0:
+                navigation.append(f"> 前: {part_titles[i - 1]}")
+            if i < total - 1:
+                navigation.append(f"> 次: {part_titles[i + 1]}")
+            parts.append((part_titles[i], '\n'.join(navigation) + '\n\n' + chunk))
+        return parts
     
     def add_security_warning_to_content(self, body: str, security_report: Dict) -> str:
         """Add security warning to content if issues found"""
-        if not security_report or security_report.get("total_issues", 0) == 0:
+        warning_section = self.security_warning(security_report)
+        if not warning_section:
             return body
         
-        warning_section = self._generate_security_warning_section(security_report)
-        
         # Add warning at the beginning of the content
         return f"{warning_section}\n\n{body}"
     
+    def security_warning(self, security_report: Optional[Dict]) -> str:
+        """Warning section for a report, or "" if it has no issues"""
+        if not security_report or security_report.get("total_issues", 0) == 0:
+            return ""
+        return self._generate_security_warning_section(security_report)
+    
     def _generate_security_warning_section(self, security_report: Dict) -> str:
         """Generate security warning section for content"""
         if security_report.get("status") == "critical":
@@ -134,14 +340,18 @@ class ContentProcessor:
         }
         return category_names.get(category, category)
     
+    def read_source(self, file_path: str) -> str:
+        """Decoded source of a file, as embedded in its body"""
+        return self._read_file_content(file_path)
+    
     def _read_file_content(self, file_path: str) -> str:
-        """Read file content with encoding detection"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            with open(file_path, 'r', encoding='shift_jis') as f:
-                return f.read()
+        """Read file content with encoding detection (UTF-8, CP932, EUC-JP)"""
+        size = os.path.getsize(file_path)
+        if size <= self.max_file_bytes:
+            return self.text_decoder.read(file_path)
+        
+        content = self.text_decoder.read(file_path, self.max_file_bytes)
+        return f"{content}\n\n... (以下省略: 全{size}バイト中、先頭{self.max_file_bytes}バイトまでを表示)"
     
     def _extract_title_from_content(self, content: str, filename: str) -> str:
         """Extract title from content or use filename"""
@@ -175,32 +385,36 @@ class ContentProcessor:
         # Extract tags from front matter or content
         tags = self._extract_tags_from_content(content)
         
-        # Add timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        body = f"{content}\n\n---\n*Last updated: {timestamp}*\n*Source: {Path(file_path).name}*"
+        body = f"{content}\n\n{self._footer(file_path)}"
         
         return title, body, tags
     
     def _process_python(self, file_path: str) -> Tuple[str, str, List[Dict[str, str]]]:
         """Process Python file"""
         content = self._read_file_content(file_path)
-        title = self._extract_title_from_content(content, file_path)
+        outline = extract_outline(content)
+        
+        # The module docstring is a better title than the first comment
+        title = (outline and outline.title) or self._extract_title_from_content(content, file_path)
+        
+        # Table of contents of the top-level functions and classes
+        contents = ""
+        if outline and len(outline.definitions) >= 2:
+            contents = f"## 目次\n\n{outline.table_of_contents()}\n\n"
         
         # Create markdown with code block
         body = f"""# {title}
 
 Pythonコードファイル: `{Path(file_path).name}`
 
-```python
+{contents}```python
 {content}
 ```
 
----
-*Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*
-*Source: {Path(file_path).name}*
+{self._footer(file_path)}
 """
         
-        tags = [{"name": "Python", "versions": []}]
+        tags = outline.tags() if outline else [{"name": "Python", "versions": []}]
         return title, body, tags
     
     def _process_javascript(self, file_path: str) -> Tuple[str, str, List[Dict[str, str]]]:
@@ -216,9 +430,7 @@ JavaScriptコードファイル: `{Path(file_path).name}`
 {content}
 ```
 
----
-*Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*
-*Source: {Path(file_path).name}*
+{self._footer(file_path)}
 """
         
         tags = [{"name": "JavaScript", "versions": []}]
@@ -237,9 +449,7 @@ TypeScriptコードファイル: `{Path(file_path).name}`
 {content}
 ```
 
----
-*Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*
-*Source: {Path(file_path).name}*
+{self._footer(file_path)}
 """
         
         tags = [{"name": "TypeScript", "versions": []}]
@@ -258,14 +468,69 @@ TypeScriptコードファイル: `{Path(file_path).name}`
 {content}
 ```
 
----
-*Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*
-*Source: {Path(file_path).name}*
+{self._footer(file_path)}
 """
         
         tags = [{"name": "備忘録", "versions": []}]
         return title, body, tags
     
+    def _process_notebook(self, file_path: str) -> Tuple[str, str, List[Dict[str, str]]]:
+        """Process Jupyter notebook (outputs reduced to capped text, attachments dropped)"""
+        notebook = read_notebook(file_path)
+        markdown_text = '\n'.join(c.source for c in notebook.cells if c.cell_type == "markdown")
+        title = self._extract_title_from_content(markdown_text, file_path)
+        
+        sections = []
+        for cell in notebook.cells:
+            if not cell.source.strip() and not cell.output:
+                continue
+            if cell.cell_type == "markdown":
+                sections.append(cell.source)
+                continue
+            language = notebook.language if cell.cell_type == "code" else ""
+            sections.append(f"```{language}\n{cell.source}\n```")
+            if cell.output:
+                note = "\n*（出力は一部省略）*" if cell.output_truncated else ""
+                sections.append(f"```text\n{cell.output}\n```{note}")
+        cells = '\n\n'.join(sections)
+        
+        body = f"""# {title}
+
+Jupyter Notebook: `{Path(file_path).name}`
+
+{cells}
+
+{self._footer(file_path)}
+"""
+        
+        tags = [{"name": "Jupyter", "versions": []}]
+        if notebook.language:
+            tags.append({"name": "Python" if notebook.language == "python" else notebook.language,
+                         "versions": []})
+        return title, body, tags
+    
+    def _process_table(self, file_path: str) -> Tuple[str, str, List[Dict[str, str]]]:
+        """Process CSV/TSV file (first rows only, with row and column counts)"""
+        delimiter = '\t' if Path(file_path).suffix.lower() == '.tsv' else ','
+        preview = read_table_preview(file_path, delimiter, self.text_decoder)
+        title = Path(file_path).stem.replace('_', ' ').replace('-', ' ').title()
+        
+        approx = "" if preview.row_count_exact else "約"
+        summary = f"{approx}{preview.row_count:,}行 × {preview.column_count}列"
+        shown = f"先頭{len(preview.rows)}行を表示" if len(preview.rows) < preview.row_count else "全行を表示"
+        
+        body = f"""# {title}
+
+データファイル: `{Path(file_path).name}` ({summary}、{shown})
+
+{preview.markdown_table()}
+
+{self._footer(file_path)}
+"""
+        
+        tags = [{"name": "CSV", "versions": []}]
+        return title, body, tags
+    
     def _process_rst(self, file_path: str) -> Tuple[str, str, List[Dict[str, str]]]:
         """Process reStructuredText file"""
         content = self._read_file_content(file_path)
@@ -280,9 +545,7 @@ reStructuredTextファイル: `{Path(file_path).name}`
 {content}
 ```
 
----
-*Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*
-*Source: {Path(file_path).name}*
+{self._footer(file_path)}
 """
         
         tags = [{"name": "ドキュメント", "versions": []}]
@@ -302,14 +565,20 @@ reStructuredTextファイル: `{Path(file_path).name}`
 {content}
 ```
 
----
-*Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}*
-*Source: {Path(file_path).name}*
+{self._footer(file_path)}
 """
         
         tags = [{"name": "その他", "versions": []}]
         return title, body, tags
     
+    def _footer(self, file_path: str) -> str:
+        """Footer appended to every body; timestamped unless stable_body is set"""
+        source = f"*Source: {Path(file_path).name}*"
+        if self.stable_body:
+            return f"---\n{source}"
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return f"---\n*Last updated: {timestamp}*\n{source}"
+    
     def _extract_tags_from_content(self, content: str) -> List[Dict[str, str]]:
         """Extract tags from content"""
         tags = []
@@ -0,0 +1,142 @@
+"""
+"Diff article" mode: publish only what changed in a source file since its last upload
+"""
+import difflib
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .python_outline import extract_outline
+from .qiita_client import QiitaClient, QiitaDraft
+from .state_store import UploadStateStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = ".autoqiita/snapshots"
+
+# Source files eligible for diff articles
+DIFF_EXTENSIONS = {".py", ".ts", ".js"}
+# Smaller files are always uploaded in full
+DIFF_MIN_CHARS = 10000
+# Context lines around each hunk
+DIFF_CONTEXT_LINES = 3
+
+class SnapshotStore:
+    """Source of each file as of its last full upload, kept locally to diff against"""
+
+    def __init__(self, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+
+    def _path(self, file_path: str) -> Path:
+        key = hashlib.sha256(str(Path(file_path).resolve()).encode("utf-8")).hexdigest()
+        return self.snapshot_dir / f"{key}.txt"
+
+    def load(self, file_path: str) -> Optional[str]:
+        """Source as of the last full upload, or None"""
+        try:
+            with open(self._path(file_path), 'r', encoding='utf-8', errors='surrogatepass',
+                      newline='') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.debug(f"Could not read snapshot of {file_path}: {e}")
+            return None
+
+    def save(self, file_path: str, source: str) -> None:
+        """Remember source as the version in the full draft of file_path"""
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(file_path)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, 'w', encoding='utf-8', errors='surrogatepass', newline='') as f:
+                f.write(source)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.error(f"Could not write snapshot of {file_path}: {e}")
+
+def is_diff_candidate(file_path: str, source: str) -> bool:
+    """True if file_path is a source file big enough for diff articles"""
+    return Path(file_path).suffix.lower() in DIFF_EXTENSIONS and len(source) >= DIFF_MIN_CHARS
+
+def _changed_lines(hunks: List[str]) -> List[Tuple[int, int]]:
+    """(first, last) new-file line ranges touched by unified diff hunks"""
+    ranges = []
+    for line in hunks:
+        if not line.startswith("@@"):
+            continue
+        new = line.split(" ")[2]  # "+start,count"
+        start, _, count = new[1:].partition(",")
+        start, count = int(start), int(count or 1)
+        ranges.append((start, start + max(count, 1) - 1))
+    return ranges
+
+def _changed_definitions(file_path: str, source: str, hunks: List[str]) -> List[str]:
+    """Signatures of top-level Python definitions overlapping the changed lines"""
+    if Path(file_path).suffix.lower() != ".py":
+        return []
+    outline = extract_outline(source)
+    if outline is None:
+        return []
+    ranges = _changed_lines(hunks)
+    return [
+        definition.signature for definition in outline.definitions
+        if any(first <= definition.end_line_number and last >= definition.line_number
+               for first, last in ranges)
+    ]
+
+def build_diff_body(title: str, file_path: str, old_source: str, new_source: str,
+                    full_url: Optional[str]) -> Optional[str]:
+    """Markdown body with the unified diff hunks from old_source to new_source, or None"""
+    name = Path(file_path).name
+    hunks = list(difflib.unified_diff(
+        old_source.splitlines(), new_source.splitlines(),
+        fromfile=f"{name} (前回)", tofile=f"{name} (今回)",
+        n=DIFF_CONTEXT_LINES, lineterm=""
+    ))
+    if not hunks:
+        return None
+
+    sections = [f"# {title} の変更差分", ""]
+    if full_url:
+        sections += [f"全文: {full_url}", ""]
+    definitions = _changed_definitions(file_path, new_source, hunks)
+    if definitions:
+        sections += ["## 変更された定義", ""]
+        sections += [f"- `{signature}`" for signature in definitions]
+        sections.append("")
+    sections += ["## 差分", "", "```diff", *hunks, "```", "", f"*Source: {name}*"]
+    return '\n'.join(sections)
+
+def upload_diff_article(qiita_client: QiitaClient, state_store: UploadStateStore,
+                        snapshots: SnapshotStore, file_path: str, content_hash: str,
+                        title: str, source: str, full_body: str,
+                        tags: Optional[List[Dict[str, str]]] = None,
+                        warning: str = "") -> Optional[Dict[str, Any]]:
+    """Upload the changes since the last full upload as a separate diff draft, or return None"""
+    previous = state_store.get(file_path)
+    if not previous or not previous.get("item_id") or previous.get("parts"):
+        return None
+    old_source = snapshots.load(file_path)
+    if old_source is None:
+        return None
+
+    body = build_diff_body(title, file_path, old_source, source, previous.get("url"))
+    if body is None:
+        return None
+    if warning:
+        body = f"{warning}\n\n{body}"
+    if len(body) >= len(full_body):
+        return None
+
+    draft = QiitaDraft(title=f"{title} (差分)", body=body, tags=tags or [], private=True)
+    if previous.get("diff_item_id"):
+        result = qiita_client.update_draft(previous["diff_item_id"], draft)
+    else:
+        result = qiita_client.create_draft(draft)
+    logger.info(f"Uploaded diff article for {file_path} ({len(body)} of {len(full_body)} chars)")
+
+    state_store.record_diff_upload(file_path, content_hash, result)
+    return result
@@ -0,0 +1,58 @@
+"""
+Upload of large documents as a linked series of drafts
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .qiita_client import QiitaClient, QiitaDraft
+from .state_store import UploadStateStore, body_hash
+
+logger = logging.getLogger(__name__)
+
+def upload_series(qiita_client: QiitaClient, state_store: UploadStateStore, file_path: str,
+                  content_hash: str, parts: List[Tuple[str, str]],
+                  tags: Optional[List[Dict[str, str]]] = None,
+                  force: bool = False) -> List[Dict[str, Any]]:
+    """Upload the parts of a split document, touching only the parts that changed"""
+    entry = state_store.get(file_path) or {}
+    previous = entry.get("parts") or []
+    records: List[Dict[str, Any]] = []
+    results: List[Dict[str, Any]] = []
+
+    try:
+        for i, (title, body) in enumerate(parts):
+            digest = body_hash(body)
+            old = previous[i] if i < len(previous) else None
+            if i == 0 and not previous and entry.get("item_id"):
+                # Turn the single draft into part 1 instead of leaving it orphaned
+                old = {"item_id": entry["item_id"]}
+
+            if old and old.get("item_id") and old.get("body_hash") == digest and not force:
+                records.append(old)
+                results.append({"part": i + 1, "title": title, "id": old["item_id"],
+                                "url": old.get("url"), "skipped": True})
+                continue
+
+            draft = QiitaDraft(title=title, body=body, tags=tags or [], private=True)
+            if old and old.get("item_id"):
+                result = qiita_client.update_draft(old["item_id"], draft)
+            else:
+                result = qiita_client.create_draft(draft)
+            logger.info(f"Uploaded part {i + 1}/{len(parts)} of {file_path} (ID: {result.get('id')})")
+
+            records.append({"title": title, "body_hash": digest,
+                            "item_id": result.get("id"), "url": result.get("url")})
+            results.append({"part": i + 1, "title": title, "id": result.get("id"),
+                            "url": result.get("url"), "skipped": False})
+    finally:
+        complete = len(records) == len(parts)
+        if complete and len(previous) > len(parts):
+            stale = [p.get("item_id") for p in previous[len(parts):]]
+            logger.warning(f"{file_path} now has {len(parts)} parts; drafts {stale} are no longer updated")
+        # Keep the old state of parts not reached, and force a retry next time
+        state_store.record_series(
+            file_path, content_hash if complete else None,
+            records if complete else records + previous[len(records):]
+        )
+
+    return results
@@ -25,6 +25,7 @@ class FileExtensionManager:
             '.jsx': 'JavaScript React files',
             '.txt': 'Text files',
             '.rst': 'reStructuredText files',
+            '.ipynb': 'Jupyter notebooks',
             '.json': 'JSON files',
             '.yaml': 'YAML files',
             '.yml': 'YAML files',
@@ -52,7 +53,8 @@ class FileExtensionManager:
             '.toml': 'TOML files',
             '.ini': 'INI files',
             '.xml': 'XML files',
-            '.csv': 'CSV files'
+            '.csv': 'CSV files',
+            '.tsv': 'TSV files'
         }
         self.load_extensions()
     
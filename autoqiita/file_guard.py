@@ -0,0 +1,92 @@
+"""
+Cheap pre-checks that keep binary, minified and oversized files out of the pipeline
+"""
+import os
+import logging
+from dataclasses import dataclass
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# Files larger than this are uploaded as a truncated preview
+MAX_FILE_BYTES = 1024 * 1024
+# Bytes read from the head of a file to sniff its content
+SNIFF_BYTES = 8 * 1024
+# A line this long marks a data/generated file as minified
+MINIFIED_LINE_BYTES = 4 * 1024
+# Bytes read at a time when looking for long lines
+LINE_CHECK_CHUNK = 256 * 1024
+# Extensions that are commonly minified or machine generated; prose and
+# source files (.md, .txt, .py, ...) may legitimately have long lines
+MINIFIED_CHECK_EXTENSIONS = {
+    '.js', '.mjs', '.cjs', '.css', '.json', '.map', '.svg', '.xml', '.html', '.htm', '.lock'
+}
+
+_UTF16_BOMS = (b"\xff\xfe", b"\xfe\xff")
+
+@dataclass
+class FileCheck:
+    """Outcome of inspect_file"""
+    action: str  # 'process', 'preview' or 'skip'
+    reason: str = ""
+    size: int = 0
+
+class SkippedFileError(Exception):
+    """Raised when a file is not suitable for upload"""
+    pass
+
+def is_minified_candidate(file_path: str) -> bool:
+    """True for data/generated file types (and any *.min.* file)"""
+    name = os.path.basename(file_path).lower()
+    return os.path.splitext(name)[1] in MINIFIED_CHECK_EXTENSIONS or ".min." in name
+
+def _has_long_line(f: BinaryIO, head: bytes, max_bytes: int) -> bool:
+    """True if the first max_bytes of the file contain a line of at least MINIFIED_LINE_BYTES"""
+    run = 0  # length of the line still open at the end of the data seen so far
+    chunk = head
+    remaining = max_bytes - len(head)
+    while chunk:
+        lines = chunk.split(b"\n")
+        run += len(lines[0])
+        if len(lines) > 1:
+            if run >= MINIFIED_LINE_BYTES:
+                return True
+            run = len(lines[-1])
+            if max(map(len, lines[1:-1]), default=0) >= MINIFIED_LINE_BYTES:
+                return True
+        if run >= MINIFIED_LINE_BYTES:
+            return True
+        if remaining <= 0:
+            break
+        chunk = f.read(min(LINE_CHECK_CHUNK, remaining))
+        remaining -= len(chunk)
+    return False
+
+def inspect_file(file_path: str, max_bytes: int = MAX_FILE_BYTES,
+                 streamed: bool = False, force: bool = False) -> FileCheck:
+    """Decide from its size and content whether a file is skipped, previewed or processed"""
+    size = os.stat(file_path).st_size
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+
+        if b"\0" in head and not head.startswith(_UTF16_BOMS):
+            return FileCheck("skip", "バイナリファイルのためスキップしました", size)
+
+        if streamed:
+            return FileCheck("process", size=size)
+
+        if not force and is_minified_candidate(file_path) and _has_long_line(f, head, max_bytes):
+            return FileCheck(
+                "skip",
+                f"{MINIFIED_LINE_BYTES}バイト以上の行があるため、minify済み・自動生成ファイルとしてスキップしました",
+                size
+            )
+
+    if size > max_bytes:
+        return FileCheck(
+            "preview",
+            f"ファイルサイズ({size / 1024 / 1024:.1f}MB)が上限を超えるため先頭のみアップロードします",
+            size
+        )
+
+    return FileCheck("process", size=size)
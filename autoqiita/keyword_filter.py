@@ -0,0 +1,169 @@
+"""
+Literal keyword prefilter for security rules
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+# Upper bound on alternatives tracked while expanding literal sets
+MAX_ALTERNATIVES = 32
+# Character classes with more members than this are not expanded
+MAX_CLASS_SIZE = 8
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+if hasattr(sre_parse, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_parse.POSSESSIVE_REPEAT)
+
+# (exact strings the element can match, literals one of which must appear)
+_Literals = Tuple[Optional[Set[str]], Optional[Set[str]]]
+
+def _score(candidates: Optional[Set[str]]) -> Tuple[int, int]:
+    """Rank a literal set: longer shortest member first, then fewer members"""
+    if not candidates or "" in candidates:
+        return (0, 0)
+    return (min(len(c) for c in candidates), -len(candidates))
+
+def _best(*candidates: Optional[Set[str]]) -> Optional[Set[str]]:
+    best = max(candidates, key=_score, default=None)
+    return best if _score(best)[0] > 0 else None
+
+def _product(left: Set[str], right: Set[str]) -> Optional[Set[str]]:
+    if len(left) * len(right) > MAX_ALTERNATIVES:
+        return None
+    return {a + b for a in left for b in right}
+
+def _analyze_sequence(items) -> _Literals:
+    run: Optional[Set[str]] = {""}
+    exact = True
+    required: Optional[Set[str]] = None
+
+    for op, av in items:
+        item_exact, item_required = _analyze_item(op, av)
+        if item_exact is not None:
+            combined = _product(run, item_exact)
+            if combined is not None:
+                run = combined
+                continue
+            required = _best(required, run, item_exact)
+            run = item_exact
+            exact = False
+            continue
+        required = _best(required, run, item_required)
+        run = {""}
+        exact = False
+
+    if exact:
+        return run, _best(run)
+    return None, _best(required, run)
+
+def _analyze_item(op, av) -> _Literals:
+    if op is sre_parse.LITERAL:
+        return {chr(av)}, None
+    if op is sre_parse.AT:
+        return {""}, None
+    if op is sre_parse.SUBPATTERN:
+        return _analyze_sequence(av[-1])
+    if op is sre_parse.IN:
+        if len(av) <= MAX_CLASS_SIZE and all(o is sre_parse.LITERAL for o, _ in av):
+            return {chr(c) for _, c in av}, None
+        return None, None
+    if op is sre_parse.BRANCH:
+        exacts: Optional[Set[str]] = set()
+        requireds: Optional[Set[str]] = set()
+        for branch in av[1]:
+            branch_exact, branch_required = _analyze_sequence(branch)
+            if exacts is not None and branch_exact is not None:
+                exacts |= branch_exact
+            else:
+                exacts = None
+            branch_best = _best(branch_required, branch_exact)
+            if requireds is not None and branch_best is not None:
+                requireds |= branch_best
+            else:
+                requireds = None
+        if exacts is not None and len(exacts) > MAX_ALTERNATIVES:
+            exacts = None
+        if requireds is not None and len(requireds) > MAX_ALTERNATIVES:
+            requireds = None
+        return exacts, requireds
+    if op in _REPEATS:
+        low, high, item = av
+        item_exact, item_required = _analyze_sequence(item)
+        if item_exact is not None and low == high and low <= MAX_ALTERNATIVES:
+            repeated: Optional[Set[str]] = {""}
+            for _ in range(low):
+                repeated = _product(repeated, item_exact) if repeated else None
+            if repeated is not None:
+                return repeated, _best(repeated)
+        if low >= 1:
+            return None, _best(item_required, item_exact)
+        return None, None
+    return None, None
+
+def extract_required_literals(pattern: str) -> Optional[Set[str]]:
+    """Literals of which at least one appears in every match of pattern, or None"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return None
+    _, required = _analyze_sequence(list(parsed))
+    if not required or any("\n" in literal for literal in required):
+        return None
+    return required
+
+def max_match_width(pattern: str) -> Optional[int]:
+    """Longest possible match of pattern in characters, or None if unbounded"""
+    try:
+        width = sre_parse.parse(pattern).getwidth()[1]
+    except (re.error, RecursionError):
+        return None
+    return None if width >= sre_parse.MAXREPEAT else width
+
+# Characters that re.IGNORECASE equates with ASCII letters but str.lower() keeps
+_FOLD_TABLE = str.maketrans({"\u017f": "s", "\u212a": "k", "\u0130": "i", "\u0131": "i"})
+
+def fold_case(text: str) -> str:
+    """Case-fold text the way re.IGNORECASE compares ASCII keywords"""
+    if text.isascii():
+        return text.lower()
+    return text.translate(_FOLD_TABLE).lower()
+
+class KeywordPrefilter:
+    """Locate the lines that contain any of a fixed set of keywords with str.find"""
+
+    def __init__(self, keywords: Iterable[str]):
+        unique: Dict[str, int] = {}
+        for keyword in keywords:
+            if keyword:
+                unique.setdefault(fold_case(keyword), len(unique))
+        self._ids = unique
+        self.keywords: List[str] = list(unique)
+
+    def keyword_id(self, keyword: str) -> int:
+        return self._ids[fold_case(keyword)]
+
+    def find(self, content: str,
+             keyword_ids: Optional[Iterable[int]] = None) -> Tuple[str, Dict[int, List[int]]]:
+        """Return (folded content, keyword id -> offsets), with at most one offset per line for each keyword"""
+        folded = fold_case(content) if self.keywords else content
+        offsets: Dict[int, List[int]] = {}
+        find = folded.find
+        if keyword_ids is None:
+            keyword_ids = range(len(self.keywords))
+        for keyword_id in keyword_ids:
+            keyword = self.keywords[keyword_id]
+            found = []
+            pos = find(keyword)
+            while pos != -1:
+                found.append(pos)
+                line_end = find("\n", pos + len(keyword))
+                if line_end == -1:
+                    break
+                pos = find(keyword, line_end + 1)
+            if found:
+                offsets[keyword_id] = found
+        return folded, offsets
@@ -4,7 +4,7 @@ MCP (Model Context Protocol) Server for AutoQiita
 import json
 import asyncio
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 import os
 from datetime import datetime
@@ -17,8 +17,14 @@ import uvicorn
 
 # Local imports
 from .qiita_client import QiitaClient
+from .async_qiita_client import AsyncQiitaClient
+from .rate_limiter import AUTO, request_priority
 from .file_monitor import FileMonitor
 from .content_processor import ContentProcessor
+from .security_scanner import report_to_json
+from .state_store import UploadStateStore
+from .save_pipeline import BLOCKED, SAVED, SKIPPED, UNCHANGED, SavePipeline, SaveResult
+from .remote_mirror import RemoteMirror
 from .config import Config
 
 # Setup logging
@@ -38,9 +44,23 @@ class AutoQiitaMCPServer:
     
     def __init__(self, config: Config):
         self.config = config
-        self.qiita_client = QiitaClient(config.qiita_token)
-        self.content_processor = ContentProcessor()
+        self.qiita_client = QiitaClient(config.qiita_token, pool_size=config.qiita_pool_size,
+                                        connect_timeout=config.qiita_connect_timeout,
+                                        read_timeout=config.qiita_read_timeout,
+                                        mirror=RemoteMirror())
+        # Uploads from the event loop go through the async client
+        self.async_client = AsyncQiitaClient(self.qiita_client)
+        self.content_processor = ContentProcessor(
+            stable_body=config.stable_body, max_file_bytes=config.max_file_bytes,
+            max_body_chars=config.max_body_chars, diff_mode=config.diff_article_mode
+        )
+        self.state_store = UploadStateStore()
+        self.pipeline = SavePipeline(self.qiita_client, self.content_processor, self.state_store)
         self.file_monitor = None
+        # Event loop that file change events from the monitor thread are sent to
+        self.loop = None
+        # One save at a time per file; different files upload concurrently
+        self._save_locks: Dict[str, asyncio.Lock] = {}
         self.app = FastAPI(title="AutoQiita MCP Server")
         
         # Setup CORS
@@ -72,12 +92,20 @@ class AutoQiitaMCPServer:
                     return await self.handle_save_to_qiita(request.params)
                 elif request.method == "get_status":
                     return await self.handle_get_status(request.params)
+                elif request.method == "get_security_report":
+                    return await self.handle_get_security_report(request.params)
                 else:
                     return MCPResponse(error=f"Unknown method: {request.method}")
             except Exception as e:
                 logger.error(f"Error handling MCP request: {e}")
                 return MCPResponse(error=str(e))
         
+        @self.app.on_event("shutdown")
+        async def close_clients():
+            """Close pooled Qiita API connections"""
+            await self.async_client.aclose()
+            self.qiita_client.close()
+        
         @self.app.get("/health")
         async def health_check():
             """Health check endpoint"""
@@ -105,6 +133,7 @@ class AutoQiitaMCPServer:
             return MCPResponse(result={"status": "already_running"})
         
         try:
+            self.loop = asyncio.get_running_loop()
             self.file_monitor = FileMonitor(
                 workspace_path=self.config.workspace_path,
                 on_file_changed=self.on_file_changed,
@@ -140,65 +169,108 @@ class AutoQiitaMCPServer:
         except Exception as e:
             return MCPResponse(error=str(e))
     
+    async def handle_get_security_report(self, params: Dict[str, Any]) -> MCPResponse:
+        """Run a full security scan of a file (uploads only run the gate scan)"""
+        file_path = params.get("file_path")
+        if not file_path:
+            return MCPResponse(error="file_path is required")
+        
+        try:
+            # A full scan of a large file must not stall the event loop
+            _, _, _, security_report = await asyncio.to_thread(
+                self.content_processor.process_file, file_path
+            )
+            return MCPResponse(result={
+                "file_path": file_path,
+                "security_report": report_to_json(security_report)
+            })
+        except Exception as e:
+            return MCPResponse(error=str(e))
+    
     async def handle_get_status(self, params: Dict[str, Any]) -> MCPResponse:
         """Get server status"""
         return MCPResponse(result={
             "monitoring": self.file_monitor.is_running if self.file_monitor else False,
             "workspace_path": self.config.workspace_path,
             "watched_extensions": self.config.watched_extensions,
-            "qiita_connected": bool(self.config.qiita_token)
+            "qiita_connected": bool(self.config.qiita_token),
+            "qiita_api_latency": self.qiita_client.latency.summary(),
+            "qiita_rate_limit": self.qiita_client.rate_limiter.status()
         })
     
     def on_file_changed(self, file_path: str):
         """Handle file change event"""
         logger.info(f"Processing file change: {file_path}")
         
-        # Run async operation in background
-        asyncio.create_task(self.save_file_to_qiita(file_path))
+        # Called on the monitor thread: run the save on the server's event loop
+        asyncio.run_coroutine_threadsafe(self._auto_save(file_path), self.loop)
+    
+    async def _auto_save(self, file_path: str) -> Dict[str, Any]:
+        """Save triggered by the monitor; its requests yield to manual saves"""
+        with request_priority(AUTO):
+            return await self.save_file_to_qiita(file_path)
     
     async def save_file_to_qiita(self, file_path: str, force_upload: bool = False) -> Dict[str, Any]:
         """Save file content to Qiita draft with security checking"""
+        key = str(Path(file_path).resolve())
+        lock = self._save_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            return await self._save_file_to_qiita(file_path, force_upload)
+    
+    async def _save_file_to_qiita(self, file_path: str, force_upload: bool) -> Dict[str, Any]:
+        # File reads, scans and state store access run on worker threads so
+        # one large file does not stall other requests on the event loop
         try:
-            # Process file content with security scan
-            title, body, tags, security_report = self.content_processor.process_file(file_path)
-            
-            # Check if upload should be blocked
-            if security_report and not force_upload:
-                if self.content_processor.should_block_upload(security_report):
-                    logger.warning(f"Upload blocked for {file_path} due to security issues")
-                    return {
-                        "success": False,
-                        "file_path": file_path,
-                        "title": title,
-                        "blocked": True,
-                        "security_report": security_report,
-                        "message": "セキュリティ上の問題によりアップロードがブロックされました"
-                    }
-                
-                # Add security warning to content if issues found
-                if security_report.get("total_issues", 0) > 0:
-                    body = self.content_processor.add_security_warning_to_content(body, security_report)
-            
-            # Save to Qiita
-            result = self.qiita_client.find_or_create_draft(
-                title, body, tags, security_report, force_upload
+            pending = await asyncio.to_thread(
+                self.pipeline.prepare, file_path, force_upload, not force_upload
             )
+            if isinstance(pending, SaveResult):
+                return self._save_response(pending)
+            if not force_upload:
+                blocked = self.pipeline.blocked(pending)
+                if blocked is not None:
+                    return self._save_response(blocked)
             
-            logger.info(f"Saved to Qiita: {title} (ID: {result.get('id')})")
-            
-            return {
-                "success": True,
-                "file_path": file_path,
-                "qiita_id": result.get("id"),
-                "title": title,
-                "url": result.get("url"),
-                "security_report": security_report
-            }
+            # Diff articles and series use the blocking client; keep them off the event loop
+            result = await asyncio.to_thread(self.pipeline.publish, pending, not force_upload)
+            if result is None:
+                # Save to Qiita: one PATCH to the file's draft, or a new draft
+                item_id = await asyncio.to_thread(self.state_store.item_id, file_path)
+                draft = await self.async_client.find_or_create_draft(
+                    pending.title, pending.body, pending.tags, pending.security_report,
+                    force_upload, item_id=item_id
+                )
+                result = await asyncio.to_thread(self.pipeline.record, pending, draft)
+            return self._save_response(result)
             
         except Exception as e:
             logger.error(f"Failed to save to Qiita: {e}")
             raise
     
+    @staticmethod
+    def _save_response(result: SaveResult) -> Dict[str, Any]:
+        """Response of the save_file tool for a save result"""
+        response = {
+            "success": result.status in (SAVED, UNCHANGED),
+            "skipped": result.status in (UNCHANGED, SKIPPED),
+            "file_path": result.file_path,
+            "qiita_id": result.item_id,
+            "title": result.title,
+            "url": result.url
+        }
+        if result.status == BLOCKED:
+            response["blocked"] = True
+        if result.parts:
+            response["parts"] = result.parts
+        if result.diff is not None:
+            response["diff_id"] = result.diff.get("id")
+            response["diff_url"] = result.diff.get("url")
+        if result.message:
+            response["message"] = result.message
+        if result.security_report is not None:
+            response["security_report"] = report_to_json(result.security_report)
+        return response
+    
     def run(self, host: str = "localhost", port: int = 8000):
         """Run the MCP server"""
         logger.info(f"Starting AutoQiita MCP Server on {host}:{port}")
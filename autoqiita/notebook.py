@@ -0,0 +1,219 @@
+"""
+Streaming reader for Jupyter notebooks that skips outputs and attachments
+"""
+import json
+import logging
+import mmap
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple
+
+# Characters of text output kept per cell
+OUTPUT_MAX_CHARS = 2000
+# JSON strings longer than this (in bytes) are only decoded up to this size
+MAX_DECODED_STRING_BYTES = 256 * 1024
+
+_WS_RE = re.compile(rb"[ \t\r\n]*")
+_STRUCTURAL_RE = re.compile(rb'["\[\]{}]')
+_SCALAR_RE = re.compile(rb"[^,\]}\s]+")
+
+_QUOTE, _BACKSLASH = 0x22, 0x5C
+_OPENERS = (0x7B, 0x5B)  # { [
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class NotebookCell:
+    cell_type: str  # 'markdown', 'code' or 'raw'
+    source: str
+    output: str = ""
+    output_truncated: bool = False
+
+@dataclass
+class Notebook:
+    language: str = "python"
+    cells: List[NotebookCell] = field(default_factory=list)
+
+# The scanner below walks the raw bytes and only decodes the small values it
+# needs.  Strings are skipped with bytes.find (base64 images are one long
+# string), containers by jumping between structural characters with a regex,
+# so large outputs are passed over at C speed without being parsed.
+
+def _ws(buf, pos: int) -> int:
+    return _WS_RE.match(buf, pos).end()
+
+def _string_end(buf, pos: int) -> int:
+    """Offset just past the JSON string starting at pos"""
+    i = pos + 1
+    while True:
+        quote = buf.find(b'"', i)
+        if quote == -1:
+            raise ValueError("Unterminated string in notebook JSON")
+        backslash = quote
+        while buf[backslash - 1] == _BACKSLASH:
+            backslash -= 1
+        if (quote - backslash) % 2 == 0:
+            return quote + 1
+        i = quote + 1
+
+def _container_end(buf, pos: int) -> int:
+    """Offset just past the object or array starting at pos"""
+    depth = 0
+    i = pos
+    while True:
+        match = _STRUCTURAL_RE.search(buf, i)
+        if match is None:
+            raise ValueError("Unterminated container in notebook JSON")
+        i = match.start()
+        char = buf[i]
+        if char == _QUOTE:
+            i = _string_end(buf, i)
+            continue
+        depth += 1 if char in _OPENERS else -1
+        i += 1
+        if depth == 0:
+            return i
+
+def _value_end(buf, pos: int) -> int:
+    char = buf[pos]
+    if char == _QUOTE:
+        return _string_end(buf, pos)
+    if char in _OPENERS:
+        return _container_end(buf, pos)
+    return _SCALAR_RE.match(buf, pos).end()
+
+def _iter_object(buf, pos: int) -> Iterator[Tuple[str, int, int]]:
+    """Yield (key, value start, value end) for the object starting at pos"""
+    i = _ws(buf, pos + 1)
+    if buf[i] == 0x7D:
+        return
+    while True:
+        key_end = _string_end(buf, i)
+        key = json.loads(buf[i:key_end])
+        i = _ws(buf, _ws(buf, key_end) + 1)  # skip ':'
+        end = _value_end(buf, i)
+        yield key, i, end
+        i = _ws(buf, end)
+        if buf[i] != 0x2C:  # ','
+            return
+        i = _ws(buf, i + 1)
+
+def _iter_array(buf, pos: int) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) of each item of the array starting at pos"""
+    i = _ws(buf, pos + 1)
+    if buf[i] == 0x5D:
+        return
+    while True:
+        end = _value_end(buf, i)
+        yield i, end
+        i = _ws(buf, end)
+        if buf[i] != 0x2C:
+            return
+        i = _ws(buf, i + 1)
+
+def _string_prefix(buf, start: int, size: int) -> str:
+    """Decode about the first size bytes of the JSON string starting at start"""
+    chunk = bytes(buf[start + 1:start + 1 + size])
+    # Back off an escape sequence or UTF-8 character cut in half
+    for cut in range(len(chunk), max(len(chunk) - 12, -1), -1):
+        try:
+            return json.loads(b'"' + chunk[:cut] + b'"')
+        except ValueError:
+            continue
+    return ""
+
+def _text(buf, start: int, end: int, limit: int = 0) -> Tuple[str, bool]:
+    """Decode a string or list-of-strings value (source, text); returns (text, truncated)"""
+    if buf[start] == _QUOTE:
+        spans = [(start, end)]
+    elif buf[start] == 0x5B:
+        spans = _iter_array(buf, start)
+    else:
+        return "", False
+
+    pieces = []
+    size = 0
+    for item_start, item_end in spans:
+        if item_end - item_start > MAX_DECODED_STRING_BYTES:
+            logger.warning(f"Notebook string of {item_end - item_start} bytes truncated "
+                           f"to {MAX_DECODED_STRING_BYTES} bytes")
+            pieces.append(_string_prefix(buf, item_start, MAX_DECODED_STRING_BYTES))
+            pieces.append(f"\n…（{item_end - item_start}バイトの文字列のため以降は省略）")
+            text = "".join(pieces)
+            return (text[:limit] if limit else text), True
+        piece = json.loads(buf[item_start:item_end])
+        if not isinstance(piece, str):
+            continue
+        pieces.append(piece)
+        size += len(piece)
+        if limit and size >= limit:
+            return "".join(pieces)[:limit], True
+    return "".join(pieces), False
+
+def _outputs(buf, start: int, end: int) -> Tuple[str, bool]:
+    """Text of stream and text/plain outputs, capped at OUTPUT_MAX_CHARS"""
+    texts = []
+    size = 0
+    truncated = False
+    for output_start, _ in _iter_array(buf, start):
+        if buf[output_start] != 0x7B:
+            continue
+        for key, value_start, value_end in _iter_object(buf, output_start):
+            if key == "text":
+                text, cut = _text(buf, value_start, value_end, OUTPUT_MAX_CHARS - size)
+            elif key == "data" and buf[value_start] == 0x7B:
+                text, cut = "", False
+                for mime, mime_start, mime_end in _iter_object(buf, value_start):
+                    if mime == "text/plain":
+                        text, cut = _text(buf, mime_start, mime_end, OUTPUT_MAX_CHARS - size)
+            else:
+                continue
+            texts.append(text)
+            size += len(text)
+            truncated = truncated or cut
+            if size >= OUTPUT_MAX_CHARS:
+                return "\n".join(texts), True
+    return "\n".join(texts), truncated
+
+def read_notebook(file_path: str) -> Notebook:
+    """Read the cells of a notebook; outputs are reduced to capped plain text"""
+    notebook = Notebook()
+    with open(file_path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return notebook
+        with buf:
+            root = _ws(buf, 0)
+            if buf[root] != 0x7B:
+                raise ValueError("Notebook is not a JSON object")
+            for key, start, end in _iter_object(buf, root):
+                if key == "metadata" and buf[start] == 0x7B:
+                    notebook.language = _language(buf, start) or notebook.language
+                elif key == "cells" and buf[start] == 0x5B:
+                    for cell_start, _ in _iter_array(buf, start):
+                        notebook.cells.append(_cell(buf, cell_start))
+    return notebook
+
+# Where the kernel language is recorded in notebook metadata
+_LANGUAGE_KEYS = {"kernelspec": "language", "language_info": "name"}
+
+def _language(buf, start: int) -> str:
+    for key, value_start, value_end in _iter_object(buf, start):
+        if key in _LANGUAGE_KEYS and buf[value_start] == 0x7B:
+            for inner, inner_start, inner_end in _iter_object(buf, value_start):
+                if inner == _LANGUAGE_KEYS[key] and buf[inner_start] == _QUOTE:
+                    return json.loads(buf[inner_start:inner_end])
+    return ""
+
+def _cell(buf, start: int) -> NotebookCell:
+    cell = NotebookCell(cell_type="code", source="")
+    for key, value_start, value_end in _iter_object(buf, start):
+        if key == "cell_type":
+            cell.cell_type = json.loads(buf[value_start:value_end])
+        elif key == "source":
+            cell.source, _ = _text(buf, value_start, value_end)
+        elif key == "outputs" and buf[value_start] == 0x5B:
+            cell.output, cell.output_truncated = _outputs(buf, value_start, value_end)
+        # "attachments" and "metadata" are skipped without decoding
+    return cell
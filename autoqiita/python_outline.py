@@ -0,0 +1,154 @@
+"""
+Outline of Python modules (docstring, top-level definitions, imports)
+"""
+import ast
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of parsed modules kept in the outline cache
+OUTLINE_CACHE_SIZE = 256
+
+# Qiita allows at most five tags per item
+MAX_TAGS = 5
+
+# Top-level import name -> Qiita tag
+IMPORT_TAGS = {
+    "django": "Django",
+    "flask": "Flask",
+    "fastapi": "FastAPI",
+    "pydantic": "pydantic",
+    "sqlalchemy": "SQLAlchemy",
+    "numpy": "NumPy",
+    "pandas": "pandas",
+    "scipy": "SciPy",
+    "sklearn": "scikit-learn",
+    "torch": "PyTorch",
+    "tensorflow": "TensorFlow",
+    "keras": "Keras",
+    "matplotlib": "matplotlib",
+    "requests": "requests",
+    "httpx": "httpx",
+    "aiohttp": "aiohttp",
+    "asyncio": "asyncio",
+    "click": "Click",
+    "pytest": "pytest",
+    "boto3": "boto3",
+    "openai": "OpenAI",
+    "anthropic": "Anthropic",
+    "bs4": "BeautifulSoup",
+    "selenium": "Selenium",
+}
+
+@dataclass
+class Definition:
+    """Top-level function or class"""
+    kind: str  # 'def', 'async def' or 'class'
+    name: str
+    signature: str
+    line_number: int
+    end_line_number: int
+    summary: str = ""
+
+@dataclass
+class PythonOutline:
+    """Parsed structure of a Python module"""
+    docstring: str = ""
+    definitions: List[Definition] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+
+    @property
+    def title(self) -> str:
+        """First line of the module docstring"""
+        return self.docstring.strip().split('\n', 1)[0].strip() if self.docstring else ""
+
+    def tags(self) -> List[Dict[str, str]]:
+        """Python plus tags for well-known imported libraries"""
+        names = ["Python"]
+        for module in self.imports:
+            tag = IMPORT_TAGS.get(module)
+            if tag and tag not in names:
+                names.append(tag)
+            if len(names) >= MAX_TAGS:
+                break
+        return [{"name": name, "versions": []} for name in names]
+
+    def table_of_contents(self) -> str:
+        """Markdown list of the top-level definitions"""
+        lines = []
+        for definition in self.definitions:
+            entry = f"- `{definition.signature}` (L{definition.line_number})"
+            if definition.summary:
+                entry += f" — {definition.summary}"
+            lines.append(entry)
+        return '\n'.join(lines)
+
+_cache: "OrderedDict[str, Optional[PythonOutline]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _first_line(docstring: Optional[str]) -> str:
+    return docstring.strip().split('\n', 1)[0].strip() if docstring else ""
+
+def _signature(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(base) for base in node.bases)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{prefix} {node.name}({ast.unparse(node.args)})"
+
+def _parse(content: str) -> Optional[PythonOutline]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError) as e:
+        logger.debug(f"Could not parse Python source for outline: {e}")
+        return None
+
+    outline = PythonOutline(docstring=ast.get_docstring(tree) or "")
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            kind = ("class" if isinstance(node, ast.ClassDef)
+                    else "async def" if isinstance(node, ast.AsyncFunctionDef) else "def")
+            # Decorators belong to the definition they precede
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            outline.definitions.append(Definition(
+                kind=kind,
+                name=node.name,
+                signature=_signature(node),
+                line_number=start,
+                end_line_number=node.end_lineno or node.lineno,
+                summary=_first_line(ast.get_docstring(node))
+            ))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            top = module.split('.', 1)[0]
+            if top not in outline.imports:
+                outline.imports.append(top)
+    return outline
+
+def extract_outline(content: str) -> Optional[PythonOutline]:
+    """Parse a Python module once and return its outline (cached by content hash), or None"""
+    key = hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    outline = _parse(content)
+
+    with _cache_lock:
+        _cache[key] = outline
+        while len(_cache) > OUTLINE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return outline
@@ -3,9 +3,33 @@ Qiita API client for managing drafts
 """
 import requests
 import json
-from typing import Dict, Any, Optional, List
+import logging
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+from .rate_limiter import current_priority, is_rate_limited, limiter_for
+
+if TYPE_CHECKING:
+    from .remote_mirror import RemoteMirror
+
+logger = logging.getLogger(__name__)
+
+# Connections kept alive to qiita.com
+DEFAULT_POOL_SIZE = 10
+# Seconds to wait for a connection / for the response
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+# Recent request latencies kept for the p50/p99 summary
+LATENCY_WINDOW = 1000
+# A latency summary is logged after this many requests
+LATENCY_LOG_EVERY = 100
+# Times a request refused for the rate limit is held and sent again
+RATE_LIMIT_RETRIES = 1
 
 @dataclass
 class QiitaDraft:
@@ -18,78 +42,159 @@ class QiitaDraft:
     def __post_init__(self):
         if self.tags is None:
             self.tags = []
+    
+    def payload(self) -> Dict[str, Any]:
+        """Request body for creating or updating this draft"""
+        return {
+            "title": self.title,
+            "body": self.body,
+            "tags": self.tags,
+            "private": self.private
+        }
+
+class LatencyStats:
+    """Latencies of the most recent API requests"""
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+    
+    def record(self, seconds: float) -> int:
+        """Add a sample and return the total number of requests so far"""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            return self.count
+    
+    def observe(self, method: str, path: str, status: Any, seconds: float) -> None:
+        """Record and log one request, with a p50/p99 summary every LATENCY_LOG_EVERY requests"""
+        count = self.record(seconds)
+        logger.debug(f"Qiita API {method} {path} -> {status} in {seconds * 1000:.0f}ms")
+        if count % LATENCY_LOG_EVERY == 0:
+            stats = self.summary()
+            logger.info(f"Qiita API latency over recent requests: "
+                        f"p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms ({count} requests)")
+    
+    def summary(self) -> Dict[str, Any]:
+        """Request count and p50/p99 latency in milliseconds over the window"""
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+        if not samples:
+            return {"requests": count, "p50_ms": None, "p99_ms": None}
+        
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+        
+        return {"requests": count, "p50_ms": percentile(0.50), "p99_ms": percentile(0.99)}
 
 class QiitaClient:
     """Qiita API client for managing drafts"""
     
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 mirror: Optional["RemoteMirror"] = None):
         self.access_token = access_token
+        # Where drafts of files with no recorded item id are looked up
+        self.mirror = mirror
         self.base_url = "https://qiita.com/api/v2"
         self.headers = {
             "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip"
         }
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.latency = LatencyStats()
+        self.rate_limiter = limiter_for(access_token)
+        
+        # One keep-alive session, so saves reuse the TCP+TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def close(self) -> None:
+        """Close the pooled connections"""
+        self.session.close()
+    
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request over the pooled session once the rate limiter allows, logging its latency"""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            # A held request books its slot only when it wakes, so requests
+            # held until the reset are spaced out instead of sent together
+            while (wait := self.rate_limiter.reserve()) > 0:
+                logger.info(f"Rate limit: holding {current_priority()} request {method} {path} for {wait:.0f}s")
+                time.sleep(wait)
+            
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = self.session.request(
+                    method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs
+                )
+                status = response.status_code
+            finally:
+                self.latency.observe(method, path, status, time.perf_counter() - start)
+            
+            self.rate_limiter.update(response.headers)
+            if not is_rate_limited(response.status_code, response.headers):
+                break
+            logger.warning(f"Qiita API rate limit reached on {method} {path}")
+        return response
     
     def create_draft(self, draft: QiitaDraft) -> Dict[str, Any]:
         """Create a new draft on Qiita"""
-        url = f"{self.base_url}/items"
-        
-        data = {
-            "title": draft.title,
-            "body": draft.body,
-            "tags": draft.tags,
-            "private": draft.private
-        }
-        
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self._request("POST", "/items", json=draft.payload())
         response.raise_for_status()
         return response.json()
     
     def update_draft(self, item_id: str, draft: QiitaDraft) -> Dict[str, Any]:
         """Update an existing draft on Qiita"""
-        url = f"{self.base_url}/items/{item_id}"
-        
-        data = {
-            "title": draft.title,
-            "body": draft.body,
-            "tags": draft.tags,
-            "private": draft.private
-        }
-        
-        response = requests.patch(url, headers=self.headers, json=data)
+        response = self._request("PATCH", f"/items/{item_id}", json=draft.payload())
         response.raise_for_status()
         return response.json()
     
     def get_draft(self, item_id: str) -> Dict[str, Any]:
         """Get a specific draft from Qiita"""
-        url = f"{self.base_url}/items/{item_id}"
-        response = requests.get(url, headers=self.headers)
+        response = self._request("GET", f"/items/{item_id}")
         response.raise_for_status()
         return response.json()
     
     def list_user_items(self, per_page: int = 20, page: int = 1) -> List[Dict[str, Any]]:
         """List user's items (including drafts)"""
-        url = f"{self.base_url}/authenticated_user/items"
         params = {"per_page": per_page, "page": page}
         
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self._request("GET", "/authenticated_user/items", params=params)
         response.raise_for_status()
         return response.json()
     
+    def fetch_items_page(self, page: int, per_page: int = 100,
+                         etag: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], Optional[int], Optional[str]]:
+        """Fetch one page of the user's items if changed since etag; returns (items, total_count, etag)"""
+        params = {"per_page": per_page, "page": page}
+        headers = {"If-None-Match": etag} if etag else {}
+        
+        response = self._request("GET", "/authenticated_user/items", params=params, headers=headers)
+        response.raise_for_status()
+        total = response.headers.get("Total-Count")
+        total_count = int(total) if total is not None else None
+        if response.status_code == 304:
+            return None, total_count, etag
+        return response.json(), total_count, response.headers.get("ETag")
+    
     def find_or_create_draft(self, title: str, body: str, tags: List[Dict[str, str]] = None, 
-                           security_report: Dict = None, force_upload: bool = False) -> Dict[str, Any]:
-        """Create new draft with security checking"""
+                           security_report: Dict = None, force_upload: bool = False,
+                           item_id: Optional[str] = None) -> Dict[str, Any]:
+        """Update the recorded draft, or the one the mirror finds for this title and source file, or create a new draft, with security checking"""
         if tags is None:
             tags = []
         
-        # Check security report
-        if security_report and not force_upload:
-            if security_report.get("status") == "critical":
-                raise SecurityError(
-                    f"アップロードが拒否されました: {security_report.get('message', '重大なセキュリティ問題が検出されました')}"
-                )
+        check_security_report(security_report, force_upload)
         
-        # Create new draft directly (avoiding permission issues with list_user_items)
         draft = QiitaDraft(
             title=title,
             body=body,
@@ -97,22 +202,27 @@ class QiitaClient:
             private=True
         )
         
-        try:
-            return self.create_draft(draft)
-        except Exception as e:
-            # If creation fails, try to find existing drafts (fallback)
+        # A known draft is updated with a single PATCH
+        if item_id:
+            try:
+                return self.update_draft(item_id, draft)
+            except requests.HTTPError as e:
+                if not is_missing_item(e):
+                    raise
+                logger.info(f"Draft {item_id} no longer exists; creating a new one")
+        
+        # A draft uploaded before the file's id was recorded (or from another
+        # checkout) is found in the mirror of all items, not just page 1
+        existing_id = self.mirror.find_draft(title, body, exclude=item_id) if self.mirror else None
+        if existing_id:
             try:
-                items = self.list_user_items()
-                for item in items:
-                    if item.get("title") == title and item.get("private", False):
-                        # Update existing draft
-                        draft.id = item["id"]
-                        return self.update_draft(item["id"], draft)
-                # If no existing draft found, re-raise original error
-                raise e
-            except Exception:
-                # If list_user_items also fails, re-raise original creation error
-                raise e
+                return self.update_draft(existing_id, draft)
+            except requests.HTTPError as e:
+                if not is_missing_item(e):
+                    raise
+                logger.info(f"Mirrored draft {existing_id} no longer exists; creating a new one")
+        
+        return self.create_draft(draft)
     
     def create_draft_simple(self, title: str, body: str, tags: List[Dict[str, str]] = None) -> Dict[str, Any]:
         """Simple draft creation without duplicate checking"""
@@ -127,6 +237,19 @@ class QiitaClient:
         )
         return self.create_draft(draft)
 
+def is_missing_item(error: Exception) -> bool:
+    """True if an HTTP error says the item does not exist (deleted on Qiita)"""
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 404
+
+def check_security_report(security_report: Optional[Dict], force_upload: bool = False) -> None:
+    """Raise SecurityError if the report blocks the upload"""
+    if security_report and not force_upload:
+        if security_report.get("status") in ("critical", "error"):
+            raise SecurityError(
+                f"アップロードが拒否されました: {security_report.get('message', '重大なセキュリティ問題が検出されました')}"
+            )
+
 class SecurityError(Exception):
     """Security-related error for blocking uploads"""
     pass
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Client-side scheduling of Qiita API requests within the hourly rate limit
+"""
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Authenticated requests allowed per hour, until the API tells us otherwise
+DEFAULT_RATE_LIMIT = 1000
+RATE_WINDOW_SECONDS = 3600
+# Requests held back from automatic saves so manual saves still go through
+MANUAL_RESERVE = 50
+# Automatic requests that may go out back to back before spacing applies
+AUTO_BURST = 10
+
+# Request priorities: manual saves are never spaced out, only held when the
+# budget is exhausted; automatic saves share what is left over the window
+MANUAL = "manual"
+AUTO = "auto"
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("qiita_request_priority", default=MANUAL)
+
+@contextlib.contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """Mark the Qiita API requests made in this context as MANUAL or AUTO"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> str:
+    return _priority.get()
+
+class RateLimiter:
+    """Token bucket fed from the Rate-Limit, Rate-Remaining and Rate-Reset response headers"""
+
+    def __init__(self, limit: int = DEFAULT_RATE_LIMIT):
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = time.time() + RATE_WINDOW_SECONDS
+        self._auto_tokens = float(AUTO_BURST)
+        self._refilled_at = time.monotonic()
+
+    def _roll_window(self, now: float) -> None:
+        """Start a fresh window once the reset time has passed without new headers"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + RATE_WINDOW_SECONDS
+
+    def _auto_rate(self, now: float) -> float:
+        """Automatic requests per second that fit in the budget until the reset"""
+        spare = self.remaining - MANUAL_RESERVE
+        if spare <= 0:
+            return 0.0
+        return spare / max(self.reset_at - now, 1.0)
+
+    def _refill(self, now: float) -> None:
+        elapsed = time.monotonic() - self._refilled_at
+        self._refilled_at += elapsed
+        # A burst may never reach into the manual reserve
+        spare = max(self.remaining - MANUAL_RESERVE, 0)
+        self._auto_tokens = min(AUTO_BURST, spare, self._auto_tokens + elapsed * self._auto_rate(now))
+
+    def reserve(self, priority: Optional[str] = None) -> float:
+        """Book one request and return 0, or return the seconds to wait before retrying"""
+        priority = priority or current_priority()
+        with self._lock:
+            now = time.time()
+            self._roll_window(now)
+            self._refill(now)
+            until_reset = max(self.reset_at - now, 0.0)
+
+            if priority == MANUAL:
+                if self.remaining <= 0:
+                    return until_reset
+                self.remaining -= 1
+                return 0.0
+
+            # Only the manual reserve is left: automatic requests go out in
+            # the next window and don't draw on this one
+            if self.remaining <= MANUAL_RESERVE:
+                return until_reset
+            if self._auto_tokens < 1:
+                return min((1 - self._auto_tokens) / self._auto_rate(now), until_reset)
+
+            self.remaining -= 1
+            self._auto_tokens -= 1
+            return 0.0
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Take the budget from the rate limit headers of a response"""
+        try:
+            remaining = headers.get("Rate-Remaining")
+            reset = headers.get("Rate-Reset")
+            limit = headers.get("Rate-Limit")
+            with self._lock:
+                if limit is not None:
+                    self.limit = int(limit)
+                if remaining is not None:
+                    self.remaining = int(remaining)
+                if reset is not None:
+                    self.reset_at = float(reset)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Ignoring malformed rate limit headers: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        """Remaining budget for get_status"""
+        with self._lock:
+            now = time.time()
+            self._roll_window(now)
+            return {
+                "limit": self.limit,
+                "remaining": max(self.remaining, 0),
+                "reset_at": datetime.fromtimestamp(self.reset_at).isoformat(timespec="seconds"),
+                "auto_requests_per_minute": round(self._auto_rate(now) * 60, 1)
+            }
+
+def is_rate_limited(status: int, headers: Mapping[str, str]) -> bool:
+    """True if a response was refused because the budget ran out"""
+    return status == 429 or (status == 403 and headers.get("Rate-Remaining") == "0")
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def limiter_for(access_token: str) -> RateLimiter:
+    """The rate limiter shared by every client of one access token in this process"""
+    with _limiters_lock:
+        if access_token not in _limiters:
+            _limiters[access_token] = RateLimiter()
+        return _limiters[access_token]
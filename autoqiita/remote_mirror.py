@@ -0,0 +1,213 @@
+"""
+Local mirror of the user's Qiita items, so lookups do not need the API
+"""
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .qiita_client import QiitaClient
+from .state_store import body_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIRROR_DB = ".autoqiita/remote.db"
+
+# Largest page the API serves
+MIRROR_PER_PAGE = 100
+# Pages fetched concurrently during a sync
+SYNC_PAGE_WORKERS = 4
+
+# Footer line written by ContentProcessor._footer
+_SOURCE_RE = re.compile(r"^\*Source: (.+?)\*\s*$", re.MULTILINE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    url TEXT,
+    private INTEGER,
+    tags TEXT,
+    source TEXT,
+    body_hash TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    page INTEGER
+);
+CREATE INDEX IF NOT EXISTS items_title ON items (title);
+CREATE INDEX IF NOT EXISTS items_source ON items (source);
+CREATE TABLE IF NOT EXISTS pages (
+    page INTEGER PRIMARY KEY,
+    etag TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def source_marker(body: str) -> Optional[str]:
+    """File name from the "*Source: name*" footer of a body uploaded by AutoQiita"""
+    matches = _SOURCE_RE.findall(body or "")
+    return matches[-1] if matches else None
+
+@dataclass
+class SyncResult:
+    """Counts from one RemoteMirror.sync"""
+    items: int = 0
+    pages: int = 0
+    pages_unchanged: int = 0
+    updated: int = 0
+    removed: int = 0
+
+class RemoteMirror:
+    """SQLite copy of the authenticated user's items (metadata, not bodies)"""
+
+    def __init__(self, db_file: str = DEFAULT_MIRROR_DB):
+        self.db_file = Path(db_file)
+        self._lock = threading.Lock()
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def sync(self, qiita_client: QiitaClient, workers: int = SYNC_PAGE_WORKERS,
+             full: bool = False) -> SyncResult:
+        """Bring the mirror up to date with Qiita; a failed sync leaves the previous mirror intact"""
+        with self._lock:
+            etags = {} if full else {
+                row["page"]: row["etag"] for row in self._conn.execute("SELECT page, etag FROM pages")
+            }
+            known_total = self._meta("total_count")
+
+        first, total, etag = qiita_client.fetch_items_page(1, MIRROR_PER_PAGE, etags.get(1))
+        if total is None:
+            total = len(first) if first is not None else int(known_total or 0)
+        page_count = max(1, math.ceil(total / MIRROR_PER_PAGE))
+
+        pages = {1: (first, etag)}
+        if page_count > 1:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                futures = {
+                    pool.submit(qiita_client.fetch_items_page, page, MIRROR_PER_PAGE, etags.get(page)): page
+                    for page in range(2, page_count + 1)
+                }
+                for future in as_completed(futures):
+                    items, _, etag = future.result()
+                    pages[futures[future]] = (items, etag)
+
+        result = self._apply(pages, page_count, total)
+        logger.info(f"Synced {result.items} Qiita items ({result.pages_unchanged}/{result.pages} pages unchanged, "
+                    f"{result.updated} updated, {result.removed} removed)")
+        return result
+
+    def _apply(self, pages: Dict[int, Any], page_count: int, total: int) -> SyncResult:
+        """Write fetched pages in one transaction"""
+        result = SyncResult(pages=page_count)
+        seen = set()
+        with self._lock, self._conn:
+            for page, (items, etag) in sorted(pages.items()):
+                if items is None:
+                    # 304: the items stored for this page are still there
+                    result.pages_unchanged += 1
+                    seen.update(row["id"] for row in self._conn.execute(
+                        "SELECT id FROM items WHERE page = ?", (page,)))
+                    continue
+
+                ids = [item["id"] for item in items]
+                stored = {
+                    row["id"]: row["updated_at"] for row in self._conn.execute(
+                        f"SELECT id, updated_at FROM items WHERE id IN ({', '.join('?' * len(ids))})", ids)
+                } if ids else {}
+                for item in items:
+                    seen.add(item["id"])
+                    if item["id"] in stored and stored[item["id"]] == item.get("updated_at"):
+                        self._conn.execute("UPDATE items SET page = ? WHERE id = ?", (page, item["id"]))
+                        continue
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (item["id"], item.get("title"), item.get("url"), int(bool(item.get("private"))),
+                         json.dumps(item.get("tags") or [], ensure_ascii=False),
+                         source_marker(item.get("body")), body_hash(item.get("body") or ""),
+                         item.get("created_at"), item.get("updated_at"), page)
+                    )
+                    result.updated += 1
+                self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?)", (page, etag))
+
+            # Items no page returned were deleted on Qiita
+            stale = [(row["id"],) for row in self._conn.execute("SELECT id FROM items")
+                     if row["id"] not in seen]
+            self._conn.executemany("DELETE FROM items WHERE id = ?", stale)
+            self._conn.execute("DELETE FROM pages WHERE page > ?", (page_count,))
+            self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("total_count", str(total)),
+                ("synced_at", datetime.now().isoformat(timespec="seconds"))
+            ])
+            result.removed = len(stale)
+            result.items = len(seen)
+        return result
+
+    def _rows(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "title": row["title"],
+                "url": row["url"],
+                "private": bool(row["private"]),
+                "tags": json.loads(row["tags"] or "[]"),
+                "source": row["source"],
+                "body_hash": row["body_hash"],
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"]
+            }
+            for row in rows
+        ]
+
+    def by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Mirrored item with this id, or None"""
+        rows = self._rows("SELECT * FROM items WHERE id = ?", (item_id,))
+        return rows[0] if rows else None
+
+    def by_title(self, title: str) -> List[Dict[str, Any]]:
+        """Mirrored items with exactly this title, newest first"""
+        return self._rows("SELECT * FROM items WHERE title = ? ORDER BY created_at DESC", (title,))
+
+    def by_source(self, file_name: str) -> List[Dict[str, Any]]:
+        """Mirrored items uploaded from a file with this name, newest first"""
+        return self._rows("SELECT * FROM items WHERE source = ? ORDER BY created_at DESC", (file_name,))
+
+    def find_draft(self, title: str, body: str, exclude: Optional[str] = None) -> Optional[str]:
+        """Id of the private draft with this title and source file (exclude: an id known to be gone)"""
+        source = source_marker(body)
+        candidates = [item for item in self.by_title(title)
+                      if item["private"] and item["id"] != exclude and item["source"] in (None, source)]
+        # A draft from the same source file wins over one without a footer
+        for item in candidates:
+            if item["source"] == source:
+                return item["id"]
+        return candidates[0]["id"] if candidates else None
+
+    def status(self) -> Dict[str, Any]:
+        """Number of mirrored items and time of the last sync"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) AS n FROM items").fetchone()["n"]
+            synced_at = self._meta("synced_at")
+        return {"items": count, "synced_at": synced_at}
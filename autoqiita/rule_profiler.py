@@ -0,0 +1,92 @@
+"""
+Per-rule profiler for security rules
+"""
+import os
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .security_scanner import CompiledRuleSet, line_time_budget
+
+# Upper bound on corpus size read from a workspace
+MAX_CORPUS_FILES = 500
+MAX_CORPUS_FILE_BYTES = 2 * 1024 * 1024
+
+def synthetic_corpus() -> List[Tuple[str, str]]:
+    """Inputs that tend to expose slow or backtracking-prone patterns"""
+    minified = "".join(f"var a{i}=function(b){{return b.c+{i}}};" for i in range(4000))
+    return [
+        ("synthetic:minified-js", minified),
+        ("synthetic:long-word", "a" * 50000),
+        ("synthetic:long-whitespace", "password" + " " * 50000 + "x"),
+        ("synthetic:dotted-digits", ".".join(str(i % 1000) for i in range(20000))),
+        ("synthetic:email-like", "user." * 10000 + "@"),
+        ("synthetic:path-like", "C:\\Users\\" + "dir\\" * 10000),
+        ("synthetic:url-like", "https://" + "a." * 20000 + "com/"),
+        ("synthetic:key-value", "\n".join(f"api_key_{i} = {'x' * 40}" for i in range(2000))),
+        ("synthetic:markdown", "\n".join(
+            f"## Section {i}\n\nSome prose with a [link](https://example.com/{i}) and `code`."
+            for i in range(2000)
+        )),
+    ]
+
+def workspace_corpus(paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Read up to MAX_CORPUS_FILES files as (name, content) pairs"""
+    count = 0
+    for path in paths:
+        if count >= MAX_CORPUS_FILES:
+            break
+        try:
+            if os.path.getsize(path) > MAX_CORPUS_FILE_BYTES:
+                continue
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                yield path, f.read()
+        except OSError:
+            continue
+        count += 1
+
+def profile_rules(rule_set: CompiledRuleSet,
+                  corpus: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Time every rule (without the keyword prefilter) on every line of the corpus"""
+    stats = [
+        {
+            "index": rule.index,
+            "category": rule.category,
+            "description": rule.description,
+            "pattern": rule.pattern,
+            "keywords": rule.keywords,
+            "total_time": 0.0,
+            "matches": 0,
+            "lines": 0,
+            "worst_time": 0.0,
+            "worst_source": "",
+            "worst_line": 0,
+            "worst_excerpt": "",
+            "over_budget": False
+        }
+        for rule in rule_set.rules
+    ]
+
+    for source, content in corpus:
+        lines = content.split('\n')
+        for rule, rule_stats in zip(rule_set.rules, stats):
+            if rule_stats["over_budget"]:
+                continue
+            regex = rule.regex
+            for line_number, line in enumerate(lines, 1):
+                started = perf_counter()
+                matches = sum(1 for _ in regex.finditer(line))
+                elapsed = perf_counter() - started
+
+                rule_stats["total_time"] += elapsed
+                rule_stats["matches"] += matches
+                rule_stats["lines"] += 1
+                if elapsed > rule_stats["worst_time"]:
+                    rule_stats["worst_time"] = elapsed
+                    rule_stats["worst_source"] = source
+                    rule_stats["worst_line"] = line_number
+                    rule_stats["worst_excerpt"] = line[:80]
+                if elapsed > line_time_budget(len(line)):
+                    rule_stats["over_budget"] = True
+                    break
+
+    return sorted(stats, key=lambda s: s["total_time"], reverse=True)
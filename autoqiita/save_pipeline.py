@@ -0,0 +1,203 @@
+"""
+The save path shared by the CLI, the file monitor, workspace sync and the MCP server
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .content_processor import ContentProcessor
+from .diff_article import SnapshotStore, is_diff_candidate, upload_diff_article
+from .draft_series import upload_series
+from .file_guard import FileCheck
+from .qiita_client import QiitaClient
+from .state_store import UploadStateStore, body_hash, source_hash
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of a save
+SAVED = "saved"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+BLOCKED = "blocked"
+
+@dataclass
+class PendingSave:
+    """A changed file, converted and scanned, that has not been uploaded yet"""
+    file_path: str
+    content_hash: str
+    title: str
+    body: str  # with the security warning, if the scan found issues
+    tags: List[Dict[str, Any]]
+    security_report: Optional[Dict[str, Any]] = None
+    warning: str = ""
+    file_check: Optional[FileCheck] = None
+    # Set by publish() when the file is published as diff articles
+    source: Optional[str] = None
+
+@dataclass
+class SaveResult:
+    """Outcome of saving one file"""
+    status: str  # SAVED, UNCHANGED, SKIPPED or BLOCKED
+    file_path: str
+    title: str = ""
+    message: str = ""
+    item_id: Optional[str] = None
+    url: Optional[str] = None
+    # One entry per draft when the file is uploaded as a series
+    parts: Optional[List[Dict[str, Any]]] = None
+    # The diff article, when only the changes were published
+    diff: Optional[Dict[str, Any]] = None
+    security_report: Optional[Dict[str, Any]] = None
+
+class SavePipeline:
+    """Pre-check, convert, scan and upload files, skipping what Qiita already has"""
+
+    def __init__(self, qiita_client: QiitaClient, processor: ContentProcessor,
+                 state_store: UploadStateStore, snapshots: Optional[SnapshotStore] = None):
+        self.qiita_client = qiita_client
+        self.processor = processor
+        self.state_store = state_store
+        self.snapshots = snapshots or SnapshotStore()
+
+    def check_source(self, file_path: str) -> Tuple[str, Optional[SaveResult]]:
+        """Hash a file's source; the result is set if it is what was last uploaded"""
+        content_hash = source_hash(file_path, self.processor.max_file_bytes)
+        # A moved or renamed file keeps updating the draft of its old path
+        self.state_store.adopt_moved(file_path, content_hash)
+        if not self.state_store.is_unchanged(file_path, content_hash):
+            return content_hash, None
+        previous = self.state_store.get(file_path)
+        parts = [{"part": i, "title": part.get("title"), "id": part.get("item_id"),
+                  "url": part.get("url"), "skipped": True}
+                 for i, part in enumerate(previous.get("parts") or [], 1)]
+        return content_hash, SaveResult(
+            UNCHANGED, file_path, title=previous.get("title") or "",
+            message="前回のアップロードから変更がないためスキップしました",
+            item_id=previous.get("item_id"), url=previous.get("url"), parts=parts or None
+        )
+
+    def prepare(self, file_path: str, force: bool = False,
+                skip_unchanged: bool = True) -> Union[PendingSave, SaveResult]:
+        """Pre-check, convert and scan a file, or return why it is not uploaded"""
+        # Reject binary/minified files before reading them in full
+        file_check = self.processor.inspect_file(file_path, force)
+        if file_check.action == "skip":
+            return SaveResult(SKIPPED, file_path, message=file_check.reason)
+
+        content_hash, unchanged = self.check_source(file_path)
+        if skip_unchanged and unchanged is not None:
+            logger.info(f"Unchanged since last upload, skipped: {file_path}")
+            return unchanged
+
+        # Unless forced, the scan stops at the first critical issue
+        title, body, tags, security_report = self.processor.process_file(
+            file_path, gate=not force, file_check=file_check
+        )
+        return self.pending(file_path, content_hash, title, body, tags, security_report, file_check)
+
+    def pending(self, file_path: str, content_hash: str, title: str, body: str,
+                tags: List[Dict[str, Any]], security_report: Optional[Dict[str, Any]],
+                file_check: Optional[FileCheck] = None) -> PendingSave:
+        """PendingSave for a file converted and scanned elsewhere (e.g. process_many)"""
+        warning = self.processor.security_warning(security_report)
+        return PendingSave(
+            file_path, content_hash, title, f"{warning}\n\n{body}" if warning else body,
+            tags, security_report, warning, file_check
+        )
+
+    def blocked(self, pending: PendingSave) -> Optional[SaveResult]:
+        """BLOCKED result if the scan does not allow the upload, else None"""
+        if not self.processor.should_block_upload(pending.security_report):
+            return None
+        logger.warning(f"Upload blocked for {pending.file_path} due to security issues")
+        return SaveResult(BLOCKED, pending.file_path, title=pending.title,
+                          message="セキュリティ上の問題によりアップロードがブロックされました",
+                          security_report=pending.security_report)
+
+    def publish(self, pending: PendingSave, skip_unchanged: bool = True,
+                series: bool = True) -> Optional[SaveResult]:
+        """Upload as a diff article or a series, or skip an unchanged body; None means send a single draft"""
+        file_path = pending.file_path
+
+        # Large source files: publish only the changes since the full draft
+        pending.source = self._diff_source(file_path) if series else None
+        if pending.source is not None:
+            result = upload_diff_article(
+                self.qiita_client, self.state_store, self.snapshots, file_path,
+                pending.content_hash, pending.title, pending.source, pending.body,
+                pending.tags, pending.warning
+            )
+            if result is not None:
+                previous = self.state_store.get(file_path)
+                return SaveResult(SAVED, file_path, title=pending.title,
+                                  item_id=previous.get("item_id"), url=previous.get("url"),
+                                  diff=result, security_report=pending.security_report)
+
+        # Large documents go up as a series; only changed parts are sent
+        parts = self.processor.split_body(pending.title, pending.body)
+        if len(parts) > 1 and series:
+            part_results = upload_series(self.qiita_client, self.state_store, file_path,
+                                         pending.content_hash, parts, pending.tags,
+                                         force=not skip_unchanged)
+            logger.info(f"Saved to Qiita as {len(parts)} parts: {pending.title}")
+            return SaveResult(
+                SAVED if not all(part["skipped"] for part in part_results) else UNCHANGED,
+                file_path, title=pending.title, item_id=part_results[0]["id"],
+                url=part_results[0]["url"], parts=part_results,
+                security_report=pending.security_report
+            )
+
+        # The source changed but the generated body did not (e.g. only line endings)
+        if skip_unchanged and self.state_store.is_body_unchanged(file_path, body_hash(pending.body)):
+            self.state_store.update_content_hash(file_path, pending.content_hash)
+            previous = self.state_store.get(file_path)
+            logger.info(f"Body unchanged since last upload, skipped: {file_path}")
+            return SaveResult(UNCHANGED, file_path, title=pending.title,
+                              message="前回のアップロードから本文に変更がないためスキップしました",
+                              item_id=previous.get("item_id"), url=previous.get("url"))
+        return None
+
+    def record(self, pending: PendingSave, result: Dict[str, Any]) -> SaveResult:
+        """Record a single draft upload of the pending save"""
+        file_path = pending.file_path
+        logger.info(f"Saved to Qiita: {pending.title} (ID: {result.get('id')})")
+        self.state_store.record_upload(file_path, pending.content_hash, result, body_hash(pending.body))
+        # The full draft is what later diff articles are taken against
+        if pending.source is not None:
+            self.snapshots.save(file_path, pending.source)
+        return SaveResult(SAVED, file_path, title=pending.title, item_id=result.get("id"),
+                          url=result.get("url"), security_report=pending.security_report)
+
+    def upload(self, pending: PendingSave, force: bool = False, skip_unchanged: bool = True,
+               simple: bool = False) -> SaveResult:
+        """Upload a pending save with the blocking client; simple=True always creates a new draft"""
+        done = self.publish(pending, skip_unchanged, series=not simple)
+        if done is not None:
+            return done
+        if simple:
+            result = self.qiita_client.create_draft_simple(pending.title, pending.body, pending.tags)
+        else:
+            # Update the file's draft with one PATCH, or create a new one
+            result = self.qiita_client.find_or_create_draft(
+                pending.title, pending.body, pending.tags, pending.security_report, force,
+                item_id=self.state_store.item_id(pending.file_path)
+            )
+        return self.record(pending, result)
+
+    def save(self, file_path: str, force: bool = False, skip_unchanged: bool = True) -> SaveResult:
+        """Run the whole pipeline for one file with the blocking client"""
+        pending = self.prepare(file_path, force, skip_unchanged)
+        if isinstance(pending, SaveResult):
+            return pending
+        if not force:
+            blocked = self.blocked(pending)
+            if blocked is not None:
+                return blocked
+        return self.upload(pending, force, skip_unchanged)
+
+    def _diff_source(self, file_path: str) -> Optional[str]:
+        """Source of file_path if it is published as diff articles, else None"""
+        if not self.processor.diff_mode:
+            return None
+        source = self.processor.read_source(file_path)
+        return source if is_diff_candidate(file_path, source) else None
@@ -0,0 +1,165 @@
+"""
+Persistent cache of security scan results
+"""
+import atexit
+import hashlib
+import json
+import os
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".autoqiita/cache"
+
+class ScanCache:
+    """On-disk LRU cache of scan results, keyed by content hash and rule set fingerprint"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 2000):
+        self.cache_dir = Path(cache_dir)
+        self.entries_dir = self.cache_dir / "reports"
+        self.stats_file = self.cache_dir / "stats.json"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Lookups not yet flushed to stats.json
+        self._hits = 0
+        self._misses = 0
+        # Entries on disk as of the last listing plus those written since
+        self._entry_count: Optional[int] = None
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(content: str, fingerprint: str) -> str:
+        """Cache key for content scanned with a given rule set"""
+        digest = hashlib.sha256(fingerprint.encode("utf-8"))
+        digest.update(content.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[List[int]]]:
+        """Return cached rule hits for key, or None on a miss"""
+        entry = self.entries_dir / f"{key}.json"
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                hits = json.load(f)["hits"]
+            os.utime(entry)
+        except FileNotFoundError:
+            self._record(hit=False)
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"Ignoring unreadable scan cache entry {entry}: {e}")
+            self._record(hit=False)
+            return None
+
+        self._record(hit=True)
+        return hits
+
+    def put(self, key: str, hits: List[Any]) -> None:
+        """Store rule hits for key, evicting least recently used entries"""
+        try:
+            self.entries_dir.mkdir(parents=True, exist_ok=True)
+            entry = self.entries_dir / f"{key}.json"
+            is_new = not entry.exists()
+            self._write_json(entry, {"hits": [list(hit) for hit in hits]})
+        except OSError as e:
+            logger.debug(f"Could not write scan cache entry: {e}")
+            return
+
+        with self._lock:
+            if self._entry_count is None:
+                self._entry_count = self._count_entries()
+            elif is_new:
+                self._entry_count += 1
+            if self._entry_count <= self.max_entries:
+                return
+            self._evict()
+
+    def _write_json(self, path: Path, data: Any) -> None:
+        """Write path atomically through a temp file unique to this writer"""
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _count_entries(self) -> int:
+        return sum(1 for _ in self.entries_dir.glob("*.json")) if self.entries_dir.is_dir() else 0
+
+    def _evict(self) -> None:
+        """Drop least recently used entries; called with self._lock held"""
+        entries = list(self.entries_dir.glob("*.json"))
+        self._entry_count = len(entries)
+        if len(entries) <= self.max_entries:
+            return
+
+        # Drop down to 90% so eviction does not run on every insert
+        entries.sort(key=lambda p: p.stat().st_mtime)
+        for entry in entries[:len(entries) - int(self.max_entries * 0.9)]:
+            try:
+                entry.unlink()
+                self._entry_count -= 1
+            except OSError:
+                pass
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def flush(self) -> None:
+        """Add the lookups counted since the last flush to stats.json"""
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            self._hits = self._misses = 0
+        if not hits and not misses:
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Serialize read-modify-write between processes where possible
+            with open(self.cache_dir / "stats.lock", 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                stored = self._read_stats()
+                self._write_json(self.stats_file, {"hits": stored["hits"] + hits,
+                                                   "misses": stored["misses"] + misses})
+        except OSError as e:
+            logger.debug(f"Could not update scan cache stats: {e}")
+
+    def _read_stats(self) -> Dict[str, int]:
+        stats = {"hits": 0, "misses": 0}
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            stats["hits"] = int(data.get("hits", 0))
+            stats["misses"] = int(data.get("misses", 0))
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (including unflushed ones) and current size of the cache"""
+        stats: Dict[str, Any] = self._read_stats()
+        with self._lock:
+            stats["hits"] += self._hits
+            stats["misses"] += self._misses
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = self._count_entries()
+        return stats
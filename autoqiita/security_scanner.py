@@ -4,14 +4,64 @@ Security scanner for content before uploading to Qiita
 import re
 import os
 import json
-from typing import List, Dict, Tuple, Any
-from dataclasses import dataclass
+import hashlib
+from array import array
+from bisect import bisect_right
+from time import perf_counter
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
+from typing import List, Dict, Tuple, Any, Callable, Iterable, Optional, Set, TextIO
+from dataclasses import dataclass, asdict
 from pathlib import Path
 import logging
+import threading
+
+from .keyword_filter import KeywordPrefilter, extract_required_literals, fold_case, max_match_width
+from .scan_cache import ScanCache
+from .text_decoder import TextDecoder
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Constructs whose result depends on what surrounds a line (lookaround,
+# absolute anchors, atomic groups, possessive quantifiers).  Rules using them
+# are evaluated line by line so the document pass stays exact.
+_LINE_BOUND_RE = re.compile(r"\(\?<?[=!]|\(\?>|\\[AZz]|[*+?}]\+")
+
+# (line_number, rule_index, start_offset, end_offset)
+RuleHit = Tuple[int, int, int, int]
+
+# Extra lines re-scanned on each side of a changed hunk
+INCREMENTAL_MARGIN_LINES = 2
+# Number of files whose previous scan is kept for incremental re-scans
+INCREMENTAL_MAX_FILES = 64
+
+# Files larger than this are scanned as a stream in bounded memory
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+# Characters read per chunk when streaming
+STREAM_CHUNK_CHARS = 1024 * 1024
+# Lines longer than this are scanned in overlapping windows of this size
+STREAM_MAX_LINE_CHARS = 1024 * 1024
+# Overlap used for rules whose longest match is unbounded
+STREAM_MAX_OVERLAP_CHARS = 64 * 1024
+# Context kept around a match on an over-long line
+LONG_LINE_EXCERPT_CHARS = 200
+
+# A rule taking longer than this on a single line is cut short for the rest
+# of the scan (see line_time_budget)
+RULE_LINE_TIME_BUDGET = 0.05
+# Extra budget per character, so linear-time rules on long lines stay within it
+RULE_TIME_PER_CHAR = 0.0000005
+# Average per-line budget for a rule evaluated over the whole document
+RULE_DOCUMENT_TIME_PER_LINE = 0.0001
+
+def line_time_budget(length: int) -> float:
+    """Seconds a rule may spend on text of the given length"""
+    return max(RULE_LINE_TIME_BUDGET, RULE_TIME_PER_CHAR * length)
+
+# Minimum seconds between checks of a rules file for changes
+RULE_RELOAD_CHECK_INTERVAL = 1.0
+
+@dataclass(slots=True)
 class SecurityIssue:
     """Security issue found in content"""
     level: str  # 'critical', 'high', 'medium', 'low', 'info'
@@ -21,12 +71,564 @@ class SecurityIssue:
     line_content: str
     suggestion: str = ""
 
+class IncompleteScanError(Exception):
+    """Raised when a gate scan could not evaluate every rule it had to"""
+    
+    def __init__(self, message: str, timed_out_rules: List[Dict[str, str]]):
+        super().__init__(message)
+        self.timed_out_rules = timed_out_rules
+
+class LineIndex:
+    """Newline-offset index mapping document offsets to 1-based line numbers"""
+    
+    __slots__ = ("content", "starts")
+    
+    def __init__(self, content: str):
+        self.content = content
+        starts = array('Q', [0])
+        find = content.find
+        pos = find('\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find('\n', pos + 1)
+        self.starts = starts
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def line_number(self, offset: int) -> int:
+        """Line number containing the given offset"""
+        return bisect_right(self.starts, offset)
+    
+    def line_span(self, line_number: int) -> Tuple[int, int]:
+        """(start, end) offsets of a line, excluding the newline"""
+        start = self.starts[line_number - 1]
+        if line_number < len(self.starts):
+            return start, self.starts[line_number] - 1
+        return start, len(self.content)
+    
+    def line_text(self, line_number: int) -> str:
+        start, end = self.line_span(line_number)
+        return self.content[start:end]
+
+class CompiledRule:
+    """A security rule with its pattern compiled once"""
+    
+    __slots__ = ("index", "category", "level", "description", "suggestion",
+                 "pattern", "regex", "line_bound", "keywords", "keyword_ids")
+    
+    def __init__(self, index: int, category: str, config: Dict[str, Any]):
+        self.index = index
+        self.category = category
+        self.level = config["level"]
+        self.description = config["description"]
+        self.suggestion = config.get("suggestion", "")
+        self.pattern = config["pattern"]
+        self.regex = re.compile(self.pattern, re.MULTILINE)
+        self.line_bound = bool(_LINE_BOUND_RE.search(self.pattern))
+        # Literals one of which every match contains; None disables the prefilter
+        if "keywords" in config:
+            self.keywords = list(config["keywords"]) or None
+        else:
+            literals = extract_required_literals(self.pattern)
+            self.keywords = sorted(literals) if literals else None
+        self.keyword_ids: List[int] = []
+
+class CompiledRuleSet:
+    """All security rules compiled up front and evaluated over the whole document"""
+    
+    def __init__(self, patterns: Dict[str, List[Dict]], whitelist_patterns: List[str]):
+        self.patterns = patterns
+        self.whitelist_patterns = whitelist_patterns
+        
+        # Identifies this exact rule set; used as part of scan cache keys
+        self.fingerprint = hashlib.sha256(json.dumps(
+            {"patterns": patterns, "whitelist": whitelist_patterns},
+            sort_keys=True, ensure_ascii=False
+        ).encode("utf-8")).hexdigest()
+        
+        self.rules: List[CompiledRule] = []
+        for category, category_patterns in patterns.items():
+            for pattern_config in category_patterns:
+                self.rules.append(CompiledRule(len(self.rules), category, pattern_config))
+        
+        # Window overlap that guarantees every match fits in one window
+        widths = [max_match_width(rule.pattern) for rule in self.rules]
+        self.max_match_width = min(
+            STREAM_MAX_OVERLAP_CHARS,
+            max((w if w is not None else STREAM_MAX_OVERLAP_CHARS for w in widths), default=0)
+        )
+        
+        self.prefilter = KeywordPrefilter(
+            keyword for rule in self.rules for keyword in (rule.keywords or ())
+        )
+        for rule in self.rules:
+            if rule.keywords:
+                rule.keyword_ids = sorted({self.prefilter.keyword_id(k) for k in rule.keywords})
+        
+        self.whitelist = [
+            (re.compile(pattern, re.IGNORECASE | re.MULTILINE),
+             bool(_LINE_BOUND_RE.search(pattern)))
+            for pattern in whitelist_patterns
+        ]
+        
+        # Rules that went over their time budget; every later scan with this
+        # rule set skips them and reports them as timed out until a reload
+        self.disabled: Dict[int, str] = {}
+    
+    def new_timed_out(self, levels: Optional[Iterable[str]] = None) -> Dict[int, str]:
+        """timed_out dict for a new scan, starting with the disabled rules (at levels)"""
+        disabled = self.disabled.copy()
+        if levels is None:
+            return disabled
+        return {index: reason for index, reason in disabled.items()
+                if self.rules[index].level in levels}
+    
+    def time_out(self, rule: CompiledRule, timed_out: Dict[int, str], reason: str) -> None:
+        """Stop evaluating a rule that blew its time budget, in this scan and later ones"""
+        if rule.index in timed_out:
+            return
+        logger.warning(
+            f"Security rule {rule.category}[{rule.index}] {rule.pattern!r} cut short: {reason}"
+        )
+        timed_out[rule.index] = reason
+        self.disabled.setdefault(rule.index, reason)
+    
+    def describe_timed_out(self, timed_out: Dict[int, str]) -> List[Dict[str, str]]:
+        """Describe rules cut short by the time guard, for reports"""
+        return [
+            {
+                "category": self.rules[index].category,
+                "description": self.rules[index].description,
+                "level": self.rules[index].level,
+                "pattern": self.rules[index].pattern,
+                "reason": reason
+            }
+            for index, reason in sorted(timed_out.items())
+        ]
+    
+    def is_whitelisted(self, line: str) -> bool:
+        """Check if a single line matches any whitelist pattern"""
+        return any(regex.search(line) for regex, _ in self.whitelist)
+    
+    def scan(self, content: str, index: LineIndex = None, apply_whitelist: bool = True,
+             skip_levels: Iterable[str] = (),
+             timed_out: Optional[Dict[int, str]] = None) -> List[RuleHit]:
+        """Run every rule over the document; rules cut short are added to timed_out"""
+        if timed_out is None:
+            timed_out = self.new_timed_out()
+        if index is None:
+            index = LineIndex(content)
+        whitelisted = self._whitelisted_lines(content, index) if apply_whitelist else set()
+        all_lines = range(1, len(index) + 1)
+        keyword_lines = self._keyword_lines(content, index)
+        
+        hits: List[RuleHit] = []
+        for rule in self.rules:
+            if rule.index in timed_out or rule.level in skip_levels:
+                continue
+            
+            if rule.keywords:
+                # Only lines containing one of the rule's literals can match
+                candidates: Set[int] = set()
+                for keyword_id in rule.keyword_ids:
+                    candidates.update(keyword_lines.get(keyword_id, ()))
+                if candidates:
+                    hits.extend(self._scan_lines(rule, index, sorted(candidates),
+                                                 whitelisted, timed_out))
+                continue
+            
+            if rule.line_bound:
+                hits.extend(self._scan_lines(rule, index, all_lines, whitelisted, timed_out))
+                continue
+            
+            found = []
+            dirty: Set[int] = set()
+            started = perf_counter()
+            for match in rule.regex.finditer(content):
+                start, end = match.span()
+                line_number = index.line_number(start)
+                if content.find('\n', start, end) != -1:
+                    # Rules are line-scoped; re-check the lines this match spans
+                    dirty.update(range(line_number, index.line_number(end - 1) + 1))
+                elif line_number not in whitelisted:
+                    found.append((line_number, rule.index, start, end))
+            
+            elapsed = perf_counter() - started
+            if elapsed > max(line_time_budget(len(content)),
+                             RULE_DOCUMENT_TIME_PER_LINE * len(index)):
+                self.time_out(
+                    rule, timed_out,
+                    f"文書全体（{len(index)}行）の評価に{elapsed * 1000:.0f}msかかりました"
+                )
+            
+            if dirty:
+                found = [hit for hit in found if hit[0] not in dirty]
+                found.extend(self._scan_lines(rule, index, sorted(dirty), whitelisted, timed_out))
+            hits.extend(found)
+        
+        hits.sort()
+        return hits
+    
+    def first_hit(self, content: str, index: LineIndex,
+                  levels: Iterable[str] = ("critical",),
+                  timed_out: Optional[Dict[int, str]] = None) -> Optional[RuleHit]:
+        """First hit of any rule at the given levels, or None (check timed_out before trusting None)"""
+        if timed_out is None:
+            timed_out = self.new_timed_out(levels)
+        rules = [rule for rule in self.rules
+                 if rule.level in levels and rule.index not in timed_out]
+        if not rules:
+            return None
+        
+        keyword_ids = sorted({k for rule in rules for k in rule.keyword_ids})
+        keyword_lines = self._keyword_lines(content, index, keyword_ids)
+        whitelisted: Dict[int, bool] = {}
+        
+        for rule in rules:
+            if rule.keywords:
+                line_numbers: Iterable[int] = sorted({
+                    line for k in rule.keyword_ids for line in keyword_lines.get(k, ())
+                })
+            else:
+                line_numbers = range(1, len(index) + 1)
+            
+            for line_number in line_numbers:
+                start, end = index.line_span(line_number)
+                started = perf_counter()
+                if rule.line_bound:
+                    match = rule.regex.search(content[start:end])
+                    offset = start
+                else:
+                    match = rule.regex.search(content, start, end)
+                    offset = 0
+                elapsed = perf_counter() - started
+                if match is None:
+                    if elapsed > line_time_budget(end - start):
+                        self.time_out(
+                            rule, timed_out,
+                            f"行 {line_number}（{end - start}文字）の評価に{elapsed * 1000:.0f}msかかりました"
+                        )
+                        break
+                    continue
+                if line_number not in whitelisted:
+                    whitelisted[line_number] = self.is_whitelisted(content[start:end])
+                if not whitelisted[line_number]:
+                    return (line_number, rule.index,
+                            offset + match.start(), offset + match.end())
+        return None
+    
+    def _scan_lines(self, rule: CompiledRule, index: LineIndex, line_numbers: Iterable[int],
+                    whitelisted: Set[int], timed_out: Dict[int, str]) -> List[RuleHit]:
+        """Evaluate a rule line by line (exact per-line semantics)"""
+        hits = []
+        content = index.content
+        regex = rule.regex
+        for line_number in line_numbers:
+            if line_number in whitelisted:
+                continue
+            start, end = index.line_span(line_number)
+            if rule.line_bound:
+                matches = regex.finditer(content[start:end])
+                offset = start
+            else:
+                # pos/endpos bound the search to the line without copying it
+                matches = regex.finditer(content, start, end)
+                offset = 0
+            started = perf_counter()
+            for match in matches:
+                hits.append((line_number, rule.index,
+                             offset + match.start(), offset + match.end()))
+            elapsed = perf_counter() - started
+            if elapsed > line_time_budget(end - start):
+                self.time_out(
+                    rule, timed_out,
+                    f"行 {line_number}（{end - start}文字）の評価に{elapsed * 1000:.0f}msかかりました"
+                )
+                break
+        return hits
+    
+    def _keyword_lines(self, content: str, index: LineIndex,
+                       keyword_ids: Optional[Iterable[int]] = None) -> Dict[int, List[int]]:
+        """Map keyword id to the lines it occurs on"""
+        folded, offsets = self.prefilter.find(content, keyword_ids)
+        if len(folded) != len(content):
+            # Case folding changed offsets; line structure is unchanged
+            index = LineIndex(folded)
+        return {
+            keyword_id: [index.line_number(offset) for offset in keyword_offsets]
+            for keyword_id, keyword_offsets in offsets.items()
+        }
+    
+    def _whitelisted_lines(self, content: str, index: LineIndex) -> Set[int]:
+        """Line numbers that contain a whitelisted pattern"""
+        lines: Set[int] = set()
+        for regex, line_bound in self.whitelist:
+            if line_bound:
+                lines.update(n for n in range(1, len(index) + 1)
+                             if regex.search(index.line_text(n)))
+                continue
+            for match in regex.finditer(content):
+                start, end = match.span()
+                line_number = index.line_number(start)
+                if content.find('\n', start, end) == -1:
+                    lines.add(line_number)
+                else:
+                    for n in range(line_number, index.line_number(end - 1) + 1):
+                        if regex.search(index.line_text(n)):
+                            lines.add(n)
+        return lines
+
+class IssueStore(Sequence):
+    """Compact issue list backed by parallel arrays; SecurityIssue objects are built on access"""
+    
+    __slots__ = ("rule_set", "index", "rule_indices", "line_numbers", "starts", "ends",
+                 "timed_out")
+    
+    def __init__(self, rule_set: CompiledRuleSet, index: LineIndex, hits: Iterable[RuleHit],
+                 timed_out: Optional[Dict[int, str]] = None):
+        self.rule_set = rule_set
+        self.index = index
+        # Rules cut short by the time guard during this scan
+        self.timed_out = timed_out or {}
+        self.line_numbers = array('L')
+        self.rule_indices = array('H')
+        self.starts = array('Q')
+        self.ends = array('Q')
+        for line_number, rule_index, start, end in hits:
+            self.line_numbers.append(line_number)
+            self.rule_indices.append(rule_index)
+            self.starts.append(start)
+            self.ends.append(end)
+    
+    def __len__(self) -> int:
+        return len(self.rule_indices)
+    
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._issue(i) for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("issue index out of range")
+        return self._issue(item)
+    
+    def _issue(self, i: int) -> SecurityIssue:
+        rule = self.rule_set.rules[self.rule_indices[i]]
+        line_number = self.line_numbers[i]
+        return SecurityIssue(
+            level=rule.level,
+            category=rule.category,
+            description=rule.description,
+            line_number=line_number,
+            line_content=self.index.line_text(line_number).strip(),
+            suggestion=rule.suggestion
+        )
+    
+    def rule_counts(self) -> Counter:
+        """Issue count per rule index, in order of first occurrence"""
+        return Counter(self.rule_indices)
+
+class IssueList(list):
+    """Materialized issues of one scan, with the rules the time guard cut short"""
+    
+    def __init__(self, issues: Iterable[SecurityIssue] = (),
+                 timed_out: Optional[Dict[int, str]] = None):
+        super().__init__(issues)
+        self.timed_out = timed_out if timed_out is not None else {}
+
+class _LongLineScanner:
+    """Scan one over-long line in overlapping windows, as finditer over the whole line would"""
+    
+    def __init__(self, rule_set: CompiledRuleSet, line_number: int,
+                 timed_out: Dict[int, str]):
+        self.rule_set = rule_set
+        self.line_number = line_number
+        self.timed_out = timed_out
+        self.overlap = min(rule_set.max_match_width, STREAM_MAX_LINE_CHARS // 2)
+        self.buffer = ""
+        # Line offset of buffer[0], and of the first character not yet scanned
+        self.base = 0
+        self.scanned = 0
+        # rule index -> line offset the rule's next search starts at
+        self.resume: Dict[int, int] = {}
+        self.whitelisted = False
+        self.issues: List[SecurityIssue] = []
+    
+    def feed(self, text: str) -> None:
+        self.buffer += text
+        step = STREAM_MAX_LINE_CHARS - self.overlap
+        while self.base + len(self.buffer) - self.scanned >= STREAM_MAX_LINE_CHARS:
+            self._scan_window(self.scanned + STREAM_MAX_LINE_CHARS, limit=self.scanned + step)
+            self.scanned += step
+            # Keep some already scanned text as context for the next window
+            keep_from = max(self.base, self.scanned - LONG_LINE_EXCERPT_CHARS)
+            self.buffer = self.buffer[keep_from - self.base:]
+            self.base = keep_from
+    
+    def finish(self) -> List[SecurityIssue]:
+        end = self.base + len(self.buffer)
+        self._scan_window(end, limit=end + 1)
+        self.buffer = ""
+        return [] if self.whitelisted else self.issues
+    
+    def _scan_window(self, end: int, limit: int) -> None:
+        """Take the hits starting in [scanned, limit) from the window ending at end"""
+        if self.whitelisted:
+            return
+        rule_set = self.rule_set
+        buffer = self.buffer
+        if rule_set.is_whitelisted(buffer):
+            self.whitelisted = True
+            self.issues = []
+            return
+        
+        folded = fold_case(buffer)
+        keywords = rule_set.prefilter.keywords
+        base = self.base
+        budget = line_time_budget(end - self.scanned)
+        for rule in rule_set.rules:
+            if rule.index in self.timed_out:
+                continue
+            if rule.keywords and not any(keywords[k] in folded for k in rule.keyword_ids):
+                continue
+            # Resume after the rule's last hit; pos/endpos (not a slice) let \b, ^
+            # and lookbehind see the real preceding character
+            pos = max(self.scanned, self.resume.get(rule.index, 0))
+            started = perf_counter()
+            for match in rule.regex.finditer(buffer, pos - base, end - base):
+                start, stop = match.start() + base, match.end() + base
+                if start >= limit:
+                    break
+                # An empty match would otherwise be found again at the same offset
+                self.resume[rule.index] = stop if stop > start else stop + 1
+                excerpt = buffer[max(0, match.start() - LONG_LINE_EXCERPT_CHARS):
+                                 match.end() + LONG_LINE_EXCERPT_CHARS]
+                self.issues.append(SecurityIssue(
+                    level=rule.level,
+                    category=rule.category,
+                    description=rule.description,
+                    line_number=self.line_number,
+                    line_content=excerpt.strip(),
+                    suggestion=rule.suggestion
+                ))
+            elapsed = perf_counter() - started
+            if elapsed > budget:
+                self.rule_set.time_out(
+                    rule, self.timed_out,
+                    f"行 {self.line_number} の{end - self.scanned}文字の評価に"
+                    f"{elapsed * 1000:.0f}msかかりました"
+                )
+
+@dataclass
+class _IncrementalState:
+    """Previous scan of a file kept for incremental re-scans"""
+    rule_set: CompiledRuleSet
+    line_hashes: List[int]
+    content_length: int
+    hits: List[RuleHit]
+
+class RuleRegistry:
+    """Process-wide cache of compiled rule sets per rules file, recompiled when the file changes"""
+    
+    def __init__(self, check_interval: float = RULE_RELOAD_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # key -> (rule set, file signature, last check time)
+        self._entries: Dict[str, Tuple[CompiledRuleSet, Optional[Tuple[int, int]], float]] = {}
+    
+    @staticmethod
+    def _key(config_file: Optional[str]) -> str:
+        return os.path.abspath(config_file) if config_file else ""
+    
+    @staticmethod
+    def _signature(config_file: Optional[str]) -> Optional[Tuple[int, int]]:
+        if not config_file:
+            return None
+        try:
+            stat = os.stat(config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def get(self, config_file: Optional[str],
+            loader: Callable[[Optional[str]], CompiledRuleSet]) -> CompiledRuleSet:
+        """Return the current rule set for config_file, compiling it if needed"""
+        key = self._key(config_file)
+        entry = self._entries.get(key)
+        now = perf_counter()
+        if entry is not None and now - entry[2] < self.check_interval:
+            return entry[0]
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            signature = self._signature(config_file)
+            if entry is not None and entry[1] == signature:
+                self._entries[key] = (entry[0], signature, now)
+                return entry[0]
+            
+            try:
+                rule_set = loader(config_file)
+            except Exception as e:
+                if entry is None:
+                    raise
+                logger.error(f"Failed to reload security rules from {config_file}: {e}")
+                self._entries[key] = (entry[0], signature, now)
+                return entry[0]
+            
+            if entry is not None:
+                logger.info(f"Reloaded security rules from {config_file}")
+            self._entries[key] = (rule_set, signature, now)
+            return rule_set
+    
+    def version(self, config_file: Optional[str]) -> Optional[str]:
+        """Fingerprint of the rule set currently loaded for config_file"""
+        entry = self._entries.get(self._key(config_file))
+        return entry[0].fingerprint if entry else None
+    
+    def clear(self) -> None:
+        """Drop every compiled rule set"""
+        with self._lock:
+            self._entries.clear()
+
+# Shared by all scanners in this process
+RULE_REGISTRY = RuleRegistry()
+
 class SecurityScanner:
     """Scan content for security issues before uploading to Qiita"""
     
-    def __init__(self, config_file: str = None):
-        self.patterns = self._load_security_patterns(config_file)
-        self.whitelist_patterns = self._load_whitelist_patterns()
+    def __init__(self, config_file: str = None, cache: Optional[ScanCache] = None,
+                 registry: Optional[RuleRegistry] = None):
+        self.config_file = config_file
+        self.cache = cache
+        self.registry = registry or RULE_REGISTRY
+        self._incremental: "OrderedDict[str, _IncrementalState]" = OrderedDict()
+        self.text_decoder = TextDecoder()
+        # Load eagerly so a broken rules file fails here rather than mid-scan
+        self.registry.get(config_file, self._compile_rules)
+    
+    @property
+    def rule_set(self) -> CompiledRuleSet:
+        """Current compiled rules, reloaded when the rules file changes"""
+        return self.registry.get(self.config_file, self._compile_rules)
+    
+    @property
+    def rules_version(self) -> str:
+        """Identifies the current rules; usable as part of a cache key"""
+        return self.rule_set.fingerprint
+    
+    @property
+    def patterns(self) -> Dict[str, List[Dict]]:
+        return self.rule_set.patterns
+    
+    @property
+    def whitelist_patterns(self) -> List[str]:
+        return self.rule_set.whitelist_patterns
+    
+    def _compile_rules(self, config_file: Optional[str]) -> CompiledRuleSet:
+        return CompiledRuleSet(
+            self._load_security_patterns(config_file), self._load_whitelist_patterns()
+        )
     
     def _load_security_patterns(self, config_file: str = None) -> Dict[str, List[Dict]]:
         """Load security scanning patterns"""
@@ -152,80 +754,260 @@ class SecurityScanner:
             r"sample_password"
         ]
     
-    def scan_content(self, content: str, file_path: str = "") -> List[SecurityIssue]:
-        """Scan content for security issues"""
-        issues = []
-        lines = content.split('\n')
+    def scan_content(self, content: str, file_path: str = "",
+                     skip_levels: Iterable[str] = ()) -> List[SecurityIssue]:
+        """Scan content for security issues (skip_levels: rules known not to match, e.g. after the gate)"""
+        rule_set = self.rule_set
+        index = LineIndex(content)
+        timed_out = rule_set.new_timed_out()
+        hits = self._cached_scan(content, rule_set, lambda: rule_set.scan(
+            content, index, skip_levels=skip_levels, timed_out=timed_out
+        ), timed_out)
+        return self._build_issues(hits, index, rule_set, timed_out)
+    
+    def find_blocking_issue(self, content: str) -> Optional[SecurityIssue]:
+        """Gate scan: the first critical issue, or None; raises IncompleteScanError if a critical rule was cut short"""
+        rule_set = self.rule_set
+        index = LineIndex(content)
+        timed_out = rule_set.new_timed_out(levels=("critical",))
+        hit = rule_set.first_hit(content, index, levels=("critical",), timed_out=timed_out)
+        if hit is None:
+            if timed_out:
+                raise IncompleteScanError(
+                    "重大な問題を検出するルールの評価が時間内に終わらなかったため、"
+                    "安全性を確認できませんでした",
+                    rule_set.describe_timed_out(timed_out)
+                )
+            return None
+        return self._build_issues([hit], index, rule_set)[0]
+    
+    def get_gate_report(self, issue: SecurityIssue) -> Dict[str, Any]:
+        """Report for an upload rejected by the gate scan (first issue only)"""
+        return {
+            "status": "critical",
+            "total_issues": 1,
+            "by_level": {issue.level: 1},
+            "by_category": {issue.category: 1},
+            "message": "❌ 重大なセキュリティ問題が見つかりました。修正が必要です。",
+            "issues": [issue],
+            "partial": True
+        }
+    
+    def _cached_scan(self, content: str, rule_set: CompiledRuleSet,
+                     scan: Callable[[], List[RuleHit]],
+                     timed_out: Dict[int, str]) -> List[RuleHit]:
+        """Hits from the persistent cache, running scan() on a miss; incomplete scans are not cached"""
+        if self.cache is None:
+            return scan()
         
-        for line_num, line in enumerate(lines, 1):
-            # Skip if line matches whitelist patterns
-            if self._is_whitelisted(line):
-                continue
-            
-            # Check all security patterns
-            for category, patterns in self.patterns.items():
-                for pattern_config in patterns:
-                    pattern = pattern_config["pattern"]
-                    matches = re.finditer(pattern, line)
-                    
-                    for match in matches:
-                        issue = SecurityIssue(
-                            level=pattern_config["level"],
-                            category=category,
-                            description=pattern_config["description"],
-                            line_number=line_num,
-                            line_content=line.strip(),
-                            suggestion=pattern_config.get("suggestion", "")
-                        )
-                        issues.append(issue)
+        key = ScanCache.make_key(content, rule_set.fingerprint)
+        cached = self.cache.get(key)
+        if cached is not None:
+            # Only complete scans are cached, disabled rules included
+            timed_out.clear()
+            return [tuple(hit) for hit in cached]
         
-        return issues
+        hits = scan()
+        if not timed_out:
+            self.cache.put(key, hits)
+        return hits
+    
+    def scan_incremental(self, content: str, file_path: str,
+                         skip_levels: Iterable[str] = ()) -> List[SecurityIssue]:
+        """Scan content, re-scanning only the lines changed since the previous scan of the same file"""
+        rule_set = self.rule_set
+        index = LineIndex(content)
+        line_hashes = [hash(line) for line in content.split('\n')]
+        previous = self._incremental.get(file_path)
+        timed_out = rule_set.new_timed_out()
+        
+        if previous is None or previous.rule_set is not rule_set:
+            hits = self._cached_scan(content, rule_set, lambda: rule_set.scan(
+                content, index, skip_levels=skip_levels, timed_out=timed_out
+            ), timed_out)
+        else:
+            hits = self._cached_scan(content, rule_set, lambda: self._rescan_changed(
+                content, index, line_hashes, previous, skip_levels, timed_out
+            ), timed_out)
+        
+        if timed_out:
+            # Incomplete hits must not be carried over into later scans
+            self._incremental.pop(file_path, None)
+            return self._build_issues(hits, index, rule_set, timed_out)
+        
+        self._incremental[file_path] = _IncrementalState(
+            rule_set=rule_set,
+            line_hashes=line_hashes,
+            content_length=len(content),
+            hits=hits
+        )
+        self._incremental.move_to_end(file_path)
+        while len(self._incremental) > INCREMENTAL_MAX_FILES:
+            self._incremental.popitem(last=False)
+        
+        return self._build_issues(hits, index, rule_set)
+    
+    def _rescan_changed(self, content: str, index: LineIndex, line_hashes: List[int],
+                        previous: _IncrementalState, skip_levels: Iterable[str] = (),
+                        timed_out: Optional[Dict[int, str]] = None) -> List[RuleHit]:
+        """Merge carried-over hits with a scan of the changed line range"""
+        old_hashes = previous.line_hashes
+        old_count, new_count = len(old_hashes), len(line_hashes)
+        
+        prefix = 0
+        limit = min(old_count, new_count)
+        while prefix < limit and old_hashes[prefix] == line_hashes[prefix]:
+            prefix += 1
+        if prefix == old_count == new_count:
+            return previous.hits
+        
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and old_hashes[-1 - suffix] == line_hashes[-1 - suffix]:
+            suffix += 1
+        
+        # Changed lines (1-based, inclusive) widened by the safety margin
+        first = max(1, prefix + 1 - INCREMENTAL_MARGIN_LINES)
+        last = min(new_count, new_count - suffix + INCREMENTAL_MARGIN_LINES)
+        old_last = min(old_count, old_count - suffix + INCREMENTAL_MARGIN_LINES)
+        line_shift = new_count - old_count
+        offset_shift = len(content) - previous.content_length
+        
+        hits = [hit for hit in previous.hits if hit[0] < first]
+        
+        if first <= last:
+            start = index.line_span(first)[0]
+            end = index.line_span(last)[1]
+            for line_number, rule_index, hit_start, hit_end in previous.rule_set.scan(
+                    content[start:end], skip_levels=skip_levels, timed_out=timed_out):
+                hits.append((line_number + first - 1, rule_index,
+                             hit_start + start, hit_end + start))
+        
+        hits.extend(
+            (line_number + line_shift, rule_index, hit_start + offset_shift, hit_end + offset_shift)
+            for line_number, rule_index, hit_start, hit_end in previous.hits
+            if line_number > old_last
+        )
+        return hits
+    
+    def _build_issues(self, hits: List[RuleHit], index: LineIndex, rule_set: CompiledRuleSet,
+                      timed_out: Optional[Dict[int, str]] = None) -> IssueStore:
+        """Wrap rule hits in a lazily materialized issue list"""
+        return IssueStore(rule_set, index, hits, timed_out)
     
     def _is_whitelisted(self, line: str) -> bool:
         """Check if line matches whitelist patterns"""
-        for pattern in self.whitelist_patterns:
-            if re.search(pattern, line, re.IGNORECASE):
-                return True
-        return False
+        return self.rule_set.is_whitelisted(line)
+    
+    def scan_stream(self, stream: TextIO, chunk_chars: int = STREAM_CHUNK_CHARS) -> List[SecurityIssue]:
+        """Scan a text stream in chunks of complete lines without holding it in memory"""
+        rule_set = self.rule_set
+        # Shared by every block, so a rule cut short stays off for the rest of the file
+        timed_out = rule_set.new_timed_out()
+        issues = IssueList(timed_out=timed_out)
+        line_base = 0  # complete lines already scanned
+        carry = ""
+        long_line: Optional[_LongLineScanner] = None
+        
+        while True:
+            chunk = stream.read(chunk_chars)
+            eof = not chunk
+            text = carry + chunk
+            carry = ""
+            
+            if long_line is not None:
+                newline = text.find('\n')
+                if newline == -1 and not eof:
+                    long_line.feed(text)
+                    continue
+                long_line.feed(text if newline == -1 else text[:newline])
+                issues.extend(long_line.finish())
+                long_line = None
+                line_base += 1
+                if newline == -1:
+                    break
+                text = text[newline + 1:]
+            
+            if eof:
+                issues.extend(self._scan_block(text, line_base, rule_set, timed_out))
+                break
+            
+            cut = text.rfind('\n')
+            if cut != -1:
+                issues.extend(self._scan_block(text[:cut], line_base, rule_set, timed_out))
+                line_base += text.count('\n', 0, cut) + 1
+                text = text[cut + 1:]
+            
+            if len(text) > STREAM_MAX_LINE_CHARS:
+                long_line = _LongLineScanner(rule_set, line_base + 1, timed_out)
+                long_line.feed(text)
+            else:
+                carry = text
+        
+        return issues
+    
+    def _scan_block(self, block: str, line_base: int, rule_set: CompiledRuleSet,
+                    timed_out: Dict[int, str]) -> List[SecurityIssue]:
+        """Scan a block of complete lines that starts after line_base lines"""
+        index = LineIndex(block)
+        # The block is discarded after this call, so materialize its issues
+        issues = list(self._build_issues(
+            rule_set.scan(block, index, timed_out=timed_out), index, rule_set
+        ))
+        for issue in issues:
+            issue.line_number += line_base
+        return issues
     
     def scan_file(self, file_path: str) -> List[SecurityIssue]:
-        """Scan a file for security issues"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return self.scan_content(content, file_path)
-        except Exception as e:
-            logger.error(f"Error scanning file {file_path}: {e}")
-            return []
+        """Scan a file; unreadable or undecodable files raise instead of being reported clean"""
+        if os.path.getsize(file_path) > STREAM_THRESHOLD_BYTES:
+            with self.text_decoder.open(file_path) as f:
+                return self.scan_stream(f)
+        
+        content = self.text_decoder.read(file_path, strict=True)
+        return self.scan_content(content, file_path)
     
     def get_security_report(self, issues: List[SecurityIssue]) -> Dict[str, Any]:
-        """Generate a security report"""
-        if not issues:
-            return {
+        """Generate a security report (status "error" if the time guard cut a critical rule short)"""
+        timed_out = getattr(issues, "timed_out", None) or {}
+        timed_out_rules = self.rule_set.describe_timed_out(timed_out)
+        critical_unchecked = [r for r in timed_out_rules if r["level"] == "critical"]
+        
+        if not issues and not critical_unchecked:
+            report = {
                 "status": "passed",
                 "total_issues": 0,
                 "by_level": {},
                 "by_category": {},
                 "message": "セキュリティチェックに問題はありませんでした"
             }
+            if timed_out_rules:
+                report["timed_out_rules"] = timed_out_rules
+            return report
         
-        # Count by level
+        # Count by level and category in a single pass
         by_level = {}
-        for issue in issues:
-            by_level[issue.level] = by_level.get(issue.level, 0) + 1
-        
-        # Count by category
         by_category = {}
-        for issue in issues:
-            by_category[issue.category] = by_category.get(issue.category, 0) + 1
+        if isinstance(issues, IssueStore):
+            rules = issues.rule_set.rules
+            counts = ((rules[i].level, rules[i].category, n) for i, n in issues.rule_counts().items())
+        else:
+            counts = ((issue.level, issue.category, 1) for issue in issues)
+        for level, category, count in counts:
+            by_level[level] = by_level.get(level, 0) + count
+            by_category[category] = by_category.get(category, 0) + count
         
         # Determine overall status
-        has_critical = any(issue.level == "critical" for issue in issues)
-        has_high = any(issue.level == "high" for issue in issues)
+        has_critical = "critical" in by_level
+        has_high = "high" in by_level
         
         if has_critical:
             status = "critical"
             message = "❌ 重大なセキュリティ問題が見つかりました。修正が必要です。"
+        elif critical_unchecked:
+            status = "error"
+            message = ("❌ 重大な問題を検出するルールの評価が時間内に終わらなかったため、"
+                       "安全性を確認できませんでした。")
         elif has_high:
             status = "high"
             message = "⚠️ 高レベルのセキュリティ問題が見つかりました。確認が必要です。"
@@ -233,7 +1015,7 @@ class SecurityScanner:
             status = "warning"
             message = "⚠️ セキュリティに関する注意事項があります。確認をお勧めします。"
         
-        return {
+        report = {
             "status": status,
             "total_issues": len(issues),
             "by_level": by_level,
@@ -241,26 +1023,42 @@ class SecurityScanner:
             "message": message,
             "issues": issues
         }
+        if timed_out_rules:
+            report["timed_out_rules"] = timed_out_rules
+        return report
     
     def should_block_upload(self, issues: List[SecurityIssue]) -> bool:
         """Determine if upload should be blocked based on security issues"""
+        timed_out = getattr(issues, "timed_out", None) or {}
+        if any(self.rule_set.rules[i].level == "critical" for i in timed_out):
+            # A critical rule was not fully evaluated; never treat that as clean
+            return True
+        if isinstance(issues, IssueStore):
+            rules = issues.rule_set.rules
+            return any(rules[i].level == "critical" for i in issues.rule_counts())
         return any(issue.level in ["critical"] for issue in issues)
     
     def format_report_for_display(self, report: Dict[str, Any]) -> str:
         """Format security report for console display"""
+        timed_out_lines = []
+        for rule in report.get("timed_out_rules", []):
+            timed_out_lines.append(f"  ⏱️ [{rule['category']}] {rule['description']} ({rule['reason']})")
+        if timed_out_lines:
+            timed_out_lines.insert(0, "\n時間超過のため評価を打ち切ったルール:")
+        
         if report["status"] == "passed":
-            return "✅ セキュリティチェック: 問題なし"
+            return "\n".join(["✅ セキュリティチェック: 問題なし"] + timed_out_lines)
         
         output = [f"\n{report['message']}"]
         output.append(f"検出された問題: {report['total_issues']}件")
         
-        if report["by_level"]:
+        if report.get("by_level"):
             output.append("\n問題レベル別:")
             for level, count in sorted(report["by_level"].items()):
                 emoji = {"critical": "🔴", "high": "🟠", "medium": "🟡", "low": "🔵"}.get(level, "⚪")
                 output.append(f"  {emoji} {level}: {count}件")
         
-        if "issues" in report:
+        if report.get("issues"):
             output.append("\n詳細:")
             for i, issue in enumerate(report["issues"][:10], 1):  # Show first 10 issues
                 output.append(f"\n{i}. [{issue.level.upper()}] {issue.description}")
@@ -271,4 +1069,13 @@ class SecurityScanner:
             if len(report["issues"]) > 10:
                 output.append(f"\n... および他 {len(report['issues']) - 10} 件")
         
-        return "\n".join(output)
\ No newline at end of file
+        output.extend(timed_out_lines)
+        return "\n".join(output)
+
+def report_to_json(report: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Copy of a security report with issues converted to plain dicts"""
+    if not report or "issues" not in report:
+        return report
+    serializable = dict(report)
+    serializable["issues"] = [asdict(issue) for issue in report["issues"]]
+    return serializable
@@ -0,0 +1,211 @@
+"""
+Persistent per-file upload state
+"""
+import hashlib
+import json
+import os
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DB = ".autoqiita/state.db"
+# JSON state written by earlier versions, imported into the database once
+DEFAULT_STATE_FILE = ".autoqiita/state.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT,
+    body_hash TEXT,
+    item_id TEXT,
+    url TEXT,
+    title TEXT,
+    diff_item_id TEXT,
+    diff_url TEXT,
+    parts TEXT,
+    uploaded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS uploads_content_hash ON uploads (content_hash);
+"""
+_COLUMNS = ("content_hash", "body_hash", "item_id", "url", "title",
+            "diff_item_id", "diff_url", "parts", "uploaded_at")
+
+def normalize_source(data: bytes) -> bytes:
+    """Drop differences that do not change the content (BOM, CRLF, trailing newlines)"""
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    return data.replace(b"\r\n", b"\n").rstrip(b"\n")
+
+def source_hash(file_path: str, max_bytes: Optional[int] = None) -> str:
+    """Hash of a file's normalized source; oversized files are identified by their head, size and mtime"""
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        if max_bytes is None or stat.st_size <= max_bytes:
+            return hashlib.sha256(normalize_source(f.read())).hexdigest()
+        digest = hashlib.sha256(f.read(max_bytes))
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode("ascii"))
+    return digest.hexdigest()
+
+def body_hash(body: str) -> str:
+    """Hash of a draft body as it would be sent to Qiita"""
+    return hashlib.sha256(body.encode("utf-8", "surrogatepass")).hexdigest()
+
+class UploadStateStore:
+    """Remember what was last uploaded for each file, in SQLite keyed by absolute path"""
+
+    def __init__(self, db_file: str = DEFAULT_STATE_DB, legacy_file: str = DEFAULT_STATE_FILE):
+        self.db_file = Path(db_file)
+        # Uploads may record state from worker threads
+        self._lock = threading.RLock()
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self._migrate(Path(legacy_file))
+
+    def _migrate(self, legacy_file: Path) -> None:
+        """Import the JSON state of earlier versions into an empty database"""
+        if not legacy_file.exists():
+            return
+        if self._conn.execute("SELECT 1 FROM uploads LIMIT 1").fetchone():
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                files = json.load(f).get("files", {})
+            rows = [
+                (path, *(json.dumps(entry[c]) if c == "parts" and entry.get(c) is not None
+                         else entry.get(c) for c in _COLUMNS))
+                for path, entry in files.items()
+            ]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO uploads (path, {', '.join(_COLUMNS)}) "
+                    f"VALUES (?{', ?' * len(_COLUMNS)})", rows
+                )
+            os.replace(legacy_file, legacy_file.with_name(legacy_file.name + ".migrated"))
+            logger.info(f"Migrated upload state of {len(rows)} files from {legacy_file} to {self.db_file}")
+        except (OSError, ValueError, AttributeError, sqlite3.Error) as e:
+            logger.warning(f"Could not migrate upload state {legacy_file}: {e}")
+
+    def _write(self, sql: str, params: tuple) -> None:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Could not write upload state {self.db_file}: {e}")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return str(Path(file_path).resolve())
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Last recorded upload of file_path, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM uploads WHERE path = ?", (self._key(file_path),)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = {c: row[c] for c in _COLUMNS if row[c] is not None}
+        if "parts" in entry:
+            entry["parts"] = json.loads(entry["parts"])
+        return entry
+
+    def item_id(self, file_path: str) -> Optional[str]:
+        """Draft a single-body upload of file_path should update"""
+        entry = self.get(file_path) or {}
+        parts = entry.get("parts") or []
+        return entry.get("item_id") or (parts[0].get("item_id") if parts else None)
+
+    def is_unchanged(self, file_path: str, content_hash: str) -> bool:
+        """True if content_hash is what was last uploaded for file_path"""
+        entry = self.get(file_path)
+        return bool(entry) and entry.get("content_hash") == content_hash
+
+    def is_body_unchanged(self, file_path: str, body_digest: str) -> bool:
+        """True if a body with this hash was the last one uploaded for file_path"""
+        entry = self.get(file_path)
+        return bool(entry) and entry.get("body_hash") == body_digest
+
+    def adopt_moved(self, file_path: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Take over the entry of a file that was moved or renamed to file_path"""
+        key = self._key(file_path)
+        with self._lock:
+            if self.get(file_path) is not None:
+                return None
+            rows = self._conn.execute(
+                "SELECT path FROM uploads WHERE content_hash = ? AND path != ?", (content_hash, key)
+            ).fetchall()
+            for row in rows:
+                if os.path.exists(row["path"]):
+                    continue
+                self._write("UPDATE uploads SET path = ?, content_hash = NULL WHERE path = ?",
+                            (key, row["path"]))
+                logger.info(f"{file_path} continues the upload history of {row['path']}")
+                return self.get(file_path)
+        return None
+
+    def update_content_hash(self, file_path: str, content_hash: str) -> None:
+        """Note that file_path now has content_hash without a new upload"""
+        self._write("UPDATE uploads SET content_hash = ? WHERE path = ?",
+                    (content_hash, self._key(file_path)))
+
+    def record_upload(self, file_path: str, content_hash: str, result: Dict[str, Any],
+                      body_digest: Optional[str] = None) -> None:
+        """Record a successful upload and the Qiita item it created or updated"""
+        # The diff article columns are kept so later diffs update it in place
+        self._write(
+            """INSERT INTO uploads (path, content_hash, body_hash, item_id, url, title, uploaded_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (path) DO UPDATE SET
+                   content_hash = excluded.content_hash, body_hash = excluded.body_hash,
+                   item_id = excluded.item_id, url = excluded.url, title = excluded.title,
+                   parts = NULL, uploaded_at = excluded.uploaded_at""",
+            (self._key(file_path), content_hash, body_digest, result.get("id"),
+             result.get("url"), result.get("title"), datetime.now().isoformat())
+        )
+
+    def record_diff_upload(self, file_path: str, content_hash: str, result: Dict[str, Any]) -> None:
+        """Record an upload of the diff article draft for file_path"""
+        self._write(
+            """INSERT INTO uploads (path, content_hash, diff_item_id, diff_url, uploaded_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (path) DO UPDATE SET
+                   content_hash = excluded.content_hash, diff_item_id = excluded.diff_item_id,
+                   diff_url = excluded.diff_url, uploaded_at = excluded.uploaded_at""",
+            (self._key(file_path), content_hash, result.get("id"), result.get("url"),
+             datetime.now().isoformat())
+        )
+
+    def record_series(self, file_path: str, content_hash: Optional[str],
+                      parts: List[Dict[str, Any]]) -> None:
+        """Record the parts of a document uploaded as a multi-part series"""
+        first = parts[0] if parts else {}
+        self._write(
+            """INSERT INTO uploads (path, content_hash, body_hash, item_id, url, title, parts, uploaded_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (path) DO UPDATE SET
+                   content_hash = excluded.content_hash,
+                   body_hash = COALESCE(excluded.body_hash, uploads.body_hash),
+                   item_id = COALESCE(excluded.item_id, uploads.item_id),
+                   url = COALESCE(excluded.url, uploads.url),
+                   title = COALESCE(excluded.title, uploads.title),
+                   parts = excluded.parts, uploaded_at = excluded.uploaded_at""",
+            (self._key(file_path), content_hash, first.get("body_hash"), first.get("item_id"),
+             first.get("url"), first.get("title"), json.dumps(parts, ensure_ascii=False),
+             datetime.now().isoformat())
+        )
+
+    def forget(self, file_path: str) -> None:
+        """Drop the state of a file so its next save uploads again"""
+        self._write("DELETE FROM uploads WHERE path = ?", (self._key(file_path),))
@@ -0,0 +1,99 @@
+"""
+Bounded preview of CSV/TSV files: the first rows as a Markdown table plus row/column counts
+"""
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from .text_decoder import TextDecoder
+
+# Data rows shown in the preview table
+PREVIEW_ROWS = 20
+# Bytes read from the head of the file for the preview rows
+PREVIEW_BYTES = 256 * 1024
+# Columns and characters per cell kept in the preview table
+PREVIEW_COLUMNS = 20
+PREVIEW_CELL_CHARS = 80
+# Newlines are counted exactly up to this many bytes, estimated beyond it
+EXACT_COUNT_BYTES = 16 * 1024 * 1024
+# Bytes read at a time while counting newlines
+COUNT_CHUNK_BYTES = 1024 * 1024
+
+@dataclass
+class TablePreview:
+    """First rows of a delimited file and its size in rows and columns"""
+    header: List[str] = field(default_factory=list)
+    rows: List[List[str]] = field(default_factory=list)
+    row_count: int = 0  # data rows, excluding the header
+    row_count_exact: bool = True
+    column_count: int = 0
+
+    def markdown_table(self) -> str:
+        """Markdown table of the preview rows (extra columns and long cells cut)"""
+        if not self.header:
+            return ""
+        width = min(self.column_count, PREVIEW_COLUMNS)
+
+        def line(cells: List[str]) -> str:
+            cells = (cells + [""] * width)[:width]
+            return "| " + " | ".join(_cell(cell) for cell in cells) + " |"
+
+        lines = [line(self.header), "|" + "---|" * width]
+        lines += [line(row) for row in self.rows]
+        return '\n'.join(lines)
+
+def _cell(value: str) -> str:
+    value = " ".join(value.split())
+    if len(value) > PREVIEW_CELL_CHARS:
+        value = value[:PREVIEW_CELL_CHARS - 1] + "…"
+    return value.replace("|", "\\|")
+
+def count_lines(file_path: str, size: int) -> Tuple[int, bool]:
+    """Return (lines, exact), extrapolated from the first EXACT_COUNT_BYTES for large files"""
+    counted = 0
+    lines = 0
+    last = b""
+    with open(file_path, 'rb') as f:
+        while counted < EXACT_COUNT_BYTES:
+            chunk = f.read(min(COUNT_CHUNK_BYTES, EXACT_COUNT_BYTES - counted))
+            if not chunk:
+                break
+            lines += chunk.count(b"\n")
+            counted += len(chunk)
+            last = chunk[-1:]
+
+    if counted < size:
+        return (round(lines * size / counted) if counted else 0), False
+    if last and last != b"\n":
+        lines += 1  # final line without a newline
+    return lines, True
+
+def read_table_preview(file_path: str, delimiter: str, decoder: TextDecoder,
+                       max_rows: int = PREVIEW_ROWS) -> TablePreview:
+    """Read the header and first max_rows rows of a CSV/TSV file"""
+    # TextDecoder.read cuts a truncated head back to the last complete line
+    text = decoder.read(file_path, PREVIEW_BYTES)
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+
+    preview = TablePreview()
+    try:
+        for row in reader:
+            if not row:
+                continue
+            if not preview.header:
+                preview.header = row
+            elif len(preview.rows) < max_rows:
+                preview.rows.append(row)
+            else:
+                break
+            preview.column_count = max(preview.column_count, len(row))
+    except csv.Error:
+        pass  # malformed or over-long field: keep the rows read so far
+
+    size = os.path.getsize(file_path)
+    lines, preview.row_count_exact = count_lines(file_path, size)
+    # The header is one line; blank lines are rare enough to ignore
+    preview.row_count = max(lines - 1, len(preview.rows))
+    return preview
@@ -0,0 +1,158 @@
+"""
+Byte-level text encoding detection
+"""
+import codecs
+import logging
+import re
+from typing import Dict, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes fed to the incremental UTF-8 decoder at a time
+UTF8_CHECK_CHUNK = 64 * 1024
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Bytes checked when confirming that a remembered legacy encoding still applies
+UTF8_PROBE_BYTES = 4096
+# Bytes read to pick the encoding of a file opened as a stream
+STREAM_SNIFF_BYTES = 1024 * 1024
+
+# "\n" in the UTF-16 byte orders, whose text is cut at even offsets only
+_UTF16_NEWLINES = [
+    (codecs.BOM_UTF16_LE, b"\n\x00"),
+    (codecs.BOM_UTF16_BE, b"\x00\n"),
+]
+
+_NON_ASCII_RE = re.compile(rb"[\x80-\xff]")
+# Bytes that occur in Shift_JIS/CP932 text but never in EUC-JP
+_SJIS_ONLY_RE = re.compile(rb"[\x80-\x8d\x90-\x9f]")
+
+def _decode_utf8(data: bytes) -> Optional[str]:
+    """Decode data as UTF-8 in chunks, giving up at the first invalid chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    view = memoryview(data)
+    pieces = []
+    try:
+        for start in range(0, len(view), UTF8_CHECK_CHUNK):
+            pieces.append(decoder.decode(view[start:start + UTF8_CHECK_CHUNK]))
+        pieces.append(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        return None
+    return "".join(pieces)
+
+def _probe_utf8(data: bytes) -> bool:
+    """Check whether the bytes around the first non-ASCII byte are valid UTF-8"""
+    match = _NON_ASCII_RE.search(data)
+    if match is None:
+        return True
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        # final=False tolerates a sequence cut off at the end of the window
+        decoder.decode(data[match.start():match.start() + UTF8_PROBE_BYTES])
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def _japanese_candidates(data: bytes) -> Tuple[str, ...]:
+    """Order the legacy codecs by how likely they are for data"""
+    # EUC-JP never uses 0x80-0x9F except the single shifts 0x8E/0x8F, while
+    # Shift_JIS lead bytes for kana and common kanji live in 0x81-0x9F
+    if _SJIS_ONLY_RE.search(data, 0, UTF8_CHECK_CHUNK):
+        return ("cp932", "euc_jp")
+    return ("euc_jp", "cp932")
+
+def _decode_as(data: bytes, encoding: str) -> Optional[str]:
+    if encoding == "utf-8":
+        return _decode_utf8(data)
+    try:
+        return data.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+def detect_and_decode(data: bytes, hint: Optional[str] = None,
+                      strict: bool = False) -> Tuple[str, str]:
+    """Decode data and return (text, encoding), trying a BOM, the hint, then the supported codecs"""
+    errors = "strict" if strict else "replace"
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding, errors=errors), encoding
+
+    # A legacy hint is only trusted while the file does not look like UTF-8,
+    # so a file converted to UTF-8 is not decoded into mojibake
+    if hint and (hint == "utf-8" or not _probe_utf8(data)):
+        text = _decode_as(data, hint)
+        if text is not None:
+            return text, hint
+
+    if data.isascii():
+        return data.decode("ascii"), "utf-8"
+
+    text = _decode_utf8(data)
+    if text is not None:
+        return text, "utf-8"
+
+    for encoding in _japanese_candidates(data):
+        text = _decode_as(data, encoding)
+        if text is not None:
+            return text, encoding
+
+    if strict:
+        raise UnicodeDecodeError("cp932", data, 0, len(data),
+                                 "not valid UTF-8, CP932 or EUC-JP text")
+    logger.warning("Could not detect text encoding; decoding as cp932 with replacement")
+    return data.decode("cp932", errors="replace"), "cp932"
+
+def cut_at_line_end(data: bytes) -> bytes:
+    """Cut truncated data back to its last complete line, keeping UTF-16 code units whole"""
+    for bom, newline in _UTF16_NEWLINES:
+        if data.startswith(bom):
+            cut = data.rfind(newline)
+            # An odd offset is the second byte of one code unit and the first of the next
+            while cut != -1 and cut % 2:
+                cut = data.rfind(newline, 0, cut + 1)
+            return data[:cut] if cut != -1 else data[:len(data) - len(data) % 2]
+    cut = data.rfind(b"\n")
+    return data[:cut] if cut != -1 else data
+
+def normalize_newlines(text: str) -> str:
+    """Translate CRLF and CR line endings to LF, as text-mode open() does"""
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+class TextDecoder:
+    """Read files as text with a single read and a single decode, remembering each encoding"""
+
+    def __init__(self):
+        self._encodings: Dict[str, str] = {}
+
+    def encoding_for(self, file_path: str) -> Optional[str]:
+        """Encoding detected the last time file_path was read"""
+        return self._encodings.get(file_path)
+
+    def decode(self, file_path: str, data: bytes, strict: bool = False) -> str:
+        """Decode bytes already read from file_path (see detect_and_decode)"""
+        text, encoding = detect_and_decode(data, self._encodings.get(file_path), strict)
+        if self._encodings.get(file_path) != encoding:
+            logger.debug(f"Detected encoding {encoding} for {file_path}")
+            self._encodings[file_path] = encoding
+        return normalize_newlines(text)
+
+    def read(self, file_path: str, max_bytes: Optional[int] = None,
+             strict: bool = False) -> str:
+        """Read and decode a file, or only its first max_bytes cut back to a complete line"""
+        with open(file_path, 'rb') as f:
+            data = f.read() if max_bytes is None else f.read(max_bytes + 1)
+        if max_bytes is not None and len(data) > max_bytes:
+            data = cut_at_line_end(data[:max_bytes])
+        return self.decode(file_path, data, strict)
+
+    def open(self, file_path: str, sniff_bytes: int = STREAM_SNIFF_BYTES) -> TextIO:
+        """Open a file as a strict text stream in the encoding detected from its head"""
+        self.read(file_path, sniff_bytes, strict=True)
+        return open(file_path, 'r', encoding=self._encodings[file_path], errors="strict")
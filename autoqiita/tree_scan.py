@@ -0,0 +1,149 @@
+"""
+Parallel security scanning of whole directory trees
+"""
+import os
+import logging
+import multiprocessing
+from multiprocessing import util as mp_util
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import asdict
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .security_scanner import SecurityScanner
+from .scan_cache import ScanCache
+
+logger = logging.getLogger(__name__)
+
+# Files handed to a worker per task; amortizes IPC for small files
+FILES_PER_TASK = 16
+
+# Scanner built once per worker process by _init_worker
+_worker_scanner: Optional[SecurityScanner] = None
+
+def is_ignored(name: str, ignore_patterns: Iterable[str]) -> bool:
+    """Check a single path component against ignore patterns (names or globs)"""
+    return any(name == pattern or fnmatch(name, pattern) for pattern in ignore_patterns)
+
+def iter_workspace_files(root: str, extensions: Iterable[str],
+                         ignore_patterns: Iterable[str]) -> Iterator[str]:
+    """Yield files under root with a watched extension, pruning ignored directories"""
+    extensions = {ext.lower() for ext in extensions}
+    ignore_patterns = list(ignore_patterns)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not is_ignored(d, ignore_patterns))
+        for filename in sorted(filenames):
+            if is_ignored(filename, ignore_patterns):
+                continue
+            if os.path.splitext(filename)[1].lower() in extensions:
+                yield os.path.join(dirpath, filename)
+
+def _init_worker(config_file: Optional[str], use_cache: bool) -> None:
+    """Load and compile the security rules once per worker process"""
+    global _worker_scanner
+    cache = ScanCache() if use_cache else None
+    _worker_scanner = SecurityScanner(config_file, cache=cache)
+    if cache is not None:
+        # Pool workers leave through os._exit, which skips atexit handlers
+        mp_util.Finalize(cache, cache.flush, exitpriority=10)
+
+def _scan_paths(paths: List[str]) -> List[Dict[str, Any]]:
+    """Worker task: scan a batch of files and return picklable summaries"""
+    results = []
+    for path in paths:
+        try:
+            issues = _worker_scanner.scan_file(path)
+        except Exception as e:
+            # Unreadable or undecodable files were not scanned; never count them as passed
+            logger.error(f"Error scanning file {path}: {e}")
+            results.append({
+                "file_path": path,
+                "status": "error",
+                "message": f"セキュリティスキャンでエラーが発生しました: {e}",
+                "total_issues": 0,
+                "by_level": {},
+                "by_category": {},
+                "issues": []
+            })
+            continue
+        report = _worker_scanner.get_security_report(issues)
+        results.append({
+            "file_path": path,
+            "status": report["status"],
+            "total_issues": report["total_issues"],
+            "by_level": report["by_level"],
+            "by_category": report["by_category"],
+            "issues": [asdict(issue) for issue in issues]
+        })
+    return results
+
+def scan_body(file_path: str, body: str) -> Dict[str, Any]:
+    """Worker task: scan generated content and return a picklable security report"""
+    issues = _worker_scanner.scan_content(body, file_path)
+    report = _worker_scanner.get_security_report(issues)
+    if "issues" in report:
+        # The lazy issue store references the content; send plain issues back
+        report["issues"] = list(report["issues"])
+    return report
+
+def scan_pool(config_file: Optional[str] = None, max_workers: Optional[int] = None,
+              use_cache: bool = True) -> ProcessPoolExecutor:
+    """Process pool whose workers each hold a compiled scanner (see scan_body)"""
+    # Workers start on the first submit; forking then would copy the locks of
+    # whatever threads the caller is running (e.g. process_many's readers)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=context,
+                               initializer=_init_worker, initargs=(config_file, use_cache))
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def scan_tree(paths: Iterable[str], config_file: Optional[str] = None,
+              max_workers: Optional[int] = None, use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+    """Scan files on a process pool, yielding one summary per file as it finishes"""
+    max_workers = max_workers or os.cpu_count() or 1
+    window = max_workers * 4
+    batches = _batched(paths, FILES_PER_TASK)
+
+    with scan_pool(config_file, max_workers, use_cache) as executor:
+        pending = set()
+        for batch in batches:
+            pending.add(executor.submit(_scan_paths, batch))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+def workspace_scan_rules(directory: str) -> Dict[str, List[str]]:
+    """Watched extensions and ignore patterns that apply to a directory"""
+    from .config import DEFAULT_IGNORE_PATTERNS
+    from .extension_manager import FileExtensionManager
+    from .multi_workspace import MultiWorkspaceConfig
+
+    resolved = str(Path(directory).resolve())
+    for workspace in MultiWorkspaceConfig().workspaces:
+        if workspace.get("path") == resolved:
+            return {
+                "extensions": workspace.get("watched_extensions")
+                or FileExtensionManager().list_extensions(),
+                "ignore_patterns": workspace.get("ignore_patterns") or DEFAULT_IGNORE_PATTERNS
+            }
+
+    return {
+        "extensions": FileExtensionManager().list_extensions(),
+        "ignore_patterns": list(DEFAULT_IGNORE_PATTERNS)
+    }
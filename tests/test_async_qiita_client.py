@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+import uuid
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("requests")
+
+from autoqiita.async_qiita_client import AsyncQiitaClient
+from autoqiita.qiita_client import QiitaClient, QiitaDraft
+
+
+def make_client(responses):
+    """AsyncQiitaClient whose pool answers from a list of (status, body)"""
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        status, body = responses.pop(0)
+        return httpx.Response(status, json=body)
+
+    client = AsyncQiitaClient(QiitaClient(f"token-{uuid.uuid4()}"))
+    client._http = httpx.AsyncClient(base_url=client.client.base_url,
+                                     headers=client.client.headers,
+                                     transport=httpx.MockTransport(handler))
+    return client, sent
+
+
+def test_requests_go_through_the_shared_pool():
+    client, sent = make_client([(201, {"id": "a"}), (200, {"id": "a"}), (200, {"id": "a", "title": "T"})])
+
+    async def run():
+        await client.create_draft(QiitaDraft(title="T", body="B"))
+        await client.update_draft("a", QiitaDraft(title="T", body="B2"))
+        item = await client.get_draft("a")
+        await client.aclose()
+        return item
+
+    assert asyncio.run(run())["title"] == "T"
+    assert [(request.method, request.url.path) for request in sent] == [
+        ("POST", "/api/v2/items"), ("PATCH", "/api/v2/items/a"), ("GET", "/api/v2/items/a")
+    ]
+    assert json.loads(sent[1].content)["body"] == "B2"
+    assert sent[0].headers["Authorization"].startswith("Bearer token-")
+    assert client.latency.summary()
+
+
+def test_missing_item_is_recreated():
+    client, sent = make_client([(404, {"message": "Not found"}), (201, {"id": "b"})])
+    client.mirror = None
+
+    result = asyncio.run(client.find_or_create_draft("T", "B", item_id="gone"))
+
+    assert result["id"] == "b"
+    assert [request.method for request in sent] == ["PATCH", "POST"]
+
+
+def test_mcp_save_reads_and_scans_off_the_event_loop(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("uvicorn")
+    pytest.importorskip("dotenv")
+    from autoqiita.config import Config
+    from autoqiita.mcp_server import AutoQiitaMCPServer
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("QIITA_ACCESS_TOKEN", f"token-{uuid.uuid4()}")
+    server = AutoQiitaMCPServer(Config())
+    source = tmp_path / "notes.md"
+    source.write_text("# Notes\n\nhello\n", encoding="utf-8")
+
+    threads = {}
+    process_file = server.content_processor.process_file
+
+    def recording_process_file(*args, **kwargs):
+        threads["process"] = threading.current_thread()
+        return process_file(*args, **kwargs)
+
+    async def fake_upload(title, body, tags, security_report, force_upload, item_id=None):
+        threads["upload"] = threading.current_thread()
+        return {"id": "c", "url": "https://qiita.com/items/c"}
+
+    monkeypatch.setattr(server.content_processor, "process_file", recording_process_file)
+    monkeypatch.setattr(server.async_client, "find_or_create_draft", fake_upload)
+
+    result = asyncio.run(server.save_file_to_qiita(str(source)))
+
+    assert result["success"] and result["qiita_id"] == "c"
+    assert threads["process"] is not threads["upload"]
+    assert threads["upload"] is threading.main_thread()
@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("markdown")
+
+from autoqiita.content_processor import ContentProcessor
+from autoqiita.state_store import UploadStateStore, body_hash
+
+
+def make_processor(**kwargs):
+    kwargs.setdefault("enable_security_scan", False)
+    return ContentProcessor(use_scan_cache=False, **kwargs)
+
+
+@pytest.mark.parametrize("name, text", [
+    ("notes.md", "# Notes\n\nSome text\n"),
+    ("script.py", '"""Tool"""\n\ndef main():\n    return 1\n'),
+    ("notes.txt", "plain text\n"),
+])
+def test_stable_body_is_identical_across_saves(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    processor = make_processor(stable_body=True)
+    assert processor.process_file(str(path))[:3] == processor.process_file(str(path))[:3]
+
+
+def test_timestamped_footer_when_not_stable(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Notes\n")
+    _, body, _, _ = make_processor(stable_body=False).process_file(str(path))
+    assert "*Last updated:" in body and body.rstrip().endswith("*Source: notes.md*")
+
+
+def test_unchanged_body_is_detected(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Notes\n")
+    store = UploadStateStore(str(tmp_path / "state.db"), str(tmp_path / "state.json"))
+    _, body, _, _ = make_processor().process_file(str(path))
+    store.record_upload(str(path), "h1", {"id": "item1"}, body_hash(body))
+    path.write_text("# Notes\r\n")
+    _, body, _, _ = make_processor().process_file(str(path))
+    assert store.is_body_unchanged(str(path), body_hash(body))
+    store.close()
+
+
+@pytest.fixture
+def splitter():
+    return make_processor(max_body_chars=400)
+
+
+def body_lines(part_body):
+    """Lines of a part without its navigation header"""
+    return part_body.split("\n\n", 1)[1].split("\n")
+
+
+def test_short_body_is_one_part(splitter):
+    assert splitter.split_body("Title", "short") == [("Title", "short")]
+
+
+def test_split_at_headings(splitter):
+    sections = [f"## Section {i}\n" + "text line\n" * 20 for i in range(5)]
+    body = "\n".join(sections)
+    parts = splitter.split_body("Title", body)
+    assert len(parts) > 1
+    assert [title for title, _ in parts] == [f"Title (Part {i}/{len(parts)})" for i in range(1, len(parts) + 1)]
+    for _, part_body in parts[1:]:
+        assert body_lines(part_body)[0].startswith("## Section")
+    assert [line for _, part_body in parts for line in body_lines(part_body)] == body.split("\n")
+
+
+def test_code_block_is_closed_and_reopened(splitter):
+    code = "\n".join(f"def f{i}():\n" + "    return 1\n" * 10 for i in range(6))
+    body = "Intro\n\n```python\n" + code + "\n```\nOutro"
+    parts = splitter.split_body("Title", body)
+    assert len(parts) > 1
+    for _, part_body in parts:
+        fences = [line for line in body_lines(part_body) if line.startswith("```")]
+        assert len(fences) % 2 == 0
+    for _, part_body in parts[1:]:
+        lines = body_lines(part_body)
+        assert lines[0] == "```python" and lines[1].startswith("def ")
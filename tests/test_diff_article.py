@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from autoqiita.diff_article import (
+    DIFF_MIN_CHARS, SnapshotStore, build_diff_body, is_diff_candidate, upload_diff_article
+)
+from autoqiita.state_store import UploadStateStore
+
+OLD = "\n".join(f"def f{i}():\n    return {i}\n" for i in range(40))
+NEW = OLD.replace("return 7\n", "return 70\n")
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def create_draft(self, draft):
+        self.calls.append(("create", draft.title))
+        return {"id": "diff1", "url": "https://qiita.com/diff1"}
+
+    def update_draft(self, item_id, draft):
+        self.calls.append(("update", item_id))
+        return {"id": item_id}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UploadStateStore(str(tmp_path / "state.db"), str(tmp_path / "state.json"))
+    yield store
+    store.close()
+
+
+def test_is_diff_candidate():
+    assert is_diff_candidate("a.py", "x" * DIFF_MIN_CHARS)
+    assert not is_diff_candidate("a.py", "x" * (DIFF_MIN_CHARS - 1))
+    assert not is_diff_candidate("a.md", "x" * DIFF_MIN_CHARS)
+
+
+def test_diff_body_lists_hunks_and_changed_definitions():
+    body = build_diff_body("Tool", "tool.py", OLD, NEW, "https://qiita.com/full")
+    assert "全文: https://qiita.com/full" in body
+    assert "- `def f7()`" in body and "- `def f20()`" not in body
+    assert "-    return 7" in body and "+    return 70" in body
+    assert body.endswith("*Source: tool.py*")
+
+
+def test_no_diff_body_when_unchanged():
+    assert build_diff_body("Tool", "tool.py", OLD, OLD, None) is None
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshots = SnapshotStore(str(tmp_path / "snapshots"))
+    assert snapshots.load("a.py") is None
+    snapshots.save("a.py", "line\r\n")
+    assert snapshots.load("a.py") == "line\r\n"
+
+
+def test_diff_article_is_created_then_updated(store, tmp_path):
+    path = str(tmp_path / "tool.py")
+    snapshots = SnapshotStore(str(tmp_path / "snapshots"))
+    client = FakeClient()
+    full_body = "x" * len(NEW) * 2
+    # Nothing to diff against before the first full upload
+    assert upload_diff_article(client, store, snapshots, path, "h1", "Tool", NEW, full_body) is None
+
+    store.record_upload(path, "h0", {"id": "full", "url": "https://qiita.com/full"})
+    snapshots.save(path, OLD)
+    result = upload_diff_article(client, store, snapshots, path, "h1", "Tool", NEW, full_body)
+    assert result["id"] == "diff1"
+    assert store.get(path)["diff_item_id"] == "diff1"
+    assert store.get(path)["item_id"] == "full"
+
+    upload_diff_article(client, store, snapshots, path, "h2", "Tool", NEW + "\n# end\n", full_body)
+    assert client.calls == [("create", "Tool (差分)"), ("update", "diff1")]
+
+
+def test_full_upload_when_diff_is_not_smaller(store, tmp_path):
+    path = str(tmp_path / "tool.py")
+    snapshots = SnapshotStore(str(tmp_path / "snapshots"))
+    store.record_upload(path, "h0", {"id": "full"})
+    snapshots.save(path, OLD)
+    assert upload_diff_article(FakeClient(), store, snapshots, path, "h1", "Tool", NEW, "short") is None
@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from autoqiita.draft_series import upload_series
+from autoqiita.state_store import UploadStateStore
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.created = 0
+
+    def create_draft(self, draft):
+        self.created += 1
+        self.calls.append(("create", draft.title))
+        return {"id": f"new{self.created}", "url": f"https://qiita.com/new{self.created}"}
+
+    def update_draft(self, item_id, draft):
+        self.calls.append(("update", item_id))
+        return {"id": item_id, "url": f"https://qiita.com/{item_id}"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UploadStateStore(str(tmp_path / "state.db"), str(tmp_path / "state.json"))
+    yield store
+    store.close()
+
+
+def test_single_draft_becomes_part_one(store, tmp_path):
+    path = str(tmp_path / "doc.md")
+    store.record_upload(path, "h1", {"id": "single"}, "b1")
+    client = FakeClient()
+    upload_series(client, store, path, "h2", [("T (Part 1/2)", "one"), ("T (Part 2/2)", "two")])
+    assert client.calls == [("update", "single"), ("create", "T (Part 2/2)")]
+    assert store.item_id(path) == "single"
+
+
+def test_unchanged_parts_are_skipped(store, tmp_path):
+    path = str(tmp_path / "doc.md")
+    parts = [("T (Part 1/2)", "one"), ("T (Part 2/2)", "two")]
+    upload_series(FakeClient(), store, path, "h1", parts)
+    client = FakeClient()
+    results = upload_series(client, store, path, "h2", [parts[0], ("T (Part 2/2)", "two, edited")])
+    assert [r["skipped"] for r in results] == [True, False]
+    assert client.calls == [("update", "new2")]
+
+
+def test_series_keeps_single_draft_and_diff_columns(store, tmp_path):
+    path = str(tmp_path / "a.md")
+    store.record_upload(path, "h1", {"id": "single", "url": "u"}, "b1")
+    store.record_diff_upload(path, "h1", {"id": "diff", "url": "du"})
+    store.record_series(path, "h2", [{"item_id": "single", "body_hash": "p1", "title": "t (1/2)"},
+                                     {"item_id": "part2", "body_hash": "p2", "title": "t (2/2)"}])
+    entry = store.get(path)
+    assert entry["item_id"] == "single"
+    assert entry["diff_item_id"] == "diff"
+    assert [p["item_id"] for p in entry["parts"]] == ["single", "part2"]
+
+
+def test_item_id_falls_back_to_first_part(store, tmp_path):
+    path = str(tmp_path / "a.md")
+    store.record_series(path, None, [{"item_id": None}, {"item_id": "part2"}])
+    assert store.item_id(path) is None
+    store.record_series(path, "h", [{"item_id": "part1"}, {"item_id": "part2"}])
+    assert store.item_id(path) == "part1"
@@ -0,0 +1,33 @@
+from autoqiita.file_guard import MINIFIED_LINE_BYTES, SNIFF_BYTES, inspect_file
+
+
+def test_binary_file_is_skipped(tmp_path):
+    path = tmp_path / "image.md"
+    path.write_bytes(b"\x89PNG\0\0data")
+    assert inspect_file(str(path)).action == "skip"
+
+
+def test_long_line_in_text_types_is_kept(tmp_path):
+    for name in ("notes.md", "notes.txt", "script.py"):
+        path = tmp_path / name
+        path.write_text("x" * (MINIFIED_LINE_BYTES * 2) + "\n")
+        assert inspect_file(str(path)).action == "process", name
+
+
+def test_minified_data_file_is_skipped_unless_forced(tmp_path):
+    path = tmp_path / "bundle.js"
+    path.write_text("var a=1;" * MINIFIED_LINE_BYTES)
+    assert inspect_file(str(path)).action == "skip"
+    assert inspect_file(str(path), force=True).action == "process"
+
+
+def test_long_line_after_the_sniffed_head_is_found(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("{\n" + '  "a": 1,\n' * (SNIFF_BYTES // 8) + '"b": "' + "x" * MINIFIED_LINE_BYTES + '"}\n')
+    assert inspect_file(str(path)).action == "skip"
+
+
+def test_large_text_file_is_previewed(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("line\n" * 1000)
+    assert inspect_file(str(path), max_bytes=1000).action == "preview"
@@ -0,0 +1,29 @@
+import pytest
+
+from autoqiita.security_scanner import IncompleteScanError
+
+
+def test_gate_finds_critical_issue(scanner):
+    issue = scanner.find_blocking_issue("fine\npassword = 'hunter2'")
+    assert issue.level == "critical" and issue.line_number == 2
+    assert scanner.find_blocking_issue("nothing to see\nhost 10.20.30.40") is None
+
+
+def test_gate_skips_whitelisted_lines(scanner):
+    assert scanner.find_blocking_issue("password = 'your_password_here'") is None
+
+
+def test_gate_report_blocks(scanner):
+    report = scanner.get_gate_report(scanner.find_blocking_issue("pwd = abc"))
+    assert report["status"] == "critical" and report["partial"]
+
+
+def test_gate_raises_when_critical_rule_times_out(scanner, no_time_budget):
+    with pytest.raises(IncompleteScanError) as excinfo:
+        scanner.find_blocking_issue("the password is elsewhere\napi docs")
+    assert excinfo.value.timed_out_rules
+
+
+def test_gate_still_blocks_on_a_hit_under_timeout(scanner, no_time_budget):
+    issue = scanner.find_blocking_issue("password = 'hunter2'")
+    assert issue is not None and issue.level == "critical"
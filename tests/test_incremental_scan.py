@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from conftest import issue_keys, random_document
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_scan_incremental_matches_full_scan(scanner, seed):
+    rng = random.Random(seed)
+    lines = random_document(rng, 600).split("\n")
+    for _ in range(8):
+        position = rng.randrange(len(lines) + 1)
+        edit = rng.choice(["insert", "delete", "replace"])
+        if edit == "insert":
+            lines[position:position] = random_document(rng, 12).split("\n")
+        elif edit == "delete":
+            del lines[position:position + rng.randint(1, 4)]
+        else:
+            lines[position:position + 1] = [random_document(rng, 6).replace("\n", "")]
+        content = "\n".join(lines)
+        incremental = scanner.scan_incremental(content, "doc.md")
+        assert issue_keys(incremental) == issue_keys(scanner.scan_content(content))
+
+
+def test_shifted_issues_keep_their_line_text(scanner):
+    scanner.scan_incremental("a\npassword = 'hunter2'\nb", "doc.md")
+    issues = scanner.scan_incremental("new\nlines\na\npassword = 'hunter2'\nb", "doc.md")
+    assert [(i.line_number, i.line_content) for i in issues] == [(4, "password = 'hunter2'")]
+
+
+def test_files_are_tracked_separately(scanner):
+    scanner.scan_incremental("password = 'hunter2'", "a.md")
+    assert list(scanner.scan_incremental("nothing", "b.md")) == []
@@ -0,0 +1,31 @@
+import random
+
+from autoqiita.security_scanner import IssueStore, SecurityIssue
+
+from conftest import random_document
+
+
+def test_issues_are_built_on_access(scanner):
+    content = random_document(random.Random(3), 500)
+    issues = scanner.scan_content(content)
+    assert isinstance(issues, IssueStore)
+    materialized = list(issues)
+    assert len(materialized) == len(issues)
+    assert all(isinstance(issue, SecurityIssue) for issue in materialized)
+    assert issues[-1] == materialized[-1]
+    assert issues[1:3] == materialized[1:3]
+
+
+def test_report_counts_match_materialized_issues(scanner):
+    content = random_document(random.Random(4), 500)
+    issues = scanner.scan_content(content)
+    lazy = scanner.get_security_report(issues)
+    plain = scanner.get_security_report(list(issues))
+    for key in ("status", "total_issues", "by_level", "by_category"):
+        assert lazy[key] == plain[key]
+    assert scanner.should_block_upload(issues) == scanner.should_block_upload(list(issues))
+
+
+def test_empty_report(scanner):
+    report = scanner.get_security_report(scanner.scan_content("nothing"))
+    assert report["status"] == "passed" and report["total_issues"] == 0
@@ -0,0 +1,79 @@
+import random
+import re
+
+import pytest
+
+from autoqiita.keyword_filter import (
+    KeywordPrefilter, extract_required_literals, fold_case, max_match_width
+)
+
+from conftest import issue_keys, random_document, reference_keys
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"(?i)(password|passwd|pwd)\s*=", {"password", "passwd", "pwd"}),
+    (r"-----BEGIN\s+(RSA\s+)?PRIVATE", {"-----BEGIN"}),
+    (r"/home/[^/]+", {"/home/"}),
+    (r"\b(?:\+81|0)\d{1,4}", {"+81", "0"}),
+])
+def test_extract_required_literals(pattern, expected):
+    assert extract_required_literals(pattern) == expected
+
+
+@pytest.mark.parametrize("pattern", [r"\d+", r"(abc)?\s*x?", r"[a-z]{2,}", r"a|\d", r"foo\nbar"])
+def test_no_literals_when_none_are_required(pattern):
+    assert extract_required_literals(pattern) is None
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(?i)(api[_-]?key|apikey|access[_-]?token|secret[_-]?key)\s*[=:]",
+    r"(?i)(rm\s+-rf|del\s+/s|format\s+c:)",
+    r"(?i)(eval|exec)\s*\(",
+    r"(?i)[c-z]:\\(?:users|documents|desktop)\\",
+    r"(ab|cd)(ef|gh)+",
+    r"x{2}y",
+])
+def test_every_match_contains_a_required_literal(pattern):
+    literals = extract_required_literals(pattern)
+    assert literals
+    regex = re.compile(pattern)
+    samples = [random_document(random.Random(seed), 200) for seed in range(5)]
+    samples += ["API-KEY=", "apikey:", "Access_Token =", "RM  -rf", "format c:", "EXEC(",
+                "D:\\Documents\\", "abefgh", "cdgh", "xxy"]
+    for sample in samples:
+        for match in regex.finditer(sample):
+            folded = fold_case(match.group())
+            assert any(fold_case(literal) in folded for literal in literals), match.group()
+
+
+def test_max_match_width():
+    assert max_match_width(r"\b(?:\d{1,3}\.){3}\d{1,3}\b") == 15
+    assert max_match_width(r"/home/[^/]+") is None
+
+
+def test_fold_case_matches_re_ignorecase():
+    for char in "\u017f\u212a\u0130\u0131":
+        folded = fold_case(char)
+        assert len(folded) == 1 and folded.isascii()
+    assert fold_case("PassWord") == "password"
+
+
+def test_prefilter_finds_one_offset_per_line():
+    prefilter = KeywordPrefilter(["pwd", "API"])
+    content = "pwd pwd\nno\nApi and PWD"
+    folded, offsets = prefilter.find(content)
+    lines = {k: sorted(folded.count("\n", 0, o) + 1 for o in found) for k, found in offsets.items()}
+    assert lines == {prefilter.keyword_id("pwd"): [1, 3], prefilter.keyword_id("api"): [3]}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_prefiltered_scan_finds_every_hit(scanner, seed):
+    content = random_document(random.Random(seed), 1000).upper()
+    assert issue_keys(scanner.scan_content(content)) == reference_keys(scanner.rule_set, content)
+
+
+def test_case_folding_keywords_are_not_missed(scanner):
+    # U+017F folds to "s" under re.IGNORECASE; the prefilter must agree
+    content = "\u017fecret_key = 0123456789abcdefXYZ"
+    assert issue_keys(scanner.scan_content(content)) == reference_keys(scanner.rule_set, content)
+    assert len(scanner.scan_content(content)) == 1
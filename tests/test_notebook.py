@@ -0,0 +1,57 @@
+import json
+
+from autoqiita.notebook import MAX_DECODED_STRING_BYTES, OUTPUT_MAX_CHARS, read_notebook
+
+
+def write_notebook(path, cells, indent=None):
+    notebook = {
+        "metadata": {"kernelspec": {"name": "ir", "language": "R"}},
+        "nbformat": 4,
+        "cells": cells,
+    }
+    path.write_text(json.dumps(notebook, indent=indent, ensure_ascii=False), encoding="utf-8")
+
+
+def test_cells_match_json_parse(tmp_path):
+    cells = [
+        {"cell_type": "markdown", "metadata": {}, "source": ["# 見出し\n", "escaped \"quote\" \\\\ and \\n"]},
+        {"cell_type": "code", "metadata": {"tags": ["x"]}, "execution_count": 1,
+         "source": "print('hi')",
+         "outputs": [{"output_type": "stream", "name": "stdout", "text": ["hi\n"]},
+                     {"output_type": "display_data",
+                      "data": {"image/png": "iVBOR" * 1000, "text/plain": ["<Figure>"]}}]},
+        {"cell_type": "raw", "source": [], "attachments": {"a.png": {"image/png": "AAAA"}}},
+    ]
+    for indent in (None, 1):
+        path = tmp_path / f"nb{indent}.ipynb"
+        write_notebook(path, cells, indent)
+        notebook = read_notebook(str(path))
+        assert notebook.language == "R"
+        assert [(c.cell_type, c.source) for c in notebook.cells] == [
+            (cell["cell_type"], "".join(cell["source"])) for cell in cells
+        ]
+        assert notebook.cells[1].output == "hi\n\n<Figure>"
+
+
+def test_long_output_is_truncated(tmp_path):
+    path = tmp_path / "nb.ipynb"
+    write_notebook(path, [{"cell_type": "code", "source": "x",
+                           "outputs": [{"output_type": "stream", "text": ["y" * 100] * 100}]}])
+    cell = read_notebook(str(path)).cells[0]
+    assert cell.output_truncated and len(cell.output) == OUTPUT_MAX_CHARS
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "nb.ipynb"
+    path.write_bytes(b"")
+    assert read_notebook(str(path)).cells == []
+
+
+def test_huge_source_string_is_cut_with_a_note(tmp_path):
+    path = tmp_path / "nb.ipynb"
+    text = ("あ\"\\" * 50) + "x" * (MAX_DECODED_STRING_BYTES + 10)
+    write_notebook(path, [{"cell_type": "markdown", "source": ["# Head\n", text]}])
+    source = read_notebook(str(path)).cells[0].source
+    assert source.startswith("# Head\n" + "あ\"\\" * 50 + "x")
+    assert text.startswith(source[len("# Head\n"):source.index("\n…")])
+    assert "バイトの文字列のため以降は省略" in source
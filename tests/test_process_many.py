@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("markdown")
+
+from autoqiita.content_processor import ContentProcessor
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"note{i}.md"
+        path.write_text(f"# Note {i}\n\n" + ("password = 'hunter2'\n" if i % 3 == 0 else "text\n"))
+        paths.append(str(path))
+    binary = tmp_path / "image.md"
+    binary.write_bytes(b"\x89PNG\0\0")
+    paths.append(str(binary))
+    return paths
+
+
+def test_results_match_process_file(files):
+    processor = ContentProcessor(use_scan_cache=False)
+    results = {path: rest for path, *rest in processor.process_many(files, scan_workers=2)}
+    assert sorted(results) == sorted(files)
+    assert results[files[-1]][3]["status"] == "skipped"
+    for path in files[:-1]:
+        title, body, tags, report = processor.process_file(path)
+        assert results[path][:3] == [title, body, tags]
+        assert results[path][3]["status"] == report["status"]
+        assert results[path][3]["total_issues"] == report["total_issues"]
+
+
+def test_without_scan(files):
+    processor = ContentProcessor(enable_security_scan=False, use_scan_cache=False)
+    results = list(processor.process_many(files[:-1]))
+    assert len(results) == len(files) - 1
+    assert all(report is None for *_, report in results)
+
+
+def test_files_in_flight_are_bounded(files, monkeypatch):
+    processor = ContentProcessor(enable_security_scan=False, use_scan_cache=False)
+    convert = processor._convert_file
+    lock = threading.Lock()
+    active = peak = 0
+
+    def slow_convert(path, file_check=None):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+        return convert(path, file_check)
+
+    monkeypatch.setattr(processor, "_convert_file", slow_convert)
+    paths = files[:-1] * 5
+    assert len(list(processor.process_many(iter(paths), window=3, read_workers=8))) == len(paths)
+    assert peak <= 3
+
+
+def test_conversion_errors_are_reported(tmp_path):
+    processor = ContentProcessor(enable_security_scan=False, use_scan_cache=False)
+    [(path, title, body, tags, report)] = processor.process_many([str(tmp_path / "missing.md")])
+    assert body is None and report["status"] == "error"
+
+
+def test_scan_workers_are_not_forked():
+    # process_many's reader threads are running when the workers start
+    from autoqiita.tree_scan import scan_pool
+    pool = scan_pool(max_workers=1)
+    try:
+        assert pool._mp_context.get_start_method() != "fork"
+    finally:
+        pool.shutdown()
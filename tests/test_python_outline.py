@@ -0,0 +1,66 @@
+import pytest
+
+from autoqiita.python_outline import MAX_TAGS, extract_outline
+
+SOURCE = '''"""Fetch and plot data.
+
+Longer description.
+"""
+import os
+import numpy as np
+from pandas import DataFrame
+from . import local
+import requests.adapters
+
+
+@decorator
+def fetch(url: str, *, retries: int = 3) -> bytes:
+    """Download url."""
+    return b""
+
+
+async def main():
+    pass
+
+
+class Plotter(Base):
+    """Draws charts."""
+
+    def method(self):
+        pass
+'''
+
+
+def test_outline_of_module():
+    outline = extract_outline(SOURCE)
+    assert outline.title == "Fetch and plot data."
+    assert [(d.kind, d.name, d.line_number) for d in outline.definitions] == [
+        ("def", "fetch", 12), ("async def", "main", 18), ("class", "Plotter", 22)
+    ]
+    fetch = outline.definitions[0]
+    assert fetch.signature == "def fetch(url: str, *, retries: int=3)"
+    assert fetch.summary == "Download url."
+    assert fetch.end_line_number == 15
+    assert outline.imports == ["os", "numpy", "pandas", "requests"]
+
+
+def test_tags_from_imports():
+    names = [tag["name"] for tag in extract_outline(SOURCE).tags()]
+    assert names == ["Python", "NumPy", "pandas", "requests"]
+    many = "\n".join(f"import {m}" for m in ("django", "flask", "numpy", "pandas", "torch", "click"))
+    assert len(extract_outline(many).tags()) == MAX_TAGS
+
+
+def test_table_of_contents():
+    toc = extract_outline(SOURCE).table_of_contents().split("\n")
+    assert toc[0] == "- `def fetch(url: str, *, retries: int=3)` (L12) — Download url."
+    assert toc[2] == "- `class Plotter(Base)` (L22) — Draws charts."
+
+
+def test_outline_is_cached_by_content():
+    assert extract_outline(SOURCE) is extract_outline(SOURCE)
+
+
+@pytest.mark.parametrize("source", ["def broken(:\n", "x = '\0'"])
+def test_unparsable_source(source):
+    assert extract_outline(source) is None
@@ -0,0 +1,82 @@
+import json
+import uuid
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from requests.adapters import BaseAdapter
+
+from autoqiita.qiita_client import LatencyStats, QiitaClient, QiitaDraft
+
+
+class FakeAdapter(BaseAdapter):
+    """Answers requests from a list of (status, body, headers) without a network"""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append((request, kwargs))
+        status, body, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode("utf-8")
+        response.headers.update(headers)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def make_client(responses, **kwargs):
+    # A token of its own, so the process-wide rate limiter is not shared between tests
+    client = QiitaClient(f"token-{uuid.uuid4()}", **kwargs)
+    adapter = FakeAdapter(responses)
+    client.session.mount("https://", adapter)
+    return client, adapter
+
+
+def test_requests_share_one_session_with_timeouts():
+    client, adapter = make_client([(201, {"id": "a"}, {}), (200, {"id": "a"}, {})],
+                                  connect_timeout=1.5, read_timeout=7.0)
+    assert client.create_draft(QiitaDraft(title="T", body="B"))["id"] == "a"
+    assert client.update_draft("a", QiitaDraft(title="T", body="B2"))["id"] == "a"
+    (create, create_kwargs), (update, _) = adapter.requests
+    assert (create.method, create.url) == ("POST", "https://qiita.com/api/v2/items")
+    assert (update.method, update.url) == ("PATCH", "https://qiita.com/api/v2/items/a")
+    assert create.headers["Authorization"] == f"Bearer {client.access_token}"
+    assert "gzip" in create.headers["Accept-Encoding"]
+    assert json.loads(update.body)["body"] == "B2"
+    assert create_kwargs["timeout"] == (1.5, 7.0)
+    assert client.latency.summary()["requests"] == 2
+
+
+def test_pool_size_is_applied():
+    client = QiitaClient(f"token-{uuid.uuid4()}", pool_size=3)
+    assert client.session.get_adapter("https://qiita.com")._pool_maxsize == 3
+
+
+def test_http_errors_are_raised():
+    client, _ = make_client([(404, {"message": "Not found"}, {})])
+    with pytest.raises(requests.HTTPError):
+        client.get_draft("missing")
+
+
+def test_missing_draft_is_recreated():
+    client, adapter = make_client([(404, {}, {}), (201, {"id": "new"}, {})])
+    result = client.find_or_create_draft("T", "B", item_id="gone")
+    assert result["id"] == "new"
+    assert [r.method for r, _ in adapter.requests] == ["PATCH", "POST"]
+
+
+def test_latency_summary():
+    stats = LatencyStats(window=100)
+    for ms in range(1, 101):
+        stats.record(ms / 1000)
+    assert stats.summary() == {"requests": 100, "p50_ms": 51.0, "p99_ms": 100.0}
+    assert LatencyStats().summary()["p50_ms"] is None
@@ -0,0 +1,91 @@
+import time
+
+import autoqiita.rate_limiter as rate_limiter
+from autoqiita.rate_limiter import (
+    AUTO, AUTO_BURST, MANUAL, MANUAL_RESERVE, RateLimiter, current_priority, request_priority
+)
+
+
+def limiter_with(remaining: int, reset_in: float = 3000) -> RateLimiter:
+    limiter = RateLimiter()
+    limiter.update({"Rate-Remaining": str(remaining), "Rate-Reset": str(time.time() + reset_in)})
+    return limiter
+
+
+def test_manual_requests_go_out_while_budget_lasts():
+    limiter = limiter_with(3)
+    assert [limiter.reserve(MANUAL) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.reserve(MANUAL) > 0
+
+
+def test_auto_requests_never_spend_the_manual_reserve():
+    limiter = limiter_with(5)
+    assert all(limiter.reserve(AUTO) > 0 for _ in range(6))
+    assert limiter.reserve(MANUAL) == 0.0
+
+
+def test_auto_burst_is_capped_by_spare_budget():
+    limiter = limiter_with(MANUAL_RESERVE + 3)
+    waits = [limiter.reserve(AUTO) for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert all(wait > 0 for wait in waits[3:])
+    assert limiter.remaining == MANUAL_RESERVE
+
+
+def test_auto_requests_are_spaced_after_the_burst():
+    limiter = RateLimiter()
+    waits = [limiter.reserve(AUTO) for _ in range(AUTO_BURST + 2)]
+    assert waits[:AUTO_BURST] == [0.0] * AUTO_BURST
+    assert all(wait > 0 for wait in waits[AUTO_BURST:])
+    # Held requests are not booked until they ask again
+    assert limiter.remaining == limiter.limit - AUTO_BURST
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+def test_held_auto_requests_do_not_all_go_out_at_the_reset(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    limiter = RateLimiter()
+    limiter.update({"Rate-Remaining": str(MANUAL_RESERVE), "Rate-Reset": str(clock.now + 60)})
+
+    # Callers retry reserve() after each wait, as QiitaClient._request does
+    callers = 3 * AUTO_BURST
+    wakeups = [(clock.now, caller) for caller in range(callers)]
+    sent = []
+    while wakeups:
+        wakeups.sort()
+        clock.now, caller = wakeups.pop(0)
+        wait = limiter.reserve(AUTO)
+        if wait > 0:
+            wakeups.append((clock.now + wait, caller))
+        else:
+            sent.append(clock.now)
+
+    reset = sent[0]
+    assert len(sent) == callers and reset >= 1_000_060
+    assert sent.count(reset) == AUTO_BURST
+    assert all(later > reset for later in sent[AUTO_BURST:])
+    assert limiter.remaining == limiter.limit - callers
+
+
+def test_request_priority_context():
+    assert current_priority() == MANUAL
+    with request_priority(AUTO):
+        assert current_priority() == AUTO
+    assert current_priority() == MANUAL
+
+
+def test_malformed_headers_are_ignored():
+    limiter = RateLimiter()
+    limiter.update({"Rate-Remaining": "many"})
+    assert limiter.remaining == limiter.limit
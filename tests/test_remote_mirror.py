@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from autoqiita.remote_mirror import RemoteMirror, source_marker
+
+
+def item(item_id, title, source=None, private=True):
+    body = f"text\n\n*Source: {source}*\n" if source else "text"
+    return {"id": item_id, "title": title, "private": private, "body": body,
+            "created_at": "2024-01-01T00:00:00+09:00", "updated_at": "2024-01-01T00:00:00+09:00"}
+
+
+def body_from(source):
+    return f"new text\n\n*Source: {source}*\n"
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = RemoteMirror(str(tmp_path / "remote.db"))
+    items = [item("a", "Old title", "notes.md"), item("b", "Readme A", "README.md"),
+             item("c", "Readme B", "README.md"), item("d", "Plain"),
+             item("e", "Other", "other.md"), item("f", "Public", "public.md", private=False)]
+    mirror._apply({1: (items, "etag")}, 1, len(items))
+    yield mirror
+    mirror.close()
+
+
+def test_source_marker():
+    assert source_marker(body_from("a.md")) == "a.md"
+    assert source_marker("no footer") is None
+
+
+def test_find_draft_by_source_and_title(mirror):
+    assert mirror.find_draft("Readme B", body_from("README.md")) == "c"
+    # A shared file name alone never picks another article's draft
+    assert mirror.find_draft("New title", body_from("notes.md")) is None
+    assert mirror.find_draft("Readme C", body_from("README.md")) is None
+
+
+def test_unrelated_draft_with_the_same_file_name_is_not_matched(tmp_path):
+    mirror = RemoteMirror(str(tmp_path / "remote.db"))
+    try:
+        mirror._apply({1: ([item("a", "Project A setup", "README.md")], "etag")}, 1, 1)
+        assert mirror.find_draft("Library B usage", body_from("README.md")) is None
+        assert mirror.find_draft("Project A setup", body_from("README.md")) == "a"
+    finally:
+        mirror.close()
+
+
+def test_find_draft_by_title(mirror):
+    assert mirror.find_draft("Plain", body_from("plain.md")) == "d"
+    assert mirror.find_draft("Other", body_from("plain.md")) is None
+    assert mirror.find_draft("Public", body_from("public.md")) is None
+
+
+def test_find_draft_skips_excluded_id(mirror):
+    assert mirror.find_draft("Old title", body_from("notes.md")) == "a"
+    assert mirror.find_draft("Old title", body_from("notes.md"), exclude="a") is None
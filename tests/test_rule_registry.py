@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from autoqiita.security_scanner import RuleRegistry, SecurityScanner
+
+
+def write_rules(path, word):
+    path.write_text(json.dumps({"custom": [{
+        "pattern": word, "description": f"{word} found", "level": "high", "suggestion": ""
+    }]}), encoding="utf-8")
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, "alpha")
+    return path
+
+
+def test_scanners_share_one_rule_set(rules_file):
+    registry = RuleRegistry()
+    first = SecurityScanner(str(rules_file), registry=registry)
+    second = SecurityScanner(str(rules_file), registry=registry)
+    assert first.rule_set is second.rule_set
+    assert registry.version(str(rules_file)) == first.rules_version
+
+
+def test_rules_file_is_reloaded_when_it_changes(rules_file):
+    scanner = SecurityScanner(str(rules_file), registry=RuleRegistry(check_interval=0))
+    assert len(scanner.scan_content("alpha beta")) == 1
+    old_version = scanner.rules_version
+    write_rules(rules_file, "gamma_longer")
+    assert [i.description for i in scanner.scan_content("alpha gamma_longer")] == ["gamma_longer found"]
+    assert scanner.rules_version != old_version
+
+
+def test_broken_edit_keeps_previous_rules(rules_file):
+    scanner = SecurityScanner(str(rules_file), registry=RuleRegistry(check_interval=0))
+    rule_set = scanner.rule_set
+    rules_file.write_text("{ not json", encoding="utf-8")
+    assert scanner.rule_set is rule_set
+    assert len(scanner.scan_content("alpha")) == 1
+
+
+def test_broken_rules_file_fails_on_first_load(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text("{ not json", encoding="utf-8")
+    with pytest.raises(ValueError):
+        SecurityScanner(str(path), registry=RuleRegistry())
+
+
+def test_changes_are_not_checked_within_the_interval(rules_file):
+    scanner = SecurityScanner(str(rules_file), registry=RuleRegistry(check_interval=3600))
+    rule_set = scanner.rule_set
+    write_rules(rules_file, "gamma_longer")
+    assert scanner.rule_set is rule_set
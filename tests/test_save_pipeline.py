@@ -0,0 +1,104 @@
+import pytest
+
+pytest.importorskip("markdown")
+pytest.importorskip("requests")
+
+from autoqiita.content_processor import ContentProcessor
+from autoqiita.diff_article import SnapshotStore
+from autoqiita.save_pipeline import BLOCKED, SAVED, SKIPPED, UNCHANGED, SavePipeline
+from autoqiita.state_store import UploadStateStore
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def create_draft(self, draft):
+        self.calls.append(("create", draft.title))
+        return {"id": f"new{len(self.calls)}", "url": f"https://qiita.com/new{len(self.calls)}"}
+
+    def update_draft(self, item_id, draft):
+        self.calls.append(("update", item_id))
+        return {"id": item_id, "url": f"https://qiita.com/{item_id}"}
+
+    def find_or_create_draft(self, title, body, tags, security_report, force_upload=False,
+                             item_id=None):
+        self.calls.append(("save", item_id, body))
+        return {"id": item_id or "draft1", "url": f"https://qiita.com/{item_id or 'draft1'}"}
+
+
+@pytest.fixture
+def make_pipeline(tmp_path):
+    stores = []
+
+    def make(**kwargs):
+        processor = ContentProcessor(use_scan_cache=False, **kwargs)
+        store = UploadStateStore(str(tmp_path / "state.db"), str(tmp_path / "state.json"))
+        stores.append(store)
+        client = FakeClient()
+        return SavePipeline(client, processor, store, SnapshotStore(str(tmp_path / "snapshots"))), client
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_second_save_of_an_unchanged_file_is_skipped(make_pipeline, tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Notes\n\nhello\n", encoding="utf-8")
+    pipeline, client = make_pipeline()
+
+    first = pipeline.save(str(path))
+    second = pipeline.save(str(path))
+
+    assert (first.status, first.item_id) == (SAVED, "draft1")
+    assert (second.status, second.item_id) == (UNCHANGED, "draft1")
+    assert len(client.calls) == 1
+
+
+def test_edit_updates_the_recorded_draft(make_pipeline, tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Notes\n\nhello\n", encoding="utf-8")
+    pipeline, client = make_pipeline()
+    pipeline.save(str(path))
+    path.write_text("# Notes\n\nhello, world\n", encoding="utf-8")
+
+    assert pipeline.save(str(path)).status == SAVED
+    assert client.calls[-1][1] == "draft1"
+
+
+def test_critical_issue_blocks_unless_forced(make_pipeline, tmp_path):
+    path = tmp_path / "secret.md"
+    path.write_text("# Config\n\npassword = 'hunter2secret'\n", encoding="utf-8")
+    pipeline, client = make_pipeline()
+
+    assert pipeline.save(str(path)).status == BLOCKED
+    assert client.calls == []
+
+    forced = pipeline.save(str(path), force=True)
+    assert forced.status == SAVED
+    # Forcing skips the block, not the warning
+    assert "セキュリティ" in client.calls[0][2]
+
+
+def test_binary_file_is_skipped(make_pipeline, tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"\x00\x01\x02" * 100)
+    pipeline, client = make_pipeline()
+
+    assert pipeline.save(str(path)).status == SKIPPED
+    assert client.calls == []
+
+
+def test_long_body_goes_up_as_a_series(make_pipeline, tmp_path):
+    path = tmp_path / "long.md"
+    path.write_text("".join(f"## Section {i}\n\n{'text ' * 40}\n\n" for i in range(10)),
+                    encoding="utf-8")
+    pipeline, client = make_pipeline(max_body_chars=600, enable_security_scan=False)
+
+    result = pipeline.save(str(path))
+
+    assert result.status == SAVED and len(result.parts) > 1
+    assert all(call[0] == "create" for call in client.calls)
+    again = pipeline.save(str(path), skip_unchanged=True)
+    assert again.status == UNCHANGED and len(again.parts) == len(result.parts)
@@ -0,0 +1,53 @@
+import os
+import random
+
+from autoqiita.scan_cache import ScanCache
+from autoqiita.security_scanner import RuleRegistry, SecurityScanner
+
+from conftest import issue_keys, random_document
+
+
+def test_round_trip(tmp_path):
+    cache = ScanCache(str(tmp_path))
+    key = ScanCache.make_key("content", "rules")
+    assert cache.get(key) is None
+    cache.put(key, [(1, 0, 5, 9)])
+    assert cache.get(key) == [[1, 0, 5, 9]]
+
+
+def test_key_depends_on_rules():
+    assert ScanCache.make_key("content", "a") != ScanCache.make_key("content", "b")
+
+
+def test_stats_are_flushed_once(tmp_path):
+    cache = ScanCache(str(tmp_path))
+    key = ScanCache.make_key("x", "rules")
+    cache.get(key)
+    cache.put(key, [])
+    cache.get(key)
+    assert not cache.stats_file.exists()
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    cache.flush()
+    cache.flush()
+    other = ScanCache(str(tmp_path))
+    assert (other.stats()["hits"], other.stats()["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ScanCache(str(tmp_path), max_entries=10)
+    keys = [ScanCache.make_key(str(i), "rules") for i in range(10)]
+    for i, key in enumerate(keys):
+        cache.put(key, [])
+        os.utime(cache.entries_dir / f"{key}.json", (i, i))
+    cache.put(ScanCache.make_key("new", "rules"), [])
+    assert cache.stats()["entries"] == 9
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[-1]) == []
+
+
+def test_scanner_serves_cached_issues(tmp_path):
+    scanner = SecurityScanner(cache=ScanCache(str(tmp_path)), registry=RuleRegistry())
+    content = random_document(random.Random(1), 300)
+    first = issue_keys(scanner.scan_content(content))
+    assert issue_keys(scanner.scan_content(content)) == first
+    assert scanner.cache.stats()["hits"] == 1
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from autoqiita.state_store import UploadStateStore, source_hash
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UploadStateStore(str(tmp_path / "state.db"), str(tmp_path / "state.json"))
+    yield store
+    store.close()
+
+
+def test_unchanged_after_upload(store, tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("hello\r\n")
+    digest = source_hash(str(path))
+    assert not store.is_unchanged(str(path), digest)
+    store.record_upload(str(path), digest, {"id": "item1"})
+    assert store.is_unchanged(str(path), digest)
+    path.write_text("hello, world\n")
+    assert not store.is_unchanged(str(path), source_hash(str(path)))
+
+
+def test_line_endings_do_not_change_the_source_hash(tmp_path):
+    crlf = tmp_path / "crlf.md"
+    lf = tmp_path / "lf.md"
+    crlf.write_bytes(b"a\r\nb\r\n")
+    lf.write_bytes(b"a\nb\n")
+    assert source_hash(str(crlf)) == source_hash(str(lf))
+
+
+def test_forget(store, tmp_path):
+    path = str(tmp_path / "a.md")
+    store.record_upload(path, "h", {"id": "item1"})
+    store.forget(path)
+    assert store.get(path) is None
+
+
+def test_item_id_falls_back_to_first_part(store, tmp_path):
+    path = str(tmp_path / "a.md")
+    store.record_series(path, None, [{"item_id": None}, {"item_id": "part2"}])
+    assert store.item_id(path) is None
+    store.record_series(path, "h", [{"item_id": "part1"}, {"item_id": "part2"}])
+    assert store.item_id(path) == "part1"
+
+
+def test_adopt_moved_file(store, tmp_path):
+    old = tmp_path / "old.md"
+    new = tmp_path / "new.md"
+    new.write_text("content")
+    digest = source_hash(str(new))
+    store.record_upload(str(old), digest, {"id": "item1"})
+    adopted = store.adopt_moved(str(new), digest)
+    assert adopted["item_id"] == "item1"
+    assert store.get(str(old)) is None
+    assert store.item_id(str(new)) == "item1"
+
+
+def test_legacy_json_state_is_migrated(tmp_path):
+    legacy = tmp_path / "state.json"
+    legacy.write_text(json.dumps({"files": {"/w/a.md": {"content_hash": "h", "item_id": "item1"}}}))
+    store = UploadStateStore(str(tmp_path / "state.db"), str(legacy))
+    try:
+        assert store.item_id("/w/a.md") == "item1"
+        assert store.is_unchanged("/w/a.md", "h")
+    finally:
+        store.close()
+    assert not legacy.exists()
+    assert (tmp_path / "state.json.migrated").exists()
@@ -0,0 +1,47 @@
+import io
+import random
+
+import pytest
+
+import autoqiita.security_scanner as security_scanner
+
+from conftest import issue_keys, plain_scan, random_document, reference_keys
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_scan_stream_matches_plain_re(scanner, monkeypatch, seed):
+    monkeypatch.setattr(security_scanner, "STREAM_MAX_LINE_CHARS", 1024)
+    monkeypatch.setattr(security_scanner, "LONG_LINE_EXCERPT_CHARS", 8)
+    rng = random.Random(seed)
+    content = random_document(rng, 2000)
+    # One line far over STREAM_MAX_LINE_CHARS, scanned in windows
+    content += "\n" + random_document(rng, 3000).replace("\n", " ") + "\n" + random_document(rng, 200)
+    issues = scanner.scan_stream(io.StringIO(content), chunk_chars=97)
+    assert issue_keys(issues) == reference_keys(scanner.rule_set, content)
+
+
+def test_long_line_keeps_word_boundaries(scanner, monkeypatch):
+    monkeypatch.setattr(security_scanner, "STREAM_MAX_LINE_CHARS", 64)
+    # \b must see the character before a window start: "x10.20.30.40" is not an address
+    line = ("x" * 61 + "10.20.30.40 -1.2.3.4 ") * 50
+    issues = scanner.scan_stream(io.StringIO(line), chunk_chars=17)
+    assert len(issues) == len(plain_scan(scanner.rule_set, line)) == 50
+
+
+def test_long_line_issue_has_excerpt(scanner, monkeypatch):
+    monkeypatch.setattr(security_scanner, "STREAM_MAX_LINE_CHARS", 1000)
+    line = "x " * 5000 + "password = 'hunter2'" + " y" * 5000
+    issues = scanner.scan_stream(io.StringIO("first\n" + line + "\nlast"), chunk_chars=333)
+    assert len(issues) == 1
+    assert issues[0].line_number == 2
+    assert "password = 'hunter2'" in issues[0].line_content
+    assert len(issues[0].line_content) < len(line)
+
+
+def test_large_file_is_streamed(scanner, monkeypatch, tmp_path):
+    monkeypatch.setattr(security_scanner, "STREAM_THRESHOLD_BYTES", 1000)
+    path = tmp_path / "big.md"
+    path.write_text("filler line\n" * 500 + "password = 'hunter2'\n")
+    monkeypatch.setattr(scanner, "scan_content", None)  # must not be used
+    issues = scanner.scan_file(str(path))
+    assert [issue.line_number for issue in issues] == [501]
@@ -0,0 +1,60 @@
+import pytest
+
+import autoqiita.table_preview as table_preview
+from autoqiita.table_preview import PREVIEW_CELL_CHARS, count_lines, read_table_preview
+from autoqiita.text_decoder import TextDecoder
+
+
+def write_csv(path, rows, delimiter=","):
+    path.write_text("".join(delimiter.join(row) + "\n" for row in rows), encoding="utf-8")
+
+
+def test_preview_rows_and_counts(tmp_path):
+    path = tmp_path / "data.csv"
+    write_csv(path, [["id", "name"]] + [[str(i), f"name{i}"] for i in range(100)])
+    preview = read_table_preview(str(path), ",", TextDecoder(), max_rows=5)
+    assert preview.header == ["id", "name"]
+    assert preview.rows == [[str(i), f"name{i}"] for i in range(5)]
+    assert (preview.row_count, preview.row_count_exact, preview.column_count) == (100, True, 2)
+
+
+def test_markdown_table_escapes_and_cuts_cells(tmp_path):
+    path = tmp_path / "data.tsv"
+    write_csv(path, [["a", "b"], ["x|y", "z" * 200]], delimiter="\t")
+    table = read_table_preview(str(path), "\t", TextDecoder()).markdown_table().split("\n")
+    assert table[:2] == ["| a | b |", "|---|---|"]
+    assert "x\\|y" in table[2]
+    assert "z" * (PREVIEW_CELL_CHARS - 1) + "…" in table[2]
+
+
+def test_ragged_rows_are_padded(tmp_path):
+    path = tmp_path / "data.csv"
+    write_csv(path, [["a"], ["1", "2", "3"]])
+    table = read_table_preview(str(path), ",", TextDecoder()).markdown_table().split("\n")
+    assert table[0] == "| a |  |  |"
+
+
+def test_preview_reads_only_the_head(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_preview, "PREVIEW_BYTES", 200)
+    path = tmp_path / "data.csv"
+    write_csv(path, [["id", "value"]] + [[str(i), "v" * 10] for i in range(1000)])
+    preview = read_table_preview(str(path), ",", TextDecoder(), max_rows=100)
+    assert 0 < len(preview.rows) < 20
+    assert all(len(row) == 2 for row in preview.rows)
+    assert preview.row_count == 1000
+
+
+@pytest.mark.parametrize("ending", [b"\n", b""])
+def test_count_lines_exact(tmp_path, ending):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a\nb\nc" + ending)
+    assert count_lines(str(path), path.stat().st_size) == (3, True)
+
+
+def test_count_lines_estimates_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_preview, "EXACT_COUNT_BYTES", 1000)
+    monkeypatch.setattr(table_preview, "COUNT_CHUNK_BYTES", 100)
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"123456789\n" * 1000)
+    lines, exact = count_lines(str(path), path.stat().st_size)
+    assert not exact and lines == 1000
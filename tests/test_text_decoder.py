@@ -0,0 +1,43 @@
+import pytest
+
+from autoqiita.text_decoder import TextDecoder, detect_and_decode
+
+TEXT = "日本語のテキスト\nパスワードの設定"
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "cp932", "euc_jp"])
+def test_detects_japanese_encodings(encoding):
+    assert detect_and_decode(TEXT.encode(encoding)) == (TEXT, encoding)
+
+
+def test_bom_wins():
+    text, encoding = detect_and_decode(TEXT.encode("utf-8-sig"))
+    assert text == TEXT
+
+
+def test_strict_raises_on_undecodable_bytes():
+    data = b"abc\x81\x0a\x8f"
+    assert detect_and_decode(data)[1] == "cp932"
+    with pytest.raises(UnicodeDecodeError):
+        detect_and_decode(data, strict=True)
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "cp932", "euc_jp"])
+def test_open_streams_detected_encoding(tmp_path, encoding):
+    path = tmp_path / "notes.md"
+    path.write_bytes((TEXT + "\r\n").encode(encoding) * 100)
+    with TextDecoder().open(str(path), sniff_bytes=64) as f:
+        assert f.read() == (TEXT + "\n") * 100
+
+
+@pytest.mark.parametrize("encoding", ["utf-16-le", "utf-16-be"])
+def test_capped_utf16_read_keeps_code_units_whole(tmp_path, encoding):
+    # U+0A00 and U+000A share a byte, so "\n" bytes also occur at odd offsets
+    line = "਀　テキスト\n"
+    path = tmp_path / "notes.txt"
+    bom = "﻿".encode(encoding)
+    path.write_bytes(bom + (line * 50).encode(encoding))
+    for max_bytes in range(len(bom) + 1, 200, 7):
+        text = TextDecoder().read(str(path), max_bytes=max_bytes, strict=True)
+        assert (line * 50).startswith(text)
+        assert text.endswith("テキスト") or "\n" not in text
@@ -0,0 +1,81 @@
+import io
+import json
+
+import pytest
+
+import autoqiita.security_scanner as security_scanner
+from autoqiita.scan_cache import ScanCache
+from autoqiita.security_scanner import (
+    IncompleteScanError, RuleRegistry, SecurityScanner, line_time_budget
+)
+
+from conftest import issue_keys
+
+
+def test_budget_scales_with_line_length():
+    assert line_time_budget(10) == security_scanner.RULE_LINE_TIME_BUDGET
+    assert line_time_budget(10_000_000) > line_time_budget(1_000_000) > line_time_budget(10)
+
+
+def test_critical_timeout_blocks_upload(scanner, no_time_budget):
+    issues = scanner.scan_content("the password is not here\nnor the api key")
+    report = scanner.get_security_report(issues)
+    assert report["status"] == "error"
+    assert any(rule["level"] == "critical" for rule in report["timed_out_rules"])
+    assert scanner.should_block_upload(issues)
+
+
+def test_timed_out_rule_stays_disabled_until_reload(scanner, monkeypatch, no_time_budget):
+    scanner.scan_content("password is mentioned here")
+    monkeypatch.undo()
+    issues = scanner.scan_content("password = 'hunter2'")
+    assert scanner.get_security_report(issues)["status"] == "error"
+    with pytest.raises(IncompleteScanError):
+        scanner.find_blocking_issue("nothing to see")
+    # A reload compiles a fresh rule set with every rule enabled
+    scanner.registry.clear()
+    issues = scanner.scan_content("password = 'hunter2'")
+    assert scanner.get_security_report(issues)["status"] == "critical"
+    assert not issues.timed_out
+
+
+def test_document_pass_overrun_fails_closed(tmp_path, monkeypatch):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"custom": [{
+        "pattern": r"^(\w+\s?)+$", "description": "slow", "level": "critical", "suggestion": ""
+    }]}), encoding="utf-8")
+    scanner = SecurityScanner(str(rules_file), registry=RuleRegistry())
+    monkeypatch.setattr(security_scanner, "RULE_DOCUMENT_TIME_PER_LINE", -1.0)
+    monkeypatch.setattr(security_scanner, "RULE_LINE_TIME_BUDGET", -1.0)
+    monkeypatch.setattr(security_scanner, "RULE_TIME_PER_CHAR", 0.0)
+    issues = scanner.scan_content("some words here!\n" * 10)
+    assert issues.timed_out
+    assert scanner.get_security_report(issues)["status"] == "error"
+    monkeypatch.undo()
+    with pytest.raises(IncompleteScanError) as error:
+        scanner.find_blocking_issue("plain text")
+    assert [rule["description"] for rule in error.value.timed_out_rules] == ["slow"]
+
+
+def test_timed_out_scan_is_not_cached(tmp_path, monkeypatch, no_time_budget):
+    scanner = SecurityScanner(cache=ScanCache(str(tmp_path)), registry=RuleRegistry())
+    content = "the password is somewhere\npassword = 'hunter2'"
+    assert scanner.get_security_report(scanner.scan_content(content))["status"] == "error"
+    monkeypatch.undo()
+    scanner.registry.clear()
+    assert scanner.get_security_report(scanner.scan_content(content))["status"] == "critical"
+
+
+def test_timed_out_incremental_state_is_dropped(scanner, monkeypatch, no_time_budget):
+    scanner.scan_incremental("password is here\nnothing", "doc.md")
+    monkeypatch.undo()
+    # Re-enable the rules without a reload, so the same rule set is used
+    scanner.rule_set.disabled.clear()
+    issues = scanner.scan_incremental("password = 'hunter2'\nnothing", "doc.md")
+    assert issue_keys(issues) == issue_keys(scanner.scan_content("password = 'hunter2'\nnothing"))
+
+
+def test_stream_timeout_reports_error(scanner, no_time_budget):
+    issues = scanner.scan_stream(io.StringIO("password is here\nsecond line"), chunk_chars=5)
+    assert scanner.get_security_report(issues)["status"] == "error"
+    assert scanner.should_block_upload(issues)
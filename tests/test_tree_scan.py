@@ -0,0 +1,48 @@
+import pytest
+
+from autoqiita.tree_scan import iter_workspace_files, scan_tree
+
+
+def test_iter_workspace_files_prunes_ignored(tmp_path):
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "a.md").write_text("x")
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "b.md").write_text("x")
+    (tmp_path / "c.py").write_text("x")
+    (tmp_path / "d.png").write_bytes(b"x")
+    (tmp_path / "e.tmp.md").write_text("x")
+    files = iter_workspace_files(str(tmp_path), [".md", ".py"], ["node_modules", "*.tmp.md"])
+    assert sorted(p[len(str(tmp_path)) + 1:] for p in files) == ["c.py", "docs/b.md"]
+
+
+def test_scan_tree_reports_each_file(tmp_path):
+    (tmp_path / "clean.md").write_text("nothing here\n")
+    (tmp_path / "secret.md").write_text("password = 'hunter2'\n")
+    (tmp_path / "broken.md").write_bytes(b"abc\x81\x0apassword = 1\x0a\x8f")
+    paths = [str(tmp_path / name) for name in ("clean.md", "secret.md", "broken.md")]
+    results = {r["file_path"]: r for r in scan_tree(paths, max_workers=2, use_cache=False)}
+    assert results[paths[0]]["status"] == "passed"
+    assert results[paths[1]]["status"] == "critical"
+    assert results[paths[1]]["issues"][0]["line_number"] == 1
+    # Files that could not be decoded are never counted as passed
+    assert results[paths[2]]["status"] == "error"
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "cp932", "euc_jp"])
+def test_scan_file_detects_japanese_encodings(scanner, tmp_path, encoding):
+    path = tmp_path / "notes.md"
+    path.write_bytes("# 設定メモ\n接続先のパスワード\npassword = 'hunter2'\n".encode(encoding))
+    issues = scanner.scan_file(str(path))
+    assert [(issue.line_number, issue.level) for issue in issues] == [(3, "critical")]
+
+
+def test_scan_file_raises_on_undecodable_bytes(scanner, tmp_path):
+    path = tmp_path / "broken.md"
+    path.write_bytes(b"abc\x81\x0apassword = 1\x0a\x8f")
+    with pytest.raises(UnicodeDecodeError):
+        scanner.scan_file(str(path))
+
+
+def test_scan_file_raises_on_unreadable_path(scanner, tmp_path):
+    with pytest.raises(OSError):
+        scanner.scan_file(str(tmp_path / "missing.md"))